@@ -43,32 +43,58 @@ from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Que
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import shutil
-from openai import OpenAI
+from lib.openai_client import openai_call
 from services.action_service import action_service
-from services.intent_service import intent_service, session_manager
+from services.intent_service import intent_service, session_manager, session_executor
+from services.fast_intent import fast_intent
+from services.product_index import product_index
+from services.ledger_aggregates import ledger_aggregates
 from dotenv import load_dotenv
-from lib.supabase_lib import supabase
+from lib.supabase_lib import supabase, run_query
+from lib.message_hub import message_hub
+from lib.work_queue import WorkQueue
+from lib.keyed_executor import KeyBusyError
 from lib.twilio_config import verify_twilio
+from integrations import TOOL_REGISTRY
 from fastapi.responses import Response
 from twilio.twiml.messaging_response import MessagingResponse
 from agents.architect import WorkflowArchitect
 from workflows.engine import inngest_client, execute_workflow
-from inngest import Event
+from workflows.dispatch import dispatch_workflow_run, dispatch_workflow_runs
+from workflows.local_executor import local_executor
 from inngest.fast_api import serve
 from fastapi import Request
 from workflows.schema import WorkflowBlueprint
-from lib.supabase_lib import get_active_workflows_by_trigger
+from workflows.trigger_index import trigger_index
 # from webhooks.instagram import router as instagram_router
 from routers.messages import router as messages_router
 from routers.dashboard import router as dashboard_router
 from routers.reports import router as reports_router
 from services.sync_service import sync_service
 import asyncio
+from typing import Optional
 
 # config
 load_dotenv()
 app = FastAPI(title="Bharat Biz-Agent API")
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# Debt drift check (0 disables); with APPLY the drift is also corrected
+DEBT_RECONCILE_SECONDS = float(os.environ.get("DEBT_RECONCILE_SECONDS", "3600"))
+DEBT_RECONCILE_APPLY = os.environ.get("DEBT_RECONCILE_APPLY", "false").lower() == "true"
+# Treat webhook deliveries with identical payloads as one (Idempotency-Key always is)
+WEBHOOK_DEDUPE_PAYLOADS = (
+    os.environ.get("WEBHOOK_DEDUPE_PAYLOADS", "false").lower() == "true"
+)
+# /whatsapp: acknowledge Twilio immediately and reply from a background worker
+WHATSAPP_ACK_FIRST = os.environ.get("WHATSAPP_ACK_FIRST", "false").lower() == "true"
+whatsapp_queue = WorkQueue(
+    "WhatsAppQueue",
+    workers=int(os.environ.get("WHATSAPP_WORKERS", "4")),
+    queue_size=int(os.environ.get("WHATSAPP_QUEUE_SIZE", "100")),
+)
+whatsapp_tool = TOOL_REGISTRY["whatsapp"]
+WHATSAPP_BUSY_REPLY = (
+    "I'm still working on your previous messages, please try again in a moment."
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
@@ -94,10 +120,284 @@ async def background_sync_task():
         await asyncio.sleep(60)
 
 
+async def debt_reconciliation_task():
+    """Periodically checks customers.total_debt against invoices - payments"""
+    while True:
+        await asyncio.sleep(DEBT_RECONCILE_SECONDS)
+        try:
+            report = await action_service.reconcile_customer_debts(
+                apply=DEBT_RECONCILE_APPLY
+            )
+            if report.get("status") == "error":
+                print(f"❌ Debt reconciliation failed: {report.get('message')}")
+            elif report["drifted_customers"]:
+                print(
+                    f"⚠️ Debt drift on {report['drifted_customers']} customers "
+                    f"(total {report['total_drift']}, corrected: {report['applied']})"
+                )
+        except Exception as e:
+            print(f"❌ Debt reconciliation error: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
     # Start the background sync task
     asyncio.create_task(background_sync_task())
+    if DEBT_RECONCILE_SECONDS > 0:
+        asyncio.create_task(debt_reconciliation_task())
+    # Worker pool for workflows that run in-process instead of through Inngest
+    local_executor.start()
+    if WHATSAPP_ACK_FIRST:
+        whatsapp_queue.start()
+    # Build the trigger service -> active workflows index used by webhook dispatch
+    try:
+        await trigger_index.load()
+    except Exception as e:
+        print(f"❌ Trigger index load failed (will retry on first lookup): {e}")
+    # Product catalog used for invoice/stock name matching
+    await product_index.ensure_loaded()
+    # Customer directory used for fast-path name matching
+    await ledger_aggregates.ensure_loaded()
+
+
+async def _process_voice_intent(session_id: str, raw_text: str, user_lang: str):
+    """Intent pipeline of /intent-parser; runs serialized per session_id"""
+    # CONTEXTUAL PROCESSING
+    existing_memory = await session_manager.get_session(session_id)
+    print(
+        f"--- Existing Memory: {existing_memory.model_dump_json() if existing_memory else 'None'} ---"
+    )
+    context = f"Existing Memory: {existing_memory.model_dump_json() if existing_memory else 'None'}. New Voice: {raw_text}"
+
+    # 3. openAI Processing (Handles Local Language Response) (GIVES INTENT)
+    # Simple commands in a fresh conversation are resolved locally, without the LLM
+    result = None if existing_memory else await fast_intent.classify(raw_text)
+    if result is None:
+        result = await intent_service.parse_message(context, language=user_lang)
+    # The 'result' is a Pydantic object containing 4 parameters:
+    # 1. intent (str): The detected user goal or action.
+    # 2. parameters (dict): Key-value pairs of extracted entities/data.
+    # 2.5 data: optional but contains core for running execution funtions
+    # 3. missing_info (list): A list of strings identifying required fields not yet provided.
+    # 4. response (str): The translated/localized response text for the user.
+    print(f"--- Result: {result.model_dump_json() if result else 'None'} ---")
+
+    # 4. Save or Clear Session (SAVE CONTEXT if THE SYSTEM AS TO ASK FOOLOW-UP QUESTIONS)
+    if result.missing_info:
+        # If data is missing, save state and ask follow-up (SAVE CONTEXT)
+        await session_manager.save_session(session_id, result)
+        # DEBUGGING: JSON Response for Missing Info
+        # {
+        #   "status": "pending",
+        #   "reply": "Could you please provide the item names?"
+        # }
+        return {"status": "pending", "reply": result.response_text}
+
+    # ACTION EXECUTION
+    try:
+        if not result.data:
+            raise ValueError("Intent data is missing from the response")
+
+        # INTENT TYPE CHECKING
+        if result.intent_type == "CREATE_INVOICE":
+            # VALIDATION CHECK: Ensure mandatory fields are actually there
+            if (
+                not result.data
+                or not hasattr(result.data, "customer_name")
+                or not result.data.customer_name
+                or not result.data.items
+            ):
+                print(f"!!! Validation Error: Incomplete Invoice Data: {result.data}")
+                # DEBUGGING: JSON Response for Validation Error
+                # {
+                #   "status": "pending",
+                #   "reply": "I'm sorry...",
+                #   "analysis": { ... UserIntent dict ... }
+                # }
+                return {
+                    "status": "pending",
+                    "reply": "I'm sorry, I seem to have lost the invoice details. Could you please repeat what you want to bill?",
+                    "analysis": result.model_dump(),
+                }
+
+            # --- SMART PRICE CHECK LOGIC ---
+            # Check if Paid Amount is explicitly valid or needs clarification "Discount vs Due"
+            # Only check if amount_paid is provided and we can calculate a DB total
+            if (
+                result.data.amount_paid is not None
+                and result.data.amount_paid > 0
+                and not result.data.discount_applied
+                and not result.data.is_due
+            ):
+                calc = await action_service.calculate_potential_total(result.data.items)
+                db_total = calc["total"]
+
+                # If discrepancy exists (Paid provided < DB Total Estimate)
+                # Allow small margin of error (e.g. 1.0) for float diffs
+                if db_total > (result.data.amount_paid + 5.0):  # 5rs buffer
+                    # Discrepancy Found!
+                    # We need to ASK the user.
+                    # Update Missing Info to "Clarification"
+                    result.missing_info = ["Clarification: Discount or Due"]
+                    diff_val = db_total - result.data.amount_paid
+                    result.response_text = (
+                        f"The standard price for these items is approx Rs. {db_total}, but you mentioned Rs. {result.data.amount_paid}. "
+                        f"Is the remaining Rs. {diff_val} a Discount or is it Due?"
+                    )
+
+                    # Save session so next reply can answer "It is Due" or "Discount"
+                    await session_manager.save_session(session_id, result)
+
+                    # MASK the intent so Frontend doesn't show the Invoice Draft yet
+                    # We make a copy of the dump
+                    analysis_dump = result.model_dump()
+                    analysis_dump["intent_type"] = "CLARIFICATION_NEEDED"
+
+                    return {
+                        "status": "pending",
+                        "reply": result.response_text,
+                        "analysis": analysis_dump,
+                    }
+
+        # 4. ACTION SELECTION & EXECUTION
+        action_data = {}
+        reply = ""
+
+        if result.intent_type == "CREATE_INVOICE":
+            action_result = await action_service.execute_invoice(result.data)
+            if action_result.get("status") == "error":
+                raise Exception(action_result.get("message", "Error creating invoice"))
+            reply = f"Invoice created successfully for {result.data.customer_name}."
+            action_data = action_result
+
+        elif result.intent_type == "CHECK_STOCK":
+            stock = await action_service.get_stock(result.data.product_name)
+            reply = (
+                f"You have {stock['stock']} units of {stock['name']} left."
+                if stock["found"]
+                else f"Sorry, I couldn't find {result.data.product_name}."
+            )
+            action_data = stock
+
+        elif result.intent_type == "RECORD_PAYMENT":
+            pay_res = await action_service.record_payment(
+                result.data.customer_name, result.data.amount
+            )
+            if pay_res.get("status") == "error":
+                raise Exception(pay_res.get("message", "Error recording payment"))
+            reply = f"Recorded payment of {result.data.amount} from {result.data.customer_name}."
+            action_data = pay_res
+
+        elif result.intent_type == "UPDATE_INVENTORY":
+            upd_res = await action_service.update_stock(
+                result.data.product_name, result.data.new_stock
+            )
+            if upd_res.get("status") == "error":
+                raise Exception(upd_res.get("message", "Error updating inventory"))
+            reply = upd_res.get("message")
+            action_data = upd_res
+
+        elif result.intent_type == "GENERATE_REPORT":
+            rtat = result.data.report_type.lower()
+            fmt = result.data.format or "excel"
+
+            if "ledger" in rtat:
+                report_type, url = (
+                    "ledger",
+                    (
+                        "/export/overall-ledger-excel"
+                        if fmt == "excel"
+                        else "/export/overall-ledger"
+                    ),
+                )
+            elif "debtor" in rtat or "paisa" in rtat:
+                report_type, url = "debtors", "/export/aging-debtors"
+            else:
+                report_type, url = "inventory", "/export/inventory"
+
+            # Sync for frontend
+            result.data.report_type = report_type
+            result.data.format = fmt
+            reply = f"I've prepared your {report_type} report ({fmt}). You can download it below."
+            action_data = {"report_type": report_type, "format": fmt, "url": url}
+
+        elif result.intent_type == "GENERATE_PAYMENT_LINK":
+            pay_res = await action_service.create_payment_link(
+                result.data.amount,
+                result.data.customer_name,
+                result.data.description,
+            )
+            if pay_res.get("status") == "error":
+                raise Exception(pay_res.get("message", "Error creating link"))
+            reply = f"Payment link for Rs. {result.data.amount} created."
+            action_data = pay_res
+
+        elif result.intent_type == "POST_SOCIAL":
+            result.intent_type = "PREVIEW_SOCIAL"
+            result.response_text = f"I've prepared a draft for your {result.data.platform} post. Please review it below."
+            await session_manager.save_session(session_id, result)
+            return {
+                "status": "pending",
+                "reply": result.response_text,
+                "analysis": result.model_dump(),
+            }
+
+        elif result.intent_type == "PAYMENT_REMINDER":
+            ledger = await action_service.get_customer_ledger(result.data.customer_name)
+            if ledger.get("status") == "error" or not ledger.get("customer"):
+                reply = (
+                    f"Sorry, I couldn't find a record for {result.data.customer_name}."
+                )
+            else:
+                bal = ledger["balance_due"]
+                reply = (
+                    f"Analysis: {ledger['customer']} owes Rs. {bal}."
+                    if bal > 0
+                    else f"{ledger['customer']} has no debt."
+                )
+                action_data = ledger
+
+        else:
+            reply = result.response_text
+
+        # 5. FINAL RESPONSE & CLEANUP
+        await session_manager.clear_session(session_id)
+        final_response = {
+            "status": "success",
+            "reply": reply,
+            "analysis": result.model_dump(),
+        }
+
+        # Inject action_data into analysis data for frontend card rendering
+        if action_data and final_response["analysis"].get("data"):
+            final_response["analysis"]["data"].update(action_data)
+            # Overwrite intent_type if needed (e.g. UPDATE_INVENTORY -> CHECK_STOCK card)
+            if result.intent_type == "UPDATE_INVENTORY":
+                final_response["analysis"]["intent_type"] = "CHECK_STOCK"
+
+        return final_response
+        # DEBUGGING: JSON Response for Success
+        # {
+        #   "status": "success",
+        #   "reply": "Invoice created...",
+        #   "analysis": {
+        #       "internal_thought": "...",
+        #       "intent_type": "CREATE_INVOICE",
+        #       "confidence": 0.95,
+        #       "data": {
+        #           "customer_name": "...",
+        #           "items": [...],
+        #           "amount_paid": ...,
+        #           "invoice_id": "123" // Injected
+        #       },
+        #       "missing_info": [],
+        #       "response_text": "..."
+        #   }
+        # }
+        return final_response
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Action Failed: {str(e)}")
 
 
 """
@@ -133,13 +433,18 @@ async def intent_parser(
         # TRANSCRIPTION AND TRANSLATION OF AUDIO FILE TO TEXT
         with open(temp_path, "rb") as audio_file_object:
             print(f"--- Starting Transcription for {temp_path} ---")
+            # Bytes rather than the file object, so a retried upload isn't empty
+            audio_bytes = audio_file_object.read()
 
             try:
                 # 2. Call Whisper
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file_object,
-                    language="en",
+                transcript = await openai_call(
+                    "whisper.transcribe",
+                    lambda client: client.audio.transcriptions.create(
+                        model="whisper-1",
+                        file=(audio_file.filename, audio_bytes),
+                        language="en",
+                    ),
                 )
                 raw_text = transcript.text.strip()
                 print(f"--- Transcription Success: {raw_text} ---")
@@ -148,245 +453,13 @@ async def intent_parser(
                 print(f"!!! Whisper Error: {str(e)}")
                 raise HTTPException(status_code=500, detail=f"Whisper failed: {str(e)}")
 
-        # CONTEXTUAL PROCESSING
-        existing_memory = session_manager.get_session(session_id)
-        print(
-            f"--- Existing Memory: {existing_memory.model_dump_json() if existing_memory else 'None'} ---"
-        )
-        context = f"Existing Memory: {existing_memory.model_dump_json() if existing_memory else 'None'}. New Voice: {raw_text}"
-
-        # 3. openAI Processing (Handles Local Language Response) (GIVES INTENT)
-        result = await intent_service.parse_message(context, language=user_lang)
-        # The 'result' is a Pydantic object containing 4 parameters:
-        # 1. intent (str): The detected user goal or action.
-        # 2. parameters (dict): Key-value pairs of extracted entities/data.
-        # 2.5 data: optional but contains core for running execution funtions
-        # 3. missing_info (list): A list of strings identifying required fields not yet provided.
-        # 4. response (str): The translated/localized response text for the user.
-        print(f"--- Result: {result.model_dump_json() if result else 'None'} ---")
-
-        # 4. Save or Clear Session (SAVE CONTEXT if THE SYSTEM AS TO ASK FOOLOW-UP QUESTIONS)
-        if result.missing_info:
-            # If data is missing, save state and ask follow-up (SAVE CONTEXT)
-            session_manager.save_session(session_id, result)
-            # DEBUGGING: JSON Response for Missing Info
-            # {
-            #   "status": "pending",
-            #   "reply": "Could you please provide the item names?"
-            # }
-            return {"status": "pending", "reply": result.response_text}
-
-        # ACTION EXECUTION
+        # Memory read -> LLM -> save/clear must not interleave for one session
         try:
-            if not result.data:
-                raise ValueError("Intent data is missing from the response")
-
-            # INTENT TYPE CHECKING
-            if result.intent_type == "CREATE_INVOICE":
-                # VALIDATION CHECK: Ensure mandatory fields are actually there
-                if (
-                    not result.data
-                    or not hasattr(result.data, "customer_name")
-                    or not result.data.customer_name
-                    or not result.data.items
-                ):
-                    print(
-                        f"!!! Validation Error: Incomplete Invoice Data: {result.data}"
-                    )
-                    # DEBUGGING: JSON Response for Validation Error
-                    # {
-                    #   "status": "pending",
-                    #   "reply": "I'm sorry...",
-                    #   "analysis": { ... UserIntent dict ... }
-                    # }
-                    return {
-                        "status": "pending",
-                        "reply": "I'm sorry, I seem to have lost the invoice details. Could you please repeat what you want to bill?",
-                        "analysis": result.model_dump(),
-                    }
-
-                # --- SMART PRICE CHECK LOGIC ---
-                # Check if Paid Amount is explicitly valid or needs clarification "Discount vs Due"
-                # Only check if amount_paid is provided and we can calculate a DB total
-                if (
-                    result.data.amount_paid is not None
-                    and result.data.amount_paid > 0
-                    and not result.data.discount_applied
-                    and not result.data.is_due
-                ):
-                    calc = await action_service.calculate_potential_total(
-                        result.data.items
-                    )
-                    db_total = calc["total"]
-
-                    # If discrepancy exists (Paid provided < DB Total Estimate)
-                    # Allow small margin of error (e.g. 1.0) for float diffs
-                    if db_total > (result.data.amount_paid + 5.0):  # 5rs buffer
-                        # Discrepancy Found!
-                        # We need to ASK the user.
-                        # Update Missing Info to "Clarification"
-                        result.missing_info = ["Clarification: Discount or Due"]
-                        diff_val = db_total - result.data.amount_paid
-                        result.response_text = (
-                            f"The standard price for these items is approx Rs. {db_total}, but you mentioned Rs. {result.data.amount_paid}. "
-                            f"Is the remaining Rs. {diff_val} a Discount or is it Due?"
-                        )
-
-                        # Save session so next reply can answer "It is Due" or "Discount"
-                        session_manager.save_session(session_id, result)
-
-                        # MASK the intent so Frontend doesn't show the Invoice Draft yet
-                        # We make a copy of the dump
-                        analysis_dump = result.model_dump()
-                        analysis_dump["intent_type"] = "CLARIFICATION_NEEDED"
-
-                        return {
-                            "status": "pending",
-                            "reply": result.response_text,
-                            "analysis": analysis_dump,
-                        }
-
-            # 4. ACTION SELECTION & EXECUTION
-            action_data = {}
-            reply = ""
-
-            if result.intent_type == "CREATE_INVOICE":
-                action_result = await action_service.execute_invoice(result.data)
-                if action_result.get("status") == "error":
-                    raise Exception(
-                        action_result.get("message", "Error creating invoice")
-                    )
-                reply = f"Invoice created successfully for {result.data.customer_name}."
-                action_data = action_result
-
-            elif result.intent_type == "CHECK_STOCK":
-                stock = await action_service.get_stock(result.data.product_name)
-                reply = (
-                    f"You have {stock['stock']} units of {stock['name']} left."
-                    if stock["found"]
-                    else f"Sorry, I couldn't find {result.data.product_name}."
-                )
-                action_data = stock
-
-            elif result.intent_type == "RECORD_PAYMENT":
-                pay_res = await action_service.record_payment(
-                    result.data.customer_name, result.data.amount
-                )
-                if pay_res.get("status") == "error":
-                    raise Exception(pay_res.get("message", "Error recording payment"))
-                reply = f"Recorded payment of {result.data.amount} from {result.data.customer_name}."
-                action_data = pay_res
-
-            elif result.intent_type == "UPDATE_INVENTORY":
-                upd_res = await action_service.update_stock(
-                    result.data.product_name, result.data.new_stock
-                )
-                if upd_res.get("status") == "error":
-                    raise Exception(upd_res.get("message", "Error updating inventory"))
-                reply = upd_res.get("message")
-                action_data = upd_res
-
-            elif result.intent_type == "GENERATE_REPORT":
-                rtat = result.data.report_type.lower()
-                fmt = result.data.format or "excel"
-
-                if "ledger" in rtat:
-                    report_type, url = (
-                        "ledger",
-                        (
-                            "/export/overall-ledger-excel"
-                            if fmt == "excel"
-                            else "/export/overall-ledger"
-                        ),
-                    )
-                elif "debtor" in rtat or "paisa" in rtat:
-                    report_type, url = "debtors", "/export/aging-debtors"
-                else:
-                    report_type, url = "inventory", "/export/inventory"
-
-                # Sync for frontend
-                result.data.report_type = report_type
-                result.data.format = fmt
-                reply = f"I've prepared your {report_type} report ({fmt}). You can download it below."
-                action_data = {"report_type": report_type, "format": fmt, "url": url}
-
-            elif result.intent_type == "GENERATE_PAYMENT_LINK":
-                pay_res = await action_service.create_payment_link(
-                    result.data.amount,
-                    result.data.customer_name,
-                    result.data.description,
-                )
-                if pay_res.get("status") == "error":
-                    raise Exception(pay_res.get("message", "Error creating link"))
-                reply = f"Payment link for Rs. {result.data.amount} created."
-                action_data = pay_res
-
-            elif result.intent_type == "POST_SOCIAL":
-                result.intent_type = "PREVIEW_SOCIAL"
-                result.response_text = f"I've prepared a draft for your {result.data.platform} post. Please review it below."
-                session_manager.save_session(session_id, result)
-                return {
-                    "status": "pending",
-                    "reply": result.response_text,
-                    "analysis": result.model_dump(),
-                }
-
-            elif result.intent_type == "PAYMENT_REMINDER":
-                ledger = await action_service.get_customer_ledger(
-                    result.data.customer_name
-                )
-                if ledger.get("status") == "error" or not ledger.get("customer"):
-                    reply = f"Sorry, I couldn't find a record for {result.data.customer_name}."
-                else:
-                    bal = ledger["balance_due"]
-                    reply = (
-                        f"Analysis: {ledger['customer']} owes Rs. {bal}."
-                        if bal > 0
-                        else f"{ledger['customer']} has no debt."
-                    )
-                    action_data = ledger
-
-            else:
-                reply = result.response_text
-
-            # 5. FINAL RESPONSE & CLEANUP
-            session_manager.clear_session(session_id)
-            final_response = {
-                "status": "success",
-                "reply": reply,
-                "analysis": result.model_dump(),
-            }
-
-            # Inject action_data into analysis data for frontend card rendering
-            if action_data and final_response["analysis"].get("data"):
-                final_response["analysis"]["data"].update(action_data)
-                # Overwrite intent_type if needed (e.g. UPDATE_INVENTORY -> CHECK_STOCK card)
-                if result.intent_type == "UPDATE_INVENTORY":
-                    final_response["analysis"]["intent_type"] = "CHECK_STOCK"
-
-            return final_response
-            # DEBUGGING: JSON Response for Success
-            # {
-            #   "status": "success",
-            #   "reply": "Invoice created...",
-            #   "analysis": {
-            #       "internal_thought": "...",
-            #       "intent_type": "CREATE_INVOICE",
-            #       "confidence": 0.95,
-            #       "data": {
-            #           "customer_name": "...",
-            #           "items": [...],
-            #           "amount_paid": ...,
-            #           "invoice_id": "123" // Injected
-            #       },
-            #       "missing_info": [],
-            #       "response_text": "..."
-            #   }
-            # }
-            return final_response
-
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Action Failed: {str(e)}")
+            return await session_executor.run(
+                session_id, _process_voice_intent, session_id, raw_text, user_lang
+            )
+        except KeyBusyError as e:
+            raise HTTPException(status_code=429, detail=str(e))
 
     finally:
         if os.path.exists(temp_path):
@@ -396,9 +469,9 @@ async def intent_parser(
 @app.patch("/invoices/{invoice_id}/confirm")
 async def confirm_invoice(invoice_id: str):
     # Update the status in Supabase
-    supabase.table("invoices").update({"status": "active"}).eq(
-        "id", invoice_id
-    ).execute()
+    await run_query(
+        supabase.table("invoices").update({"status": "active"}).eq("id", invoice_id)
+    )
 
     return {"status": "success", "message": "Invoice is now active and added to ledger"}
 
@@ -417,13 +490,12 @@ async def delete_invoice(invoice_id: str):
         print(f"--- Deleting Invoice: {invoice_id} ---")
 
         # 1. Fetch Invoice Details to reverse the debt!
-        inv_data = getattr(
+        inv_data = await run_query(
             supabase.table("invoices")
             .select("customer_id, total_amount, amount_paid")
             .eq("id", invoice_id)
-            .single(),
-            "execute",
-        )()
+            .single()
+        )
         if inv_data.data:
             cust_id = inv_data.data["customer_id"]
             tot = float(inv_data.data["total_amount"] or 0)
@@ -432,31 +504,17 @@ async def delete_invoice(invoice_id: str):
 
             # Subtract from customer total_debt
             if due_to_reverse != 0:
-                cust_res = getattr(
-                    supabase.table("customers")
-                    .select("total_debt")
-                    .eq("id", cust_id)
-                    .single(),
-                    "execute",
-                )()
-                curr_debt = float(cust_res.data.get("total_debt") or 0)
-                getattr(
-                    supabase.table("customers")
-                    .update({"total_debt": curr_debt - due_to_reverse})
-                    .eq("id", cust_id),
-                    "execute",
-                )()
-                print(
-                    f"DEBUG: Reversed Debt for {cust_id}: {curr_debt} -> {curr_debt - due_to_reverse}"
+                new_debt = await action_service.adjust_customer_debt(
+                    cust_id, -due_to_reverse
                 )
+                print(f"DEBUG: Reversed Debt for {cust_id}: -> {new_debt}")
 
         # 2. Manually delete invoice_items
-        getattr(
-            supabase.table("invoice_items").delete().eq("invoice_id", invoice_id),
-            "execute",
-        )()
+        await run_query(
+            supabase.table("invoice_items").delete().eq("invoice_id", invoice_id)
+        )
 
-        supabase.table("invoices").delete().eq("id", invoice_id).execute()
+        await run_query(supabase.table("invoices").delete().eq("id", invoice_id))
 
         return {"status": "success", "message": "Invoice deleted successfully"}
 
@@ -536,59 +594,34 @@ async def export_aging_debtors():
     )
 
 
-# whatsapp webhook (uses twilio & intent-parser logic)
-@app.post("/whatsapp")
-async def whatsapp_webhook(
-    Body: str = Form(...), From: str = Form(...), _=Depends(verify_twilio)
+async def _log_whatsapp_message(
+    db_session_id: Optional[str], direction: str, content: str, sender: str
 ):
-    # 1. 'Body' is the text message (e.g., "Add 10kg sugar for Rahul")
-    # 2. 'From' is the sender's WhatsApp number, which we use as session_id
-    session_id = From
-    raw_text = Body
-    print(raw_text)
-    # 1.5 LOGGING: Save to Supabase so it shows in Frontend
-    # Remove 'whatsapp:' prefix for cleaner display if desired, or keep it.
-    # The session_id usually comes as 'whatsapp:+91...' matching the 'From' field.
+    """Stores a WhatsApp message in unified_messages and pushes it to live clients"""
+    if not db_session_id:
+        return
     try:
-        # Upsert Session
-        supabase.table("sessions").upsert(
-            {
-                "platform": "whatsapp",
-                "external_id": session_id,
-                "is_bot_active": True,  # Default to true
-                "updated_at": "now()",
-            },
-            on_conflict="platform, external_id",
-        ).execute()
-
-        # Get the integer ID of the session
-        session_res = (
-            supabase.table("sessions")
-            .select("id")
-            .eq("platform", "whatsapp")
-            .eq("external_id", session_id)
-            .single()
-            .execute()
-        )
-        if session_res.data:
-            db_session_id = session_res.data["id"]
-
-            # Log Incoming Message
+        inserted = await run_query(
             supabase.table("unified_messages").insert(
                 {
                     "session_id": db_session_id,
                     "platform": "whatsapp",
-                    "direction": "inbound",
-                    "content": raw_text,
-                    "sender_handle": session_id,
-                    "status": "received",
+                    "direction": direction,
+                    "content": content,
+                    "sender_handle": sender,
+                    "status": "received" if direction == "inbound" else "sent",
                 }
-            ).execute()
+            )
+        )
+        message_hub.publish_rows(inserted.data)
     except Exception as e:
-        print(f"!!! Error logging WhatsApp message to DB: {e}")
+        print(f"!!! Error logging WhatsApp {direction} message to DB: {e}")
 
+
+async def process_whatsapp_message(session_id: str, raw_text: str) -> str:
+    """Runs the intent pipeline for one WhatsApp message and returns the reply text"""
     # 2. Contextual Processing
-    existing_memory = session_manager.get_session(session_id)
+    existing_memory = await session_manager.get_session(session_id)
     context = (
         f"Existing Memory: {existing_memory.model_dump_json() if existing_memory else 'None'}. "
         f"New Voice: {raw_text}"
@@ -596,12 +629,14 @@ async def whatsapp_webhook(
 
     # 3. openAI Processing (Handles Local Language Response)
     # Defaulting to English for WhatsApp for now
-    result = await intent_service.parse_message(context, language="English")
+    result = None if existing_memory else await fast_intent.classify(raw_text)
+    if result is None:
+        result = await intent_service.parse_message(context, language="English")
 
     # 4. Save or Clear Session
     if result.missing_info:
         # If data is missing, save state and ask follow-up
-        session_manager.save_session(session_id, result)
+        await session_manager.save_session(session_id, result)
         reply = result.response_text
     else:
         # If no info is missing, execute the specific action
@@ -670,30 +705,95 @@ async def whatsapp_webhook(
                 reply = result.response_text
 
             # 3. Success & Cleanup
-            session_manager.clear_session(session_id)
+            await session_manager.clear_session(session_id)
 
         except Exception as e:
             reply = f"Action Failed: {str(e)}"
 
-    # 5. Respond back to the user on WhatsApp
-    resp = MessagingResponse()
-    resp.message(reply)
+    return reply
 
-    # 5.5 LOGGING: Save the OUTGOING reply to Supabase
+
+async def reply_to_whatsapp_in_background(
+    session_id: str, raw_text: str, db_session_id: Optional[str]
+):
+    """Ack-first worker job: process the message, then reply via the Twilio API"""
     try:
-        if "db_session_id" in locals():
-            supabase.table("unified_messages").insert(
+        reply = await session_executor.run(
+            session_id, process_whatsapp_message, session_id, raw_text
+        )
+    except KeyBusyError:
+        reply = WHATSAPP_BUSY_REPLY
+    except Exception as e:
+        reply = f"Action Failed: {str(e)}"
+    send_res = await whatsapp_tool.send_message(to_phone=session_id, body=reply)
+    if send_res.get("status") == "error":
+        print(f"!!! Error sending WhatsApp reply: {send_res.get('message')}")
+        return
+    await _log_whatsapp_message(db_session_id, "outbound", reply, "AI Assistant")
+
+
+# whatsapp webhook (uses twilio & intent-parser logic)
+@app.post("/whatsapp")
+async def whatsapp_webhook(
+    Body: str = Form(...), From: str = Form(...), _=Depends(verify_twilio)
+):
+    # 1. 'Body' is the text message (e.g., "Add 10kg sugar for Rahul")
+    # 2. 'From' is the sender's WhatsApp number, which we use as session_id
+    session_id = From
+    raw_text = Body
+    print(raw_text)
+    # 1.5 LOGGING: Save to Supabase so it shows in Frontend
+    # Remove 'whatsapp:' prefix for cleaner display if desired, or keep it.
+    # The session_id usually comes as 'whatsapp:+91...' matching the 'From' field.
+    db_session_id = None
+    try:
+        # Upsert Session (returns the row, so no re-select for its id)
+        session_res = await run_query(
+            supabase.table("sessions").upsert(
                 {
-                    "session_id": db_session_id,
                     "platform": "whatsapp",
-                    "direction": "outbound",
-                    "content": reply,
-                    "sender_handle": "AI Assistant",
-                    "status": "sent",
-                }
-            ).execute()
+                    "external_id": session_id,
+                    "is_bot_active": True,  # Default to true
+                    "updated_at": "now()",
+                },
+                on_conflict="platform, external_id",
+            )
+        )
+        if session_res.data:
+            db_session_id = session_res.data[0]["id"]
     except Exception as e:
-        print(f"!!! Error logging WhatsApp reply to DB: {e}")
+        print(f"!!! Error logging WhatsApp message to DB: {e}")
+
+    # Log Incoming Message
+    await _log_whatsapp_message(db_session_id, "inbound", raw_text, session_id)
+
+    # Ack-first: hand the slow part (LLM + action) to a worker and answer
+    # Twilio right away with an empty TwiML; the reply goes out via the API.
+    # When the queue is full we fall through and answer inline instead.
+    if WHATSAPP_ACK_FIRST:
+        try:
+            whatsapp_queue.submit(
+                reply_to_whatsapp_in_background, session_id, raw_text, db_session_id
+            )
+            return Response(
+                content=str(MessagingResponse()), media_type="application/xml"
+            )
+        except asyncio.QueueFull:
+            print("⚠️ [/whatsapp] Work queue full, replying inline")
+
+    try:
+        reply = await session_executor.run(
+            session_id, process_whatsapp_message, session_id, raw_text
+        )
+    except KeyBusyError:
+        reply = WHATSAPP_BUSY_REPLY
+
+    # 5. Respond back to the user on WhatsApp
+    resp = MessagingResponse()
+    resp.message(reply)
+
+    # 5.5 LOGGING: Save the OUTGOING reply to Supabase
+    await _log_whatsapp_message(db_session_id, "outbound", reply, "AI Assistant")
 
     return Response(content=str(resp), media_type="application/xml")
 
@@ -760,9 +860,8 @@ async def create_draft(prompt: str = Query(...), user_id: str = Query(...)):
 
     # 3. Save it to Supabase so the Frontend can load it
     print("💾 [/workflow/draft] Inserting into Supabase workflow_blueprints table")
-    result = (
-        supabase.table("workflow_blueprints")
-        .insert(
+    result = await run_query(
+        supabase.table("workflow_blueprints").insert(
             {
                 "user_id": user_id,
                 "name": f"AI Draft: {prompt[:20]}...",
@@ -772,7 +871,6 @@ async def create_draft(prompt: str = Query(...), user_id: str = Query(...)):
                 "is_active": False,  # User needs to review it first!
             }
         )
-        .execute()
     )
 
     workflow_id = result.data[0]["id"]
@@ -793,6 +891,8 @@ async def execute_workflow_endpoint(blueprint: WorkflowBlueprint, payload: dict
     2. Packages the blueprint and payload into an Inngest Event.
     3. Handoff: `inngest_client.send` puts this on a queue. The `execute_workflow` function
        in Python then takes over asynchronously.
+       (Blueprints with executor="local", or WORKFLOW_EXECUTOR=local, run on the
+       in-process worker pool instead.)
 
     RETURNS:
     - run_id: Used for monitoring progress in real-time.
@@ -805,19 +905,13 @@ async def execute_workflow_endpoint(blueprint: WorkflowBlueprint, payload: dict
     run_id = str(uuid.uuid4())
     print(f"🆔 [/workflow/execute] Generated run_id: {run_id}")
 
-    # Send event to Inngest to start the workflow
+    # Send event to Inngest (or the local executor) to start the workflow
     # This triggers the 'execute_workflow' logic in backend/app/workflows/engine.py
-    print("📡 [/workflow/execute] Sending event to Inngest")
-    await inngest_client.send(
-        Event(
-            name="workflow/run_requested",
-            data={
-                "blueprint": blueprint.model_dump(mode="json"),
-                "payload": payload or {},
-            },
-        )
+    print("📡 [/workflow/execute] Dispatching workflow run")
+    await dispatch_workflow_run(
+        blueprint.model_dump(mode="json"), payload or {}, run_id=run_id
     )
-    print("✅ [/workflow/execute] Event sent to Inngest")
+    print("✅ [/workflow/execute] Workflow run dispatched")
     print("=" * 60 + "\n")
 
     return {"status": "success", "run_id": run_id}
@@ -831,9 +925,11 @@ async def stop_workflow(run_id: str):
     print(f"🛑 [/workflow/stop] Request to stop run_id: {run_id}")
 
     # Update status to cancelled in Supabase
-    supabase.table("workflow_logs").update({"status": "cancelled"}).eq(
-        "run_id", run_id
-    ).execute()
+    await run_query(
+        supabase.table("workflow_logs")
+        .update({"status": "cancelled"})
+        .eq("run_id", run_id)
+    )
 
     print(f"✅ [/workflow/stop] Stop signal sent for run_id: {run_id}")
     return {"status": "success", "message": "Workflow stop signal sent"}
@@ -853,12 +949,11 @@ async def list_workflows(user_id: str = Query(...)):
     print(f"\n📋 [/workflows] Listing workflows for user: {user_id}")
 
     try:
-        result = (
+        result = await run_query(
             supabase.table("workflow_blueprints")
             .select("id, name, created_at, is_active, nodes, edges")
             .eq("user_id", user_id)
             .order("created_at", desc=True)
-            .execute()
         )
 
         return {"status": "success", "workflows": result.data}
@@ -876,13 +971,12 @@ async def get_workflow(workflow_id: str, user_id: str = Query(...)):
     RETURNS: The single workflow object.
     """
     try:
-        result = (
+        result = await run_query(
             supabase.table("workflow_blueprints")
             .select("*")
             .eq("id", workflow_id)
             .eq("user_id", user_id)
             .single()
-            .execute()
         )
 
         return {"status": "success", "workflow": result.data}
@@ -900,9 +994,13 @@ async def delete_workflow(workflow_id: str, user_id: str = Query(...)):
 
     try:
         # Perform Delete
-        supabase.table("workflow_blueprints").delete().eq("id", workflow_id).eq(
-            "user_id", user_id
-        ).execute()
+        await run_query(
+            supabase.table("workflow_blueprints")
+            .delete()
+            .eq("id", workflow_id)
+            .eq("user_id", user_id)
+        )
+        trigger_index.remove(workflow_id)
 
         return {"status": "success", "message": "Workflow deleted successfully"}
 
@@ -946,9 +1044,14 @@ async def save_workflow(
             "is_active": True,
         }
 
-        result = supabase.table("workflow_blueprints").insert(blueprint_data).execute()
+        result = await run_query(
+            supabase.table("workflow_blueprints").insert(blueprint_data)
+        )
         workflow_id = result.data[0]["id"]
 
+        # Active immediately: make it visible to webhook dispatch without a reload
+        trigger_index.upsert(result.data[0])
+
         return {
             "status": "success",
             "workflow_id": workflow_id,
@@ -970,8 +1073,8 @@ async def generic_webhook_dispatcher(service_name: str, request: Request):
 
     LOGIC:
     1. DECOUPLING: We don't write service-specific code here. Instead...
-    2. TRIGGER LOOKUP: We look in our DB for ANY active workflow whose first node (trigger)
-       matches this `service_name`.
+    2. TRIGGER LOOKUP: We look in the in-memory trigger index for ANY active workflow whose
+       trigger node matches this `service_name` (falls back to a JSONB query in our DB).
     3. ASYNC HANDOFF: For every match, we fire an Inngest event.
 
     WHY THIS IS COOL:
@@ -984,25 +1087,26 @@ async def generic_webhook_dispatcher(service_name: str, request: Request):
     payload = await request.json()
 
     # 2. Find all active workflows that start with this service
-    # This queries supabase for: is_active=True AND first_node_type == service_name
-    blueprints = get_active_workflows_by_trigger(service_name)
+    # O(1) lookup in the trigger index (is_active=True AND trigger service == service_name)
+    blueprints = await trigger_index.lookup(service_name)
 
     if not blueprints:
         return {"status": "ignored", "reason": f"No active workflow for {service_name}"}
 
-    # 3. For every matching workflow, tell Inngest to START
-    for blueprint in blueprints:
-        await inngest_client.send(
-            Event(
-                name="workflow/run_requested",
-                data={
-                    "blueprint": blueprint,
-                    "payload": payload,  # This becomes 'trigger_data' in our engine
-                },
-            )
-        )
+    # 3. Tell Inngest (or the local executor) to START every matching workflow,
+    # all in one send. payload becomes 'trigger_data' in our engine.
+    # A redelivered webhook (same Idempotency-Key header, or with
+    # WEBHOOK_DEDUPE_PAYLOADS the same payload) doesn't start them again.
+    key = request.headers.get("Idempotency-Key")
+    run_ids = await dispatch_workflow_runs(
+        [
+            (blueprint, payload, key) if key else (blueprint, payload)
+            for blueprint in blueprints
+        ],
+        dedupe=bool(key) or WEBHOOK_DEDUPE_PAYLOADS,
+    )
 
-    return {"status": "dispatched", "count": len(blueprints)}
+    return {"status": "dispatched", "count": len(run_ids)}
 
 
 # Serve Inngest functions properly
@@ -1033,20 +1137,22 @@ async def confirm_social_post(request: Request):
 
         # Save to DB (Persistent Approval History)
         try:
-            action_service.supabase.table("social_posts").insert(
-                {
-                    "platform": platform,
-                    "content": content,
-                    "image_url": image_url,
-                    "status": "published",
-                    "external_id": post_data.get("url"),
-                }
-            ).execute()
+            await run_query(
+                action_service.supabase.table("social_posts").insert(
+                    {
+                        "platform": platform,
+                        "content": content,
+                        "image_url": image_url,
+                        "status": "published",
+                        "external_id": post_data.get("url"),
+                    }
+                )
+            )
         except Exception as db_err:
             print(f"!!! Error logging social post: {db_err}")
 
         # Cleanup Session
-        session_manager.clear_session(session_id)
+        await session_manager.clear_session(session_id)
 
         return {
             "status": "success",
@@ -1065,7 +1171,7 @@ async def reject_social_post(request: Request):
         body = await request.json()
         session_id = body.get("session_id")
         if session_id:
-            session_manager.clear_session(session_id)
+            await session_manager.clear_session(session_id)
         return {"status": "success", "message": "Social post draft rejected."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
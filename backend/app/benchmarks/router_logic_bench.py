@@ -0,0 +1,78 @@
+"""
+Microbenchmark for router evaluation (lib/router_logic).
+
+Compares evaluating a typical auto-reply router per message by compiling its
+routes every call (find_next_step) against a router compiled once
+(compile_routes(...).select), which is what the workflow engine does.
+
+Run from backend/app:
+    python -m benchmarks.router_logic_bench [iterations]
+"""
+
+import sys
+import timeit
+
+from lib.router_logic import compile_routes, find_next_step
+
+ROUTES = [
+    {
+        "condition": {
+            "variable": "{{trigger_data.text}}",
+            "operator": "matches",
+            "value": r"(?i)\b(refund|complaint|broken)\b",
+        },
+        "next_node_id": "escalate",
+    },
+    {
+        "condition": {
+            "variable": "{{trigger_data.text}}",
+            "operator": "contains",
+            "value": "PRICE",
+        },
+        "next_node_id": "send_catalog",
+    },
+    {
+        "condition": {
+            "variable": "{{gpt_1.sentiment_score}}",
+            "operator": "<",
+            "value": 0.3,
+        },
+        "next_node_id": "human_review",
+    },
+    {
+        "condition": {
+            "variable": "{{trigger_data.platform}}",
+            "operator": "==",
+            "value": "bluesky",
+        },
+        "next_node_id": "bluesky_reply",
+    },
+    {"next_node_id": "default_reply"},
+]
+
+CONTEXT = {
+    "trigger_data": {
+        "text": "hey, do you have the red paint bucket in stock?",
+        "platform": "pixelfed",
+        "author": "someone",
+    },
+    "gpt_1": {"sentiment_score": "0.82"},
+}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    router = compile_routes(ROUTES)
+    assert router.select(CONTEXT) == find_next_step(ROUTES, CONTEXT) == "default_reply"
+
+    per_call = timeit.timeit(lambda: find_next_step(ROUTES, CONTEXT), number=iterations)
+    compiled = timeit.timeit(lambda: router.select(CONTEXT), number=iterations)
+
+    print(f"Router with {len(ROUTES)} routes, {iterations} evaluations")
+    print(f"  compile per evaluation : {per_call / iterations * 1e6:8.2f} us/eval")
+    print(f"  compiled once          : {compiled / iterations * 1e6:8.2f} us/eval")
+    print(f"  speedup                : {per_call / compiled:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -140,4 +140,271 @@ CREATE TABLE public.workflow_logs (
   completed_at timestamp with time zone,
   CONSTRAINT workflow_logs_pkey PRIMARY KEY (id),
   CONSTRAINT workflow_logs_workflow_id_fkey FOREIGN KEY (workflow_id) REFERENCES public.workflow_blueprints(id)
-);
\ No newline at end of file
+);
+-- Merges changed node states into workflow_logs.step_results (used by the engine's log writer)
+CREATE OR REPLACE FUNCTION public.merge_workflow_step_results(p_run_id text, p_patch jsonb)
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE public.workflow_logs
+  SET step_results = COALESCE(step_results, '{}'::jsonb) || p_patch
+  WHERE run_id = p_run_id;
+$$;
+
+-- Speeds up the trigger lookup fallback (nodes @> '[{"type": "trigger", ...}]')
+CREATE INDEX IF NOT EXISTS workflow_blueprints_nodes_gin
+  ON public.workflow_blueprints USING gin (nodes jsonb_path_ops);
+
+-- Commits an invoice in one transaction (used by ActionService.execute_invoice):
+-- customer lookup/insert, invoice header, line items, optional payment, an atomic
+-- total_debt increment and a bulk stock decrement for items named like a product.
+-- p_items: [{"description": text, "quantity": numeric, "unit_price": numeric}, ...]
+CREATE OR REPLACE FUNCTION public.commit_invoice(
+  p_customer_name text,
+  p_total_amount numeric,
+  p_amount_paid numeric,
+  p_payment_amount numeric,
+  p_items jsonb
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_customer_id uuid;
+  v_invoice_id uuid;
+  v_balance_change numeric := COALESCE(p_total_amount, 0) - COALESCE(p_payment_amount, 0);
+  v_stock jsonb;
+  v_full_name text;
+  v_total_debt numeric;
+BEGIN
+  SELECT id INTO v_customer_id
+  FROM public.customers
+  WHERE full_name ILIKE '%' || p_customer_name || '%'
+  LIMIT 1;
+
+  IF v_customer_id IS NULL THEN
+    INSERT INTO public.customers (full_name)
+    VALUES (p_customer_name)
+    RETURNING id INTO v_customer_id;
+  END IF;
+
+  INSERT INTO public.invoices (customer_id, status, total_amount, amount_paid)
+  VALUES (v_customer_id, 'pending', p_total_amount, p_amount_paid)
+  RETURNING id INTO v_invoice_id;
+
+  INSERT INTO public.invoice_items (invoice_id, description, quantity, unit_price)
+  SELECT v_invoice_id,
+         item->>'description',
+         (item->>'quantity')::numeric,
+         (item->>'unit_price')::numeric
+  FROM jsonb_array_elements(p_items) AS item;
+
+  IF COALESCE(p_payment_amount, 0) > 0 THEN
+    INSERT INTO public.payments (customer_id, amount_received, payment_mode)
+    VALUES (v_customer_id, p_payment_amount, 'Cash');
+  END IF;
+
+  IF v_balance_change <> 0 THEN
+    UPDATE public.customers
+    SET total_debt = COALESCE(total_debt, 0) + v_balance_change
+    WHERE id = v_customer_id;
+  END IF;
+
+  WITH wanted AS (
+    SELECT lower(btrim(item->>'description')) AS name,
+           SUM((item->>'quantity')::numeric) AS quantity
+    FROM jsonb_array_elements(p_items) AS item
+    GROUP BY 1
+  ), updated AS (
+    UPDATE public.products p
+    SET current_stock = GREATEST(0, COALESCE(p.current_stock, 0) - w.quantity)
+    FROM wanted w
+    WHERE lower(p.name) = w.name
+    RETURNING p.id, p.current_stock
+  )
+  SELECT COALESCE(jsonb_agg(jsonb_build_object('id', id, 'current_stock', current_stock)), '[]'::jsonb)
+  INTO v_stock
+  FROM updated;
+
+  SELECT full_name, COALESCE(total_debt, 0) INTO v_full_name, v_total_debt
+  FROM public.customers
+  WHERE id = v_customer_id;
+
+  RETURN jsonb_build_object(
+    'invoice_id', v_invoice_id,
+    'customer_id', v_customer_id,
+    'full_name', v_full_name,
+    'total_debt', v_total_debt,
+    'stock', v_stock
+  );
+END;
+$$;
+
+-- Atomically adds p_delta to a customer's total_debt and returns the new balance
+-- (used by ActionService.adjust_customer_debt for payments, invoices and deletes)
+CREATE OR REPLACE FUNCTION public.increment_customer_debt(p_customer_id uuid, p_delta numeric)
+RETURNS numeric
+LANGUAGE sql
+AS $$
+  UPDATE public.customers
+  SET total_debt = COALESCE(total_debt, 0) + p_delta
+  WHERE id = p_customer_id
+  RETURNING total_debt;
+$$;
+
+-- Customers whose stored total_debt differs from SUM(invoices) - SUM(payments)
+-- (used by ActionService.reconcile_customer_debts)
+CREATE OR REPLACE FUNCTION public.customer_debt_drift()
+RETURNS TABLE (
+  customer_id uuid,
+  full_name text,
+  stored_debt numeric,
+  computed_debt numeric,
+  drift numeric
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT c.id,
+         c.full_name,
+         COALESCE(c.total_debt, 0),
+         COALESCE(i.billed, 0) - COALESCE(p.paid, 0),
+         COALESCE(c.total_debt, 0) - (COALESCE(i.billed, 0) - COALESCE(p.paid, 0))
+  FROM public.customers c
+  LEFT JOIN (
+    SELECT customer_id, SUM(total_amount) AS billed
+    FROM public.invoices
+    GROUP BY customer_id
+  ) i ON i.customer_id = c.id
+  LEFT JOIN (
+    SELECT customer_id, SUM(amount_received) AS paid
+    FROM public.payments
+    GROUP BY customer_id
+  ) p ON p.customer_id = c.id
+  WHERE COALESCE(c.total_debt, 0) <> COALESCE(i.billed, 0) - COALESCE(p.paid, 0);
+$$;
+
+-- Overall ledger totals for the dashboard (read by services.ledger_aggregates).
+-- One row, kept current by triggers on invoices and payments, so reading the
+-- totals doesn't scan either table. Every invoice/payment write also updates
+-- this row, which serializes those writes on it (fine at this write rate).
+CREATE TABLE IF NOT EXISTS public.ledger_summary (
+  id boolean NOT NULL DEFAULT true CHECK (id),
+  total_billed numeric NOT NULL DEFAULT 0,
+  total_paid numeric NOT NULL DEFAULT 0,
+  updated_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT ledger_summary_pkey PRIMARY KEY (id)
+);
+
+CREATE OR REPLACE FUNCTION public.ledger_summary_apply()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_billed numeric := 0;
+  v_paid numeric := 0;
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    IF TG_TABLE_NAME = 'invoices' THEN
+      v_billed := v_billed + COALESCE(NEW.total_amount, 0);
+    ELSE
+      v_paid := v_paid + COALESCE(NEW.amount_received, 0);
+    END IF;
+  END IF;
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    IF TG_TABLE_NAME = 'invoices' THEN
+      v_billed := v_billed - COALESCE(OLD.total_amount, 0);
+    ELSE
+      v_paid := v_paid - COALESCE(OLD.amount_received, 0);
+    END IF;
+  END IF;
+
+  IF v_billed <> 0 OR v_paid <> 0 THEN
+    UPDATE public.ledger_summary
+    SET total_billed = total_billed + v_billed,
+        total_paid = total_paid + v_paid,
+        updated_at = now()
+    WHERE id;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Install the triggers and seed the row atomically, so no write is counted
+-- twice or missed. TRUNCATE bypasses the triggers: re-run the seed after one.
+BEGIN;
+LOCK TABLE public.invoices, public.payments IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS invoices_ledger_summary ON public.invoices;
+CREATE TRIGGER invoices_ledger_summary
+  AFTER INSERT OR DELETE OR UPDATE OF total_amount ON public.invoices
+  FOR EACH ROW EXECUTE FUNCTION public.ledger_summary_apply();
+
+DROP TRIGGER IF EXISTS payments_ledger_summary ON public.payments;
+CREATE TRIGGER payments_ledger_summary
+  AFTER INSERT OR DELETE OR UPDATE OF amount_received ON public.payments
+  FOR EACH ROW EXECUTE FUNCTION public.ledger_summary_apply();
+
+INSERT INTO public.ledger_summary (id, total_billed, total_paid)
+SELECT true,
+       (SELECT COALESCE(SUM(total_amount), 0) FROM public.invoices),
+       (SELECT COALESCE(SUM(amount_received), 0) FROM public.payments)
+ON CONFLICT (id) DO UPDATE
+SET total_billed = EXCLUDED.total_billed,
+    total_paid = EXCLUDED.total_paid,
+    updated_at = now();
+COMMIT;
+
+-- Debtor list for the dashboard: walks only customers with a positive balance
+CREATE INDEX IF NOT EXISTS customers_debtors_idx
+  ON public.customers (total_debt DESC) WHERE total_debt > 0;
+
+-- Message counts per time bucket and platform (used by services.engagement_service)
+-- p_unit is a date_trunc unit: 'hour', 'day' or 'week'. Buckets are in UTC.
+CREATE OR REPLACE FUNCTION public.engagement_histogram(p_since timestamptz, p_unit text)
+RETURNS TABLE (bucket timestamp, platform text, count bigint)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT date_trunc(p_unit, m.created_at AT TIME ZONE 'UTC') AS bucket,
+         m.platform,
+         COUNT(*) AS count
+  FROM public.unified_messages m
+  WHERE m.created_at >= p_since
+  GROUP BY 1, 2;
+$$;
+
+CREATE INDEX IF NOT EXISTS unified_messages_created_at_idx
+  ON public.unified_messages (created_at);
+
+-- Keyset pagination of the inbox and of per-session history (routers/messages.py)
+CREATE INDEX IF NOT EXISTS sessions_updated_at_id_idx
+  ON public.sessions (updated_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS unified_messages_session_created_at_idx
+  ON public.unified_messages (session_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS unified_messages_platform_created_at_idx
+  ON public.unified_messages (platform, created_at, id);
+
+-- Per-account sync high-water marks (used by services.sync_cursors)
+CREATE TABLE IF NOT EXISTS public.sync_cursors (
+  platform text NOT NULL,
+  account text NOT NULL,
+  cursor jsonb NOT NULL DEFAULT '{}'::jsonb,
+  updated_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT sync_cursors_pkey PRIMARY KEY (platform, account)
+);
+
+-- Batched dedup of synced messages (services.sync_service._ingest_batch)
+CREATE INDEX IF NOT EXISTS unified_messages_external_id_idx
+  ON public.unified_messages (external_id);
+
+-- Draft intents per conversation, shared by all workers (services.session_store)
+CREATE TABLE IF NOT EXISTS public.intent_sessions (
+  session_id text NOT NULL,
+  payload text NOT NULL,
+  expires_at timestamp with time zone NOT NULL,
+  updated_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT intent_sessions_pkey PRIMARY KEY (session_id)
+);
+CREATE INDEX IF NOT EXISTS intent_sessions_expires_at_idx
+  ON public.intent_sessions (expires_at);
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import logging
 from typing import Any, Dict
@@ -71,12 +72,16 @@ class BlueskyTool(BaseTool):
         """List DM conversations"""
         try:
             chat_client = self.client.with_bsky_chat_proxy()
-            res = chat_client.chat.bsky.convo.list_convos(params)
+            # atproto is synchronous: keep the HTTP call off the event loop
+            res = await asyncio.to_thread(
+                chat_client.chat.bsky.convo.list_convos, params
+            )
             convos = []
             for convo in res.convos:
                 convos.append(
                     {
                         "id": convo.id,
+                        "rev": convo.rev,
                         "members": [m.handle for m in convo.members],
                         "unread_count": convo.unread_count,
                         "last_message": convo.last_message.text
@@ -94,10 +99,13 @@ class BlueskyTool(BaseTool):
         limit = params.get("limit", 20)
         if not convo_id:
             return {"status": "error", "message": "Missing convo_id"}
+        query = {"convo_id": convo_id, "limit": limit}
+        if params.get("cursor"):
+            query["cursor"] = params["cursor"]  # Older page, from a previous call
         try:
             chat_client = self.client.with_bsky_chat_proxy()
-            res = chat_client.chat.bsky.convo.get_messages(
-                {"convo_id": convo_id, "limit": limit}
+            res = await asyncio.to_thread(
+                chat_client.chat.bsky.convo.get_messages, query
             )
             messages = []
             for msg in res.messages:
@@ -113,7 +121,7 @@ class BlueskyTool(BaseTool):
                             "created_at": msg.sent_at,
                         }
                     )
-            return {"status": "success", "messages": messages}
+            return {"status": "success", "messages": messages, "cursor": res.cursor}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
@@ -5,9 +5,9 @@ Allows workflows to query user data and use results in automation.
 Example: Query unpaid users, then send reminders.
 """
 
-from supabase import create_client
 import os
 from typing import Dict, Any, List, Optional
+from lib.supabase_lib import get_supabase_client, run_query
 from .base import BaseTool
 
 
@@ -21,7 +21,7 @@ class DatabaseTool(BaseTool):
             print("⚠️ [DatabaseTool] Warning: Supabase credentials not set")
             self.supabase = None
         else:
-            self.supabase = create_client(supabase_url, supabase_key)
+            self.supabase = get_supabase_client()
             print("✅ [DatabaseTool] Initialized")
 
     @property
@@ -91,7 +91,7 @@ class DatabaseTool(BaseTool):
             query = query.limit(limit)
 
             # Execute
-            result = query.execute()
+            result = await run_query(query)
 
             print(f"✅ [DatabaseTool] Found {len(result.data)} rows")
             return result.data
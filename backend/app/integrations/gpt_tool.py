@@ -5,8 +5,8 @@ Allows workflows to analyze, summarize, and format data using AI
 before posting to social media or sending messages.
 """
 
-from openai import AsyncOpenAI
 import os
+from lib.openai_client import openai_call
 from typing import Dict, Any, Optional
 
 
@@ -23,12 +23,11 @@ DEFAULT_PERSONAS = {
 
 class GPTTool:
     def __init__(self):
-        """Initialize OpenAI client for GPT processing."""
+        """Check OpenAI credentials; requests go through the shared client (lib.openai_client)."""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
 
-        self.client = AsyncOpenAI(api_key=api_key)
         print("✅ [GPTTool] Initialized")
 
     @property
@@ -124,13 +123,16 @@ class GPTTool:
             print(f"💬 [GPTTool] System message: {system_message[:100]}...")
 
             # Call GPT
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": str(input_data)},
-                ],
-                temperature=temperature,
+            response = await openai_call(
+                "gpt_tool.process_text",
+                lambda client: client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": str(input_data)},
+                    ],
+                    temperature=temperature,
+                ),
             )
 
             processed_text = response.choices[0].message.content
@@ -3,7 +3,8 @@ import httpx
 import logging
 from typing import Any, Dict
 from .base import BaseTool
-from lib.supabase_lib import supabase
+from lib.supabase_lib import supabase, run_query
+from lib.message_hub import message_hub
 
 logger = logging.getLogger(__name__)
 
@@ -98,26 +99,28 @@ class InstagramTool(BaseTool):
                 if resp.status_code == 200:
                     # Sync to Unified Messages (Outbound)
                     try:
-                        session_res = (
+                        session_res = await run_query(
                             supabase.table("sessions")
                             .select("id")
                             .eq("platform", "instagram")
                             .eq("external_id", recipient_id)
                             .single()
-                            .execute()
                         )
                         if session_res.data:
                             session_id = session_res.data["id"]
-                            supabase.table("unified_messages").insert(
-                                {
-                                    "session_id": session_id,
-                                    "platform": "instagram",
-                                    "direction": "outbound",
-                                    "content": text,
-                                    "sender_handle": "AI Assistant",
-                                    "status": "sent",
-                                }
-                            ).execute()
+                            inserted = await run_query(
+                                supabase.table("unified_messages").insert(
+                                    {
+                                        "session_id": session_id,
+                                        "platform": "instagram",
+                                        "direction": "outbound",
+                                        "content": text,
+                                        "sender_handle": "AI Assistant",
+                                        "status": "sent",
+                                    }
+                                )
+                            )
+                            message_hub.publish_rows(inserted.data)
                     except Exception as log_e:
                         logger.error(f"Failed to sync outbound message: {log_e}")
 
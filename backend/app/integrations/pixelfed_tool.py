@@ -225,16 +225,22 @@ class PixelfedTool(BaseTool):
 
         Params:
         - limit (int): Number of notifications to fetch (default: 20)
+        - since_id (str): Only return notifications newer than this id
+        - max_id (str): Only return notifications older than this id (paging back)
         """
         limit = params.get("limit", 20)
         headers = {"Authorization": f"Bearer {self.access_token}"}
+        query = {"limit": limit}
+        for key in ("since_id", "max_id"):
+            if params.get(key):
+                query[key] = params[key]
 
         try:
             async with httpx.AsyncClient() as client:
                 resp = await client.get(
                     f"{self.api_base}/notifications",
                     headers=headers,
-                    params={"limit": limit},
+                    params=query,
                 )
 
                 if resp.status_code == 200:
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from datetime import datetime
 from twilio.rest import Client
@@ -102,8 +103,11 @@ class WhatsAppTool(BaseTool):
             )
 
         try:
-            message = self.client.messages.create(
-                from_=from_num, body=message_body, to=to_num
+            message = await asyncio.to_thread(
+                self.client.messages.create,
+                from_=from_num,
+                body=message_body,
+                to=to_num,
             )
             return {
                 "status": "success",
@@ -154,7 +158,10 @@ class WhatsAppTool(BaseTool):
             )
 
         try:
-            message = self.client.messages.create(from_=from_num, body=body, to=to_num)
+            # The Twilio client is synchronous: keep the API call off the event loop
+            message = await asyncio.to_thread(
+                self.client.messages.create, from_=from_num, body=body, to=to_num
+            )
             return {
                 "status": "success",
                 "sid": message.sid,
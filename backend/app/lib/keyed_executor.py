@@ -0,0 +1,76 @@
+"""
+Per-key serialized execution.
+
+Conversational handlers read a session's memory, call the LLM and then save or
+clear that memory. Two messages from the same sender handled at once would
+race and overwrite each other's draft, so work for one key (session id) runs
+strictly one at a time, in arrival order, while different keys run fully in
+parallel. At most `max_pending` jobs may wait per key; more raise KeyBusyError.
+"""
+
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict
+
+
+class KeyBusyError(Exception):
+    pass
+
+
+class KeyedExecutor:
+    def __init__(self, name: str, max_pending: int = 5):
+        self.name = name
+        self.max_pending = max_pending
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pending: Dict[str, int] = {}  # running + waiting jobs per key
+        self.stats = {
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "max_wait_ms": 0.0,
+            "total_wait_ms": 0.0,
+        }
+
+    async def run(self, key: str, handler: Callable[..., Any], *args: Any) -> Any:
+        """Runs handler(*args) once earlier work for `key` has finished."""
+        pending = self._pending.get(key, 0)
+        if pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise KeyBusyError(
+                f"[{self.name}] {pending} requests already pending for {key}"
+            )
+        self._pending[key] = pending + 1
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        queued_at = time.perf_counter()
+        try:
+            async with lock:  # asyncio.Lock wakes waiters in FIFO order
+                waited_ms = (time.perf_counter() - queued_at) * 1000
+                self.stats["total_wait_ms"] += waited_ms
+                self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], waited_ms)
+                try:
+                    result = handler(*args)
+                    if inspect.isawaitable(result):
+                        result = await result
+                except Exception:
+                    self.stats["failed"] += 1
+                    raise
+                self.stats["completed"] += 1
+                return result
+        finally:
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                # Last job for this key: drop its state so idle keys cost nothing
+                del self._pending[key]
+                del self._locks[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        finished = self.stats["completed"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "avg_wait_ms": (
+                round(self.stats["total_wait_ms"] / finished, 2) if finished else 0.0
+            ),
+            "active_keys": len(self._locks),
+            "pending": sum(self._pending.values()),
+        }
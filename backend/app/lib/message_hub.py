@@ -0,0 +1,120 @@
+"""
+In-process pub/sub for new unified_messages rows.
+
+Ingestion paths (SyncService, the /whatsapp webhook, manual sends) publish
+each row they insert; /api/messages/stream forwards them to subscribers
+over SSE so the inbox doesn't have to poll the database.
+
+Every subscriber gets its own bounded queue. publish() never blocks: when a
+slow client's queue is full the oldest event is dropped and the client is
+told how many it missed, so it can re-fetch via the cursor endpoints.
+Events only reach subscribers connected to the same worker process.
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, Optional, Set
+
+MESSAGE_HUB_QUEUE_SIZE = int(os.getenv("MESSAGE_HUB_QUEUE_SIZE", "100"))
+MESSAGE_HUB_MAX_SUBSCRIBERS = int(os.getenv("MESSAGE_HUB_MAX_SUBSCRIBERS", "200"))
+
+
+class HubFullError(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        platform: Optional[str] = None,
+        queue_size: int = MESSAGE_HUB_QUEUE_SIZE,
+    ):
+        self.session_id = session_id
+        self.platform = platform
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0  # Events lost since the client was last told
+
+    def matches(self, message: Dict[str, Any]) -> bool:
+        if self.session_id and str(message.get("session_id")) != self.session_id:
+            return False
+        if self.platform and message.get("platform") != self.platform:
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Enqueues without blocking, dropping the oldest event if full."""
+        dropped = False
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            dropped = True
+        self.queue.put_nowait(event)
+        return not dropped
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Next event, or None after `timeout` seconds without one. After events
+        were dropped, a {"type": "dropped", "data": {"count": n}} event comes
+        first.
+        """
+        if self.dropped:
+            count, self.dropped = self.dropped, 0
+            return {"type": "dropped", "data": {"count": count}}
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class MessageHub:
+    def __init__(
+        self,
+        max_subscribers: int = MESSAGE_HUB_MAX_SUBSCRIBERS,
+        queue_size: int = MESSAGE_HUB_QUEUE_SIZE,
+    ):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(
+        self, session_id: Optional[str] = None, platform: Optional[str] = None
+    ) -> Subscription:
+        if len(self._subscribers) >= self.max_subscribers:
+            raise HubFullError(
+                f"Too many live message subscribers ({self.max_subscribers})"
+            )
+        subscription = Subscription(
+            session_id=session_id, platform=platform, queue_size=self.queue_size
+        )
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, message: Optional[Dict[str, Any]]):
+        """Fans a newly stored unified_messages row out to matching subscribers."""
+        if not message:
+            return
+        self.published += 1
+        event = {"type": "message", "data": message}
+        for subscription in list(self._subscribers):
+            if subscription.matches(message) and not subscription.offer(event):
+                self.dropped += 1
+
+    def publish_rows(self, rows):
+        for row in rows or []:
+            self.publish(row)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+message_hub = MessageHub()
@@ -0,0 +1,185 @@
+"""
+Shared async OpenAI client.
+
+Every LLM / Whisper call goes through one AsyncOpenAI instance so the event
+loop is never blocked by a completion, all callers share one keep-alive
+connection pool, and at most OPENAI_MAX_CONCURRENCY requests are in flight
+per process. Use `openai_call` around each request: it applies the
+concurrency limit, retries transient failures (connection errors, timeouts,
+429 and 5xx) with jittered exponential backoff, and records metrics.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+import openai
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_POOL_SIZE = int(os.environ.get("OPENAI_POOL_SIZE", str(OPENAI_MAX_CONCURRENCY)))
+OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", "30"))
+OPENAI_CONNECT_TIMEOUT = float(os.environ.get("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_ATTEMPTS = int(os.environ.get("OPENAI_MAX_ATTEMPTS", "3"))
+OPENAI_RETRY_BASE_SECONDS = float(os.environ.get("OPENAI_RETRY_BASE_SECONDS", "0.5"))
+OPENAI_SLOW_CALL_MS = float(os.environ.get("OPENAI_SLOW_CALL_MS", "5000"))
+
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMMetrics:
+    """Counters for calls made through openai_call."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.slow = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.by_operation: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, operation: str, elapsed_ms: float, failed: bool):
+        self.calls += 1
+        self.errors += failed
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        stats = self.by_operation.setdefault(
+            operation, {"calls": 0, "errors": 0, "total_ms": 0.0}
+        )
+        stats["calls"] += 1
+        stats["errors"] += failed
+        stats["total_ms"] += elapsed_ms
+        if elapsed_ms >= OPENAI_SLOW_CALL_MS:
+            self.slow += 1
+            logger.warning(f"Slow OpenAI call: {operation} took {elapsed_ms:.0f}ms")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "slow": self.slow,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "by_operation": {
+                operation: {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "avg_ms": round(stats["total_ms"] / stats["calls"], 2),
+                }
+                for operation, stats in self.by_operation.items()
+            },
+            "limits": {
+                "max_concurrency": OPENAI_MAX_CONCURRENCY,
+                "max_connections": OPENAI_POOL_SIZE,
+                "timeout": OPENAI_TIMEOUT,
+                "max_attempts": OPENAI_MAX_ATTEMPTS,
+            },
+        }
+
+
+llm_metrics = LLMMetrics()
+
+_client: Optional[AsyncOpenAI] = None
+_client_lock = threading.Lock()
+_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    The process-wide AsyncOpenAI client. Every module should use this instead
+    of constructing its own, so they share one connection pool.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AsyncOpenAI(
+                    api_key=os.environ.get("OPENAI_API_KEY"),
+                    # Retries are done by openai_call, outside the concurrency slot
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(
+                        timeout=httpx.Timeout(
+                            OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT
+                        ),
+                        limits=httpx.Limits(
+                            max_connections=OPENAI_POOL_SIZE,
+                            max_keepalive_connections=OPENAI_POOL_SIZE,
+                            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                        ),
+                    ),
+                )
+    return _client
+
+
+def get_llm_metrics() -> Dict[str, Any]:
+    return llm_metrics.snapshot()
+
+
+async def openai_call(
+    operation: str, request: Callable[[AsyncOpenAI], Awaitable[Any]]
+) -> Any:
+    """
+    Awaits request(client) under the concurrency limit, retrying transient
+    errors up to OPENAI_MAX_ATTEMPTS times.
+
+    Example: await openai_call("chat", lambda c: c.chat.completions.create(...))
+    """
+    client = get_openai_client()
+    for attempt in range(OPENAI_MAX_ATTEMPTS):
+        llm_metrics.waiting += 1
+        try:
+            await _semaphore.acquire()
+        finally:
+            llm_metrics.waiting -= 1
+        llm_metrics.in_flight += 1
+        started_at = time.perf_counter()
+        try:
+            result = await request(client)
+        except RETRYABLE_ERRORS as e:
+            error = e
+        except Exception:
+            llm_metrics.record(
+                operation, (time.perf_counter() - started_at) * 1000, True
+            )
+            raise
+        else:
+            llm_metrics.record(
+                operation, (time.perf_counter() - started_at) * 1000, False
+            )
+            return result
+        finally:
+            llm_metrics.in_flight -= 1
+            _semaphore.release()
+
+        llm_metrics.record(operation, (time.perf_counter() - started_at) * 1000, True)
+        if attempt == OPENAI_MAX_ATTEMPTS - 1:
+            raise error
+        llm_metrics.retries += 1
+        # Full jitter so callers throttled together don't retry in lockstep
+        delay = random.uniform(0, OPENAI_RETRY_BASE_SECONDS * 2**attempt)
+        logger.warning(
+            f"OpenAI {operation} failed ({type(error).__name__}), "
+            f"retry {attempt + 1} in {delay:.2f}s"
+        )
+        await asyncio.sleep(delay)
@@ -0,0 +1,93 @@
+"""
+Keyset (cursor) pagination helpers for PostgREST queries.
+
+Rows are ordered by (column, id) and a page continues strictly after the
+last row of the previous one, so deep pages cost the same as the first and
+rows inserted meanwhile don't shift the window (unlike offset paging).
+Cursors are opaque url-safe strings wrapping the (column, id) values; rows
+whose column is null have no position in that order and are left out.
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(value: Any, row_id: Any) -> str:
+    raw = json.dumps([value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+    return value, row_id
+
+
+def _quote(value: Any) -> str:
+    # Double quotes keep ':' '+' ',' in timestamps intact inside or=(...)
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def order_by_key(builder, column: str, descending: bool = True):
+    """Orders by (column, id); one order param, as .order() twice repeats the key."""
+    direction = "desc" if descending else "asc"
+    builder.params = builder.params.add("order", f"{column}.{direction},id.{direction}")
+    return builder
+
+
+def apply_keyset(
+    builder,
+    column: str,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    Orders `builder` by (column, id), skips rows where column is null,
+    continues after `cursor` if given and fetches limit + 1 rows so `page()`
+    can tell whether more exist.
+    """
+    builder = order_by_key(builder, column, descending).not_.is_(column, "null")
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        op = "lt" if descending else "gt"
+        # (column, id) past the cursor, as a raw param: supabase 2.3.0 pins
+        # postgrest-py < 0.14, whose filter builder has no .or_() method
+        builder.params = builder.params.add(
+            "or",
+            f"({column}.{op}.{_quote(value)},"
+            f"and({column}.eq.{_quote(value)},id.{op}.{_quote(row_id)}))",
+        )
+    return builder.limit(limit + 1)
+
+
+def nth_row(builder, column: str, n: int, descending: bool = True):
+    """
+    Selects the row `n` places from the start of the (column, id) order, to
+    start a keyset walk part-way through. Uses limit/offset params rather than
+    .range(), whose Range header is off by one in postgrest-py 0.13.
+    """
+    builder = order_by_key(builder, column, descending).not_.is_(column, "null")
+    return builder.limit(1).offset(n)
+
+
+def page(
+    rows: List[Dict[str, Any]], column: str, limit: int
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trims the extra row fetched by apply_keyset and returns (rows, next_cursor)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    if last.get(column) is None:
+        # apply_keyset filters these out; a null here would encode as a bogus cursor
+        raise ValueError(f"Cannot paginate past row {last.get('id')}: {column} is null")
+    return rows, encode_cursor(last[column], last["id"])
@@ -1,51 +1,160 @@
 import logging
+import operator
 import re
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from lib.variable_resolver import StringTemplate, compile_string
 
 logger = logging.getLogger(__name__)
 
+Predicate = Callable[[Any], bool]
 
-def evaluate_condition(variable_value: Any, operator: str, target_value: Any) -> bool:
+_COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+
+@lru_cache(maxsize=512)
+def _compile_regex(pattern: str) -> Optional["re.Pattern"]:
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        logger.error(f"Invalid 'matches' pattern {pattern!r}: {e}")
+        return None
+
+
+def _coerce(variable_value: Any, target_value: Any, numeric_target: Optional[float]):
     """
-    Evaluates a single condition: variable_value [operator] target_value
+    Normalize types for comparison: numeric targets compare as floats when the
+    variable converts too, otherwise both sides keep their original types.
+    """
+    if numeric_target is not None and isinstance(variable_value, (str, int, float)):
+        try:
+            return float(variable_value), numeric_target, True
+        except ValueError:
+            pass  # Keep as original types if conversion fails
+    return variable_value, target_value, False
+
+
+def compile_condition(operator_name: str, target_value: Any) -> Predicate:
+    """
+    Compiles `variable [operator] target_value` into a predicate on the variable.
     Supported operators: ==, !=, >, <, >=, <=, contains, matches
+    Targets are coerced, lower-cased and regex-compiled once here.
     """
-    try:
-        # Normalize types for comparison
-        if isinstance(target_value, (int, float)) and isinstance(
-            variable_value, (str, int, float)
-        ):
+    numeric_target = (
+        float(target_value) if isinstance(target_value, (int, float)) else None
+    )
+
+    def _guard(check: Callable[[Any], bool]) -> Predicate:
+        def predicate(variable_value: Any) -> bool:
             try:
-                variable_value = float(variable_value)
-                target_value = float(target_value)
-            except ValueError:
-                pass  # Keep as original types if conversion fails
-
-        if operator == "==":
-            return variable_value == target_value
-        elif operator == "!=":
-            return variable_value != target_value
-        elif operator == ">":
-            return variable_value > target_value
-        elif operator == "<":
-            return variable_value < target_value
-        elif operator == ">=":
-            return variable_value >= target_value
-        elif operator == "<=":
-            return variable_value <= target_value
-        elif operator == "contains":
-            return str(target_value).lower() in str(variable_value).lower()
-        elif operator == "matches":
-            return bool(re.search(str(target_value), str(variable_value)))
-        else:
-            logger.warning(f"Unknown operator: {operator}")
-            return False
-
-    except Exception as e:
-        logger.error(
-            f"Error checking condition {variable_value} {operator} {target_value}: {e}"
+                return check(variable_value)
+            except Exception as e:
+                logger.error(
+                    f"Error checking condition {variable_value} {operator_name} {target_value}: {e}"
+                )
+                return False
+
+        return predicate
+
+    if operator_name in _COMPARISONS:
+        compare = _COMPARISONS[operator_name]
+
+        def check(variable_value):
+            left, right, _ = _coerce(variable_value, target_value, numeric_target)
+            return compare(left, right)
+
+        return _guard(check)
+
+    if operator_name in ("contains", "matches"):
+        raw_target = str(target_value)
+        numeric_text = str(numeric_target) if numeric_target is not None else None
+
+        if operator_name == "contains":
+            raw_needle = raw_target.lower()
+            numeric_needle = numeric_text.lower() if numeric_text is not None else None
+
+            def check(variable_value):
+                left, _, coerced = _coerce(variable_value, target_value, numeric_target)
+                needle = numeric_needle if coerced else raw_needle
+                return needle in str(left).lower()
+
+            return _guard(check)
+
+        raw_pattern = _compile_regex(raw_target)
+        numeric_pattern = (
+            _compile_regex(numeric_text) if numeric_text is not None else None
         )
-        return False
+
+        def check(variable_value):
+            left, _, coerced = _coerce(variable_value, target_value, numeric_target)
+            pattern = numeric_pattern if coerced else raw_pattern
+            return bool(pattern and pattern.search(str(left)))
+
+        return _guard(check)
+
+    logger.warning(f"Unknown operator: {operator_name}")
+    return lambda variable_value: False
+
+
+def evaluate_condition(variable_value: Any, operator: str, target_value: Any) -> bool:
+    """
+    Evaluates a single condition: variable_value [operator] target_value
+    Supported operators: ==, !=, >, <, >=, <=, contains, matches
+    """
+    return compile_condition(operator, target_value)(variable_value)
+
+
+class CompiledRouter:
+    """
+    A router's routes compiled once: each route becomes (variable template,
+    predicate, next_node_id); a route without a condition is the fallback.
+    """
+
+    def __init__(self, routes: List[Dict]):
+        self.routes: List[tuple] = []
+        for route in routes:
+            next_node_id = route.get("next_node_id")
+
+            # Check if this is a default/fallback route (no condition)
+            if "condition" not in route or not route["condition"]:
+                self.routes.append((None, None, next_node_id))
+                break  # Nothing after a fallback can ever be selected
+
+            condition = route["condition"]
+            raw_variable = condition.get("variable")
+            variable: Optional[StringTemplate] = (
+                compile_string(raw_variable) if isinstance(raw_variable, str) else None
+            )
+            predicate = compile_condition(
+                condition.get("operator"), condition.get("value")
+            )
+            self.routes.append((variable, predicate, next_node_id))
+
+    def select(self, context_data: Dict) -> Optional[str]:
+        """Returns the next_node_id of the first matching route, or None."""
+        for variable, predicate, next_node_id in self.routes:
+            if predicate is None:
+                return next_node_id
+            if variable is None:
+                continue
+
+            # Resolve the variable from context (e.g., "{{sentiment}}" -> "negative")
+            if predicate(variable.render(context_data)):
+                return next_node_id
+
+        return None
+
+
+def compile_routes(routes: List[Dict]) -> CompiledRouter:
+    return CompiledRouter(routes)
 
 
 def find_next_step(routes: List[Dict], context_data: Dict) -> str:
@@ -62,23 +171,6 @@ def find_next_step(routes: List[Dict], context_data: Dict) -> str:
     }
 
     Returns 'default_next_node_id' if no conditions match (if provided in routes as a fallback).
+    Hot paths should compile once with `compile_routes` and call `select`.
     """
-    from lib.variable_resolver import resolve_variables
-
-    for route in routes:
-        # Check if this is a default/fallback route (no condition)
-        if "condition" not in route or not route["condition"]:
-            return route.get("next_node_id")
-
-        condition = route["condition"]
-        raw_variable = condition.get("variable")
-        operator = condition.get("operator")
-        target_value = condition.get("value")
-
-        # Resolve the variable from context (e.g., "{{sentiment}}" -> "negative")
-        resolved_variable = resolve_variables(raw_variable, context_data)
-
-        if evaluate_condition(resolved_variable, operator, target_value):
-            return route.get("next_node_id")
-
-    return None
+    return compile_routes(routes).select(context_data)
@@ -1,29 +1,220 @@
-from supabase import create_client
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from postgrest.utils import SyncClient
+from supabase import Client
 import os
 
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
 supabase_url = os.environ.get("SUPABASE_URL")
 supabase_key = os.environ.get("SUPABASE_KEY")
 
-supabase= create_client(supabase_url, supabase_key)
+# The supabase-py client is synchronous. Async handlers hand the blocking
+# .execute() to this bounded pool so a slow query only ties up one worker
+# thread instead of the whole event loop; the pool size also caps how many
+# requests hit PostgREST at once over the client's shared connection pool.
+SUPABASE_MAX_WORKERS = int(os.environ.get("SUPABASE_MAX_WORKERS", "16"))
+
+# HTTP connection pool shared by every module (see get_supabase_client)
+SUPABASE_POOL_SIZE = int(
+    os.environ.get("SUPABASE_POOL_SIZE", str(SUPABASE_MAX_WORKERS))
+)
+SUPABASE_KEEPALIVE_CONNECTIONS = int(
+    os.environ.get("SUPABASE_KEEPALIVE_CONNECTIONS", str(SUPABASE_POOL_SIZE))
+)
+SUPABASE_KEEPALIVE_EXPIRY = float(os.environ.get("SUPABASE_KEEPALIVE_EXPIRY", "60"))
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", "10"))
+SUPABASE_CONNECT_TIMEOUT = float(os.environ.get("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_SLOW_QUERY_MS = float(os.environ.get("SUPABASE_SLOW_QUERY_MS", "1000"))
+
+
+class QueryMetrics:
+    """Per-request counters for PostgREST traffic, fed by httpx event hooks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.transport_errors = 0
+            self.slow = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+            self.by_path: Dict[str, Dict[str, Any]] = {}
+
+    def on_request(self, request: httpx.Request):
+        request.extensions["supabase_started_at"] = time.perf_counter()
+
+    def on_response(self, response: httpx.Response):
+        request = response.request
+        started_at = request.extensions.get("supabase_started_at")
+        if started_at is None:
+            return
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        # /rest/v1/products -> products, /rest/v1/rpc/fn -> rpc/fn
+        path = request.url.path.split("/rest/v1/", 1)[-1]
+        failed = response.status_code >= 400
+
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            stats = self.by_path.setdefault(
+                path, {"requests": 0, "errors": 0, "total_ms": 0.0}
+            )
+            stats["requests"] += 1
+            stats["errors"] += failed
+            stats["total_ms"] += elapsed_ms
+            if elapsed_ms >= SUPABASE_SLOW_QUERY_MS:
+                self.slow += 1
 
+        if elapsed_ms >= SUPABASE_SLOW_QUERY_MS:
+            logger.warning(
+                f"Slow Supabase request: {request.method} {path} took {elapsed_ms:.0f}ms"
+            )
 
-def get_active_workflows_by_trigger(service_name: str):
+    def on_transport_error(self):
+        with self._lock:
+            self.transport_errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "transport_errors": self.transport_errors,
+                "slow": self.slow,
+                "avg_ms": (
+                    round(self.total_ms / self.requests, 2) if self.requests else 0.0
+                ),
+                "max_ms": round(self.max_ms, 2),
+                "by_path": {
+                    path: {
+                        "requests": stats["requests"],
+                        "errors": stats["errors"],
+                        "avg_ms": round(stats["total_ms"] / stats["requests"], 2),
+                    }
+                    for path, stats in self.by_path.items()
+                },
+                "pool": {
+                    "max_connections": SUPABASE_POOL_SIZE,
+                    "max_keepalive_connections": SUPABASE_KEEPALIVE_CONNECTIONS,
+                    "keepalive_expiry": SUPABASE_KEEPALIVE_EXPIRY,
+                    "timeout": SUPABASE_TIMEOUT,
+                    "query_workers": SUPABASE_MAX_WORKERS,
+                },
+            }
+
+
+query_metrics = QueryMetrics()
+
+
+def _pooled_session(session: httpx.Client) -> SyncClient:
+    """Rebuilds PostgREST's HTTP session with our limits, timeouts and metrics hooks."""
+    return SyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+        event_hooks={
+            "request": [query_metrics.on_request],
+            "response": [query_metrics.on_response],
+        },
+    )
+
+
+class PooledClient(Client):
+    """
+    supabase Client whose PostgREST client (also re-created after auth events)
+    always uses the shared, tuned connection pool.
+    """
+
+    @staticmethod
+    def _init_postgrest_client(*args, **kwargs):
+        postgrest = Client._init_postgrest_client(*args, **kwargs)
+        default_session = postgrest.session
+        postgrest.session = _pooled_session(default_session)
+        default_session.close()
+        return postgrest
+
+
+_client: Optional[Client] = None
+_client_lock = threading.Lock()
+
+
+def get_supabase_client() -> Client:
+    """
+    The process-wide Supabase client. Every module should use this instead of
+    calling create_client, so they share one keep-alive connection pool.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PooledClient(supabase_url, supabase_key)
+    return _client
+
+
+def get_supabase_metrics() -> Dict[str, Any]:
+    return query_metrics.snapshot()
+
+
+supabase= get_supabase_client()
+
+_query_executor = ThreadPoolExecutor(
+    max_workers=SUPABASE_MAX_WORKERS, thread_name_prefix="supabase"
+)
+
+
+async def run_query(query):
+    """
+    Executes a query builder (table/rpc chain, without .execute()) off the
+    event loop and returns the APIResponse.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_query_executor, query.execute)
+    except httpx.TransportError:
+        query_metrics.on_transport_error()
+        raise
+
+
+async def query_data(query):
+    """run_query, returning just the rows (e.g. as a workflow step result)."""
+    return (await run_query(query)).data
+
+
+async def get_active_workflows_by_trigger(service_name: str):
     """
     Search Supabase for any workflow that is 'active' 
     and has a trigger node matching our service.
     """
-    # We use a JSON path query to look inside the 'nodes' column
-    response = supabase.table("workflow_blueprints") \
+    # JSONB containment (nodes @> '[{"type": "trigger", "data": {"service": ...}}]')
+    # lets Postgres do the filtering instead of shipping every blueprint to Python.
+    trigger_filter = json.dumps([{"type": "trigger", "data": {"service": service_name}}])
+    response = await run_query(
+        supabase.table("workflow_blueprints") \
         .select("*") \
         .eq("is_active", True) \
-        .execute()
-    
-    # Filter for the specific service (e.g., 'razorpay')
-    # In a production app, you'd use a more advanced Postgres JSON query
-    matching_blueprints = []
-    for bp in response.data:
-        for node in bp['nodes']:
-            if node['type'] == 'trigger' and node['data']['service'] == service_name:
-                matching_blueprints.append(bp)
-                
-    return matching_blueprints
\ No newline at end of file
+        .filter("nodes", "cs", trigger_filter)
+    )
+
+    return response.data
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small in-process cache: entries expire after `ttl_seconds` and the least
+    recently used entry is evicted once `max_entries` is reached.
+    Not shared between workers; meant for short-lived, recomputable values.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 128):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Returns the cached value, or awaits `loader()` and caches its result.
+        Concurrent misses for the same key share one loader call, and its
+        result or exception.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        loading = self._loading.get(key)
+        if loading is None:
+            loading = asyncio.ensure_future(loader())
+            self._loading[key] = loading
+            loading.add_done_callback(lambda future: self._loaded(key, future))
+        # A cancelled caller doesn't cancel the load the others are waiting on
+        return await asyncio.shield(loading)
+
+    def _loaded(self, key: Hashable, future: asyncio.Future):
+        if self._loading.get(key) is future:
+            del self._loading[key]
+        if not future.cancelled() and future.exception() is None:
+            self.set(key, future.result())
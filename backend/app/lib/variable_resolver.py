@@ -1,48 +1,144 @@
 import re
-from typing import Any, Dict, Union
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Union
 
+# Compiled once; placeholders look like {{trigger_data.payload.amount}}
+PLACEHOLDER_PATTERN = re.compile(r"\{\{(.*?)\}\}")
 
-def resolve_variables(text: str, context: Dict[str, Any]) -> str:
+
+def _split_path(path: str) -> Tuple[str, ...]:
+    return tuple(path.strip().split("."))
+
+
+def get_value_from_path(keys: Tuple[str, ...], data: Any) -> Any:
     """
-    Highly efficient variable resolver using a single regex pass.
-    Supports deep nested paths: trigger_data.payload.payment.entity.amount
+    Walks pre-split path keys through dicts and lists.
+    Numeric keys index into lists: database_1.results.0.phone
+    """
+    current = data
+    for key in keys:
+        if isinstance(current, dict) and key in current:
+            current = current[key]
+        elif isinstance(current, list) and key.isdigit() and int(key) < len(current):
+            current = current[int(key)]
+        else:
+            return None  # Path doesn't exist
+    return current
+
+
+def _format_value(raw_path: str, value: Any) -> str:
+    if value is None:
+        return f"[{raw_path} not found]"  # Useful for debugging during dev
+
+    # Handle decimal/float formatting (common for payments)
+    if isinstance(value, float):
+        return f"{value:.2f}"
+
+    return str(value)
+
+
+class StringTemplate:
+    """A string split into literal segments and pre-split path accessors."""
+
+    __slots__ = ("segments", "is_static", "source")
+
+    def __init__(self, text: str):
+        self.source = text
+        self.segments: List[Union[str, Tuple[str, Tuple[str, ...]]]] = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            if match.start() > position:
+                self.segments.append(text[position : match.start()])
+            raw_path = match.group(1)
+            self.segments.append((raw_path, _split_path(raw_path)))
+            position = match.end()
+        if position < len(text):
+            self.segments.append(text[position:])
+        self.is_static = all(isinstance(seg, str) for seg in self.segments)
+
+    def render(self, context: Dict[str, Any]) -> str:
+        if self.is_static:
+            return self.source
+        return "".join(
+            (
+                seg
+                if isinstance(seg, str)
+                else _format_value(seg[0], get_value_from_path(seg[1], context))
+            )
+            for seg in self.segments
+        )
+
+
+class Template:
+    """
+    Compiled form of a params tree (strings, dicts, lists, scalars).
+    Only branches that contain placeholders are walked when rendering;
+    a fully static tree is returned as-is.
     """
-    pattern = r"\{\{(.*?)\}\}"
 
-    def get_value_from_path(path: str, data: Dict[str, Any]) -> Any:
-        keys = path.strip().split(".")
-        current = data
-        for key in keys:
-            if isinstance(current, dict) and key in current:
-                current = current[key]
-            else:
-                return None  # Path doesn't exist
-        return current
+    __slots__ = ("source", "is_static", "_render")
+
+    def __init__(self, data: Any):
+        self.source = data
+        self._render, self.is_static = _compile_node(data)
+
+    def render(self, context: Dict[str, Any]) -> Any:
+        if self.is_static:
+            return self.source
+        return self._render(context)
+
+
+def _compile_node(data: Any):
+    """Returns (render_fn, is_static) for one node of a params tree."""
+    if isinstance(data, str):
+        template = compile_string(data)
+        return template.render, template.is_static
+
+    if isinstance(data, dict):
+        children = [(key, _compile_node(value)) for key, value in data.items()]
+        if all(is_static for _, (_, is_static) in children):
+            return (lambda context: data), True
+        renderers = [
+            (key, (lambda context, v=data[key]: v) if is_static else render)
+            for key, (render, is_static) in children
+        ]
+        return (
+            lambda context: {key: render(context) for key, render in renderers}
+        ), False
+
+    if isinstance(data, list):
+        children = [_compile_node(item) for item in data]
+        if all(is_static for _, is_static in children):
+            return (lambda context: data), True
+        renderers = [
+            (lambda context, v=item: v) if is_static else render
+            for item, (render, is_static) in zip(data, children)
+        ]
+        return (lambda context: [render(context) for render in renderers]), False
 
-    def replace(match):
-        path = match.group(1)
-        value = get_value_from_path(path, context)
+    return (lambda context: data), True
 
-        if value is None:
-            return f"[{path} not found]"  # Useful for debugging during dev
 
-        # Handle decimal/float formatting (common for payments)
-        if isinstance(value, float):
-            return f"{value:.2f}"
+@lru_cache(maxsize=2048)
+def compile_string(text: str) -> StringTemplate:
+    return StringTemplate(text)
 
-        return str(value)
 
-    return re.sub(pattern, replace, text)
+def compile_template(data: Any) -> Template:
+    """Compiles a params tree once so it can be rendered against many contexts."""
+    return Template(data)
+
+
+def resolve_variables(text: str, context: Dict[str, Any]) -> str:
+    """
+    Highly efficient variable resolver using a single regex pass.
+    Supports deep nested paths: trigger_data.payload.payment.entity.amount
+    """
+    return compile_string(text).render(context)
 
 
 def resolve_recursive(data: Any, context: Dict[str, Any]) -> Any:
     """
     Recursively resolves variables in strings, dictionaries, and lists.
     """
-    if isinstance(data, str):
-        return resolve_variables(data, context)
-    elif isinstance(data, dict):
-        return {k: resolve_recursive(v, context) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [resolve_recursive(item, context) for item in data]
-    return data
+    return compile_template(data).render(context)
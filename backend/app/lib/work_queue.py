@@ -0,0 +1,80 @@
+"""
+Bounded in-process background work queue.
+
+Request handlers that must answer fast (e.g. the Twilio webhook) persist what
+they received, submit the slow part here and return; the local workflow
+executor (workflows.local_executor) queues its runs on one as well. A fixed
+number of worker tasks drain the queue; submit() raises asyncio.QueueFull
+when it is saturated so the caller can fall back (run inline, hand off to
+Inngest) instead of piling up. Work is lost if the process stops while it is
+still queued.
+"""
+
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkQueue:
+    def __init__(self, name: str, workers: int = 4, queue_size: int = 100):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def start(self):
+        """Starts the worker tasks. Must be called from within the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.info(f"✅ [{self.name}] Started {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(
+        self, handler: Callable[..., Any], *args: Any, label: Optional[str] = None
+    ):
+        """
+        Queues handler(*args); `label` names the job in failure logs.
+        Raises asyncio.QueueFull when saturated.
+        """
+        self.start()
+        try:
+            self._queue.put_nowait((handler, args, label))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise
+        self.stats["submitted"] += 1
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self, index: int):
+        while True:
+            handler, args, label = await self._queue.get()
+            try:
+                result = handler(*args)
+                if inspect.isawaitable(result):
+                    await result
+                self.stats["completed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(
+                    f"❌ [{self.name}] Worker {index} {label or 'job'} failed: {e}"
+                )
+            finally:
+                self._queue.task_done()
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from lib.supabase_lib import supabase
+from fastapi import APIRouter, HTTPException, Query
+from lib.openai_client import get_llm_metrics
+from lib.supabase_lib import get_supabase_metrics
 from services.action_service import action_service
-from datetime import datetime, timedelta
+from services.engagement_service import engagement_service
+from services.fast_intent import fast_intent
+from services.intent_service import session_executor, session_manager
 
 router = APIRouter()
 
 
 @router.get("/api/dashboard/stats")
-async def get_dashboard_stats():
+async def get_dashboard_stats(
+    window_days: int = Query(7, ge=1, le=366),
+    granularity: str = Query("daily", pattern="^(hourly|daily|weekly)$"),
+):
     """FETCH overall stats for the dashboard"""
     try:
         # 1. Get Financial Stats from ActionService
@@ -17,40 +23,11 @@ async def get_dashboard_stats():
         if ledger.get("status") == "error":
             raise HTTPException(500, detail=ledger.get("message"))
 
-        # 2. Get Engagement Stats (Message counts per day for last 7 days)
-        # We query unified_messages and aggregate by day
-        seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
-
-        msg_res = (
-            supabase.table("unified_messages")
-            .select("created_at, platform")
-            .gte("created_at", seven_days_ago)
-            .execute()
+        # 2. Get Engagement Stats (Message counts per bucket, aggregated in SQL and cached)
+        engagement_data = await engagement_service.get_histogram(
+            window_days=window_days, granularity=granularity
         )
 
-        # Basic aggregation logic
-        engagement_data = []
-        days_map = {}
-
-        # Initialize days
-        for i in range(7):
-            date_str = (datetime.now() - timedelta(days=6 - i)).strftime("%Y-%m-%d")
-            days_map[date_str] = {
-                "date": date_str,
-                "whatsapp": 0,
-                "instagram": 0,
-                "bluesky": 0,
-                "pixelfed": 0,
-            }
-
-        for msg in msg_res.data:
-            date_str = msg["created_at"][:10]
-            platform = msg["platform"]
-            if date_str in days_map:
-                days_map[date_str][platform] = days_map[date_str].get(platform, 0) + 1
-
-        engagement_data = sorted(days_map.values(), key=lambda x: x["date"])
-
         return {
             "status": "success",
             "data": {
@@ -66,3 +43,39 @@ async def get_dashboard_stats():
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/api/dashboard/db-metrics")
+async def get_db_metrics():
+    """Request counts, latencies and pool settings of the shared Supabase client"""
+    return {"status": "success", "data": get_supabase_metrics()}
+
+
+@router.get("/api/dashboard/llm-metrics")
+async def get_llm_call_metrics():
+    """Call counts, latencies, retries and concurrency of the shared OpenAI client"""
+    return {"status": "success", "data": get_llm_metrics()}
+
+
+@router.get("/api/dashboard/intent-metrics")
+async def get_intent_metrics():
+    """How many messages the fast-path classifier resolved without the LLM"""
+    return {"status": "success", "data": fast_intent.snapshot()}
+
+
+@router.get("/api/dashboard/session-metrics")
+async def get_session_metrics():
+    """Per-session serialization of conversational requests and the draft session store"""
+    return {
+        "status": "success",
+        "data": {**session_executor.snapshot(), "store": session_manager.stats()},
+    }
+
+
+@router.post("/api/dashboard/reconcile-debts")
+async def reconcile_debts(apply: bool = False):
+    """Report (and with apply=true, correct) customers whose total_debt drifted from invoices - payments"""
+    report = await action_service.reconcile_customer_debts(apply=apply)
+    if report.get("status") == "error":
+        raise HTTPException(status_code=500, detail=report.get("message"))
+    return report
@@ -8,14 +8,13 @@ WhatsApp, Razorpay, Google Sheets, etc.
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
-from supabase import create_client
-import os
+from lib.supabase_lib import get_supabase_client, run_query
 from datetime import datetime
 
 router = APIRouter(prefix="/integrations", tags=["integrations"])
 
-# Initialize Supabase
-supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+# Shared process-wide Supabase client
+supabase = get_supabase_client()
 
 
 class ConnectRequest(BaseModel):
@@ -32,11 +31,8 @@ async def get_integration_status(user_id: str = Query(...)):
     Returns a dict of service_id -> connection info.
     """
     try:
-        result = (
-            supabase.table("user_integrations")
-            .select("*")
-            .eq("user_id", user_id)
-            .execute()
+        result = await run_query(
+            supabase.table("user_integrations").select("*").eq("user_id", user_id)
         )
 
         connections = {}
@@ -77,16 +73,18 @@ async def connect_integration(request: ConnectRequest):
             account_info = request.credentials["email"]
 
         # Upsert integration
-        supabase.table("user_integrations").upsert(
-            {
-                "user_id": request.user_id,
-                "service": request.service,
-                "credentials": request.credentials,
-                "account_info": account_info,
-                "connected_at": datetime.utcnow().isoformat(),
-            },
-            on_conflict="user_id,service",
-        ).execute()
+        await run_query(
+            supabase.table("user_integrations").upsert(
+                {
+                    "user_id": request.user_id,
+                    "service": request.service,
+                    "credentials": request.credentials,
+                    "account_info": account_info,
+                    "connected_at": datetime.utcnow().isoformat(),
+                },
+                on_conflict="user_id,service",
+            )
+        )
 
         print(
             f"✅ [Integrations] Connected {request.service} for user {request.user_id}"
@@ -106,9 +104,12 @@ async def disconnect_integration(service: str, user_id: str = Query(...)):
     Removes credentials from database.
     """
     try:
-        supabase.table("user_integrations").delete().eq("user_id", user_id).eq(
-            "service", service
-        ).execute()
+        await run_query(
+            supabase.table("user_integrations")
+            .delete()
+            .eq("user_id", user_id)
+            .eq("service", service)
+        )
 
         print(f"✅ [Integrations] Disconnected {service} for user {user_id}")
         return {"success": True, "service": service}
@@ -126,13 +127,12 @@ async def get_credentials(service: str, user_id: str = Query(...)):
     Returns decrypted credentials.
     """
     try:
-        result = (
+        result = await run_query(
             supabase.table("user_integrations")
             .select("credentials")
             .eq("user_id", user_id)
             .eq("service", service)
             .single()
-            .execute()
         )
 
         if not result.data:
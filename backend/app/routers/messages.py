@@ -1,6 +1,19 @@
-from fastapi import APIRouter, HTTPException
+import json
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from lib.supabase_lib import supabase
+from lib.supabase_lib import supabase, run_query
+from lib.message_hub import message_hub, HubFullError
+from lib.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    apply_keyset,
+    encode_cursor,
+    nth_row,
+    page,
+)
 from integrations.instagram_tool import InstagramTool
 from integrations.bluesky_tool import BlueskyTool
 from integrations.pixelfed_tool import PixelfedTool
@@ -8,94 +21,220 @@ from services.sync_service import sync_service
 
 router = APIRouter()
 
+# Aggregate WhatsApp view: default/maximum messages per response, and rows per DB page
+WHATSAPP_AGGREGATE_LIMIT = int(os.getenv("WHATSAPP_AGGREGATE_LIMIT", "2000"))
+WHATSAPP_AGGREGATE_MAX = int(os.getenv("WHATSAPP_AGGREGATE_MAX", "20000"))
+STREAM_BATCH_SIZE = int(os.getenv("MESSAGE_STREAM_BATCH_SIZE", "500"))
+# Comment line sent on idle SSE connections so proxies don't close them
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
 
 @router.get("/api/messages/sessions")
-async def get_message_sessions():
-    """FETCH list of active chat sessions with latest message preview"""
+async def get_message_sessions(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    platform: Optional[str] = None,
+):
+    """FETCH a page of chat sessions (most recent activity first) with latest message preview"""
     try:
-        # Fetch sessions ordered by most recent activity
-        sessions = (
+        # One round trip: each session embeds only its newest message
+        # (PostgREST runs the embedded order/limit as a lateral join)
+        query = (
             supabase.table("sessions")
-            .select("*")
-            .order("updated_at", desc=True)
-            .execute()
+            .select("*, unified_messages(content, created_at, sender_handle)")
+            .order("created_at", desc=True, foreign_table="unified_messages")
+            .limit(1, foreign_table="unified_messages")
         )
+        if platform:
+            query = query.eq("platform", platform)
+        try:
+            query = apply_keyset(query, "updated_at", cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(400, detail=str(e))
+
+        sessions = await run_query(query)
+        rows, next_cursor = page(sessions.data or [], "updated_at", limit)
 
         result = []
-        if sessions.data:
-            for sess in sessions.data:
-                # Basic preview fetch (N+1 query, okay for MVP scale)
-                last_msg_res = (
-                    supabase.table("unified_messages")
-                    .select("content, created_at, sender_handle")
-                    .eq("session_id", sess["id"])
-                    .order("created_at", desc=True)
-                    .limit(1)
-                    .execute()
+        for sess in rows:
+            preview = sess.pop("unified_messages", None) or []
+            if preview:
+                last_msg = preview[0]
+                sess["last_message"] = last_msg.get("content", "Media/Unknown")
+                sess["sender_handle"] = last_msg.get(
+                    "sender_handle", sess["external_id"]
                 )
+                sess["last_active"] = last_msg.get("created_at")
+            else:
+                sess["last_message"] = "No messages yet"
 
-                if last_msg_res.data:
-                    last_msg = last_msg_res.data[0]
-                    sess["last_message"] = last_msg.get("content", "Media/Unknown")
-                    sess["sender_handle"] = last_msg.get(
-                        "sender_handle", sess["external_id"]
-                    )
-                    sess["last_active"] = last_msg.get("created_at")
-                else:
-                    sess["last_message"] = "No messages yet"
-
-                result.append(sess)
+            result.append(sess)
 
-        return {"status": "success", "data": result}
+        return {"status": "success", "data": result, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/api/messages/stream")
+async def stream_new_messages(
+    request: Request, session_id: Optional[str] = None, platform: Optional[str] = None
+):
+    """
+    STREAM newly stored messages as Server-Sent Events ("message" events),
+    optionally only for one session and/or platform. A "dropped" event tells a
+    client that fell behind how many messages it missed.
+    """
+    try:
+        subscription = message_hub.subscribe(session_id=session_id, platform=platform)
+    except HubFullError as e:
+        raise HTTPException(503, detail=str(e))
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                data = json.dumps(event["data"], default=str)
+                yield f"event: {event['type']}\ndata: {data}\n\n"
+        finally:
+            message_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/api/messages/{session_id}")
-async def get_session_messages(session_id: str):
-    """FETCH full chat history for a specific session"""
+async def get_session_messages(
+    session_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[str] = None,
+):
+    """
+    FETCH a page of chat history for a specific session, oldest first.
+    Without parameters returns the newest `limit` messages. `before` pages back
+    through older history; `after` (cursor) or `since` (created_at timestamp)
+    return only newer messages, for incremental polling.
+    """
     try:
-        messages = (
-            supabase.table("unified_messages")
-            .select("*")
-            .eq("session_id", session_id)
-            .order("created_at", desc=False)
-            .execute()
-        )
+        if before and (after or since):
+            raise HTTPException(400, "Use either 'before' or 'after'/'since'")
 
-        return {"status": "success", "data": messages.data}
+        query = (
+            supabase.table("unified_messages").select("*").eq("session_id", session_id)
+        )
+        if since:
+            query = query.gt("created_at", since)
+        # Newer-than queries walk forward; everything else walks back from the newest
+        descending = not (after or since)
+        try:
+            query = apply_keyset(
+                query, "created_at", before or after, descending=descending, limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(400, detail=str(e))
+
+        messages = await run_query(query)
+        rows, next_cursor = page(messages.data or [], "created_at", limit)
+        if descending:
+            rows.reverse()
+
+        return {
+            "status": "success",
+            "data": rows,
+            "has_more": next_cursor is not None,
+            # Pass back as ?before= for older history, ?after= to poll for new messages
+            "before_cursor": (
+                encode_cursor(rows[0]["created_at"], rows[0]["id"]) if rows else before
+            ),
+            "after_cursor": (
+                encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if rows else after
+            ),
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/api/messages/whatsapp/all")
-async def get_all_whatsapp_messages():
-    """FETCH all WhatsApp messages across all sessions for aggregate view"""
+async def _stream_messages(query_factory, limit: int, cursor: Optional[str] = None):
+    """
+    Yields a {"status": "success", "data": [...]} JSON document, fetching
+    ascending keyset pages of STREAM_BATCH_SIZE so at most one page is held
+    in memory, and stopping after `limit` messages.
+    """
+    yield '{"status": "success", "data": ['
+    sent = 0
     try:
-        # Get all WhatsApp sessions
-        sessions = (
-            supabase.table("sessions").select("id").eq("platform", "whatsapp").execute()
-        )
-
-        if not sessions.data:
-            return {"status": "success", "data": []}
+        while sent < limit:
+            batch_size = min(STREAM_BATCH_SIZE, limit - sent)
+            res = await run_query(
+                apply_keyset(
+                    query_factory(),
+                    "created_at",
+                    cursor,
+                    descending=False,
+                    limit=batch_size,
+                )
+            )
+            rows, cursor = page(res.data or [], "created_at", batch_size)
+            for row in rows:
+                yield ("," if sent else "") + json.dumps(row, default=str)
+                sent += 1
+            if cursor is None:
+                break
+    except Exception as e:
+        # Headers are already sent, so the error can only be logged
+        print(f"❌ [Messages] Stream aborted after {sent} messages: {e}")
+    yield "]}"
 
-        # Get all session IDs
-        session_ids = [s["id"] for s in sessions.data]
 
-        # Fetch all messages from these sessions
-        messages = (
+@router.get("/api/messages/whatsapp/all")
+async def get_all_whatsapp_messages(
+    limit: int = Query(WHATSAPP_AGGREGATE_LIMIT, ge=1, le=WHATSAPP_AGGREGATE_MAX),
+    since: Optional[str] = None,
+):
+    """
+    STREAM WhatsApp messages across all sessions for the aggregate view, oldest
+    first: the newest `limit` messages, or with `since` only messages created
+    after that timestamp (incremental polling).
+    """
+
+    def query_factory(columns: str = "*"):
+        query = (
             supabase.table("unified_messages")
-            .select("*")
-            .in_("session_id", session_ids)
-            .order("created_at", desc=False)
-            .execute()
+            .select(columns)
+            .eq("platform", "whatsapp")
         )
+        return query.gt("created_at", since) if since else query
 
-        return {"status": "success", "data": messages.data}
+    try:
+        cursor = None
+        if not since:
+            # Start right after the (limit + 1)-th newest message
+            boundary = await run_query(
+                nth_row(query_factory("id, created_at"), "created_at", limit)
+            )
+            if boundary.data:
+                cursor = encode_cursor(
+                    boundary.data[0]["created_at"], boundary.data[0]["id"]
+                )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return StreamingResponse(
+        _stream_messages(query_factory, limit, cursor), media_type="application/json"
+    )
+
 
 @router.post("/api/messages/sync")
 async def sync_messages():
@@ -117,12 +256,8 @@ class SendMessageRequest(BaseModel):
 async def get_session_detail(session_id: str):
     """Fetch session details including bot status"""
     try:
-        res = (
-            supabase.table("sessions")
-            .select("*")
-            .eq("id", session_id)
-            .single()
-            .execute()
+        res = await run_query(
+            supabase.table("sessions").select("*").eq("id", session_id).single()
         )
         if not res.data:
             raise HTTPException(404, "Session not found")
@@ -136,22 +271,20 @@ async def toggle_session_bot(session_id: str):
     """Toggle the is_bot_active flag for a session"""
     try:
         # Get current status
-        current = (
+        current = await run_query(
             supabase.table("sessions")
             .select("is_bot_active")
             .eq("id", session_id)
             .single()
-            .execute()
         )
         if not current.data:
             raise HTTPException(404, "Session not found")
 
         new_status = not current.data.get("is_bot_active", True)
-        res = (
+        res = await run_query(
             supabase.table("sessions")
             .update({"is_bot_active": new_status})
             .eq("id", session_id)
-            .execute()
         )
         return {"status": "success", "is_bot_active": new_status}
     except Exception as e:
@@ -163,12 +296,8 @@ async def send_message(req: SendMessageRequest):
     """Wait for manual/AI reply to be sent"""
     try:
         # 1. Get session details
-        session_res = (
-            supabase.table("sessions")
-            .select("*")
-            .eq("id", req.session_id)
-            .single()
-            .execute()
+        session_res = await run_query(
+            supabase.table("sessions").select("*").eq("id", req.session_id).single()
         )
         if not session_res.data:
             raise HTTPException(404, "Session not found")
@@ -208,17 +337,20 @@ async def send_message(req: SendMessageRequest):
 
             # 2. Manually sync to DB for Bluesky
             if res.get("status") == "success":
-                supabase.table("unified_messages").insert(
-                    {
-                        "session_id": req.session_id,
-                        "platform": "bluesky",
-                        "direction": "outbound",
-                        "content": req.text,
-                        "sender_handle": "AI Assistant",
-                        "status": "sent",
-                        "external_id": res.get("id"),  # DM message ID
-                    }
-                ).execute()
+                inserted = await run_query(
+                    supabase.table("unified_messages").insert(
+                        {
+                            "session_id": req.session_id,
+                            "platform": "bluesky",
+                            "direction": "outbound",
+                            "content": req.text,
+                            "sender_handle": "AI Assistant",
+                            "status": "sent",
+                            "external_id": res.get("id"),  # DM message ID
+                        }
+                    )
+                )
+                message_hub.publish_rows(inserted.data)
 
             return res
 
@@ -227,26 +359,24 @@ async def send_message(req: SendMessageRequest):
             in_reply_to_id = None
 
             if req.reply_to_id:
-                msg_res = (
+                msg_res = await run_query(
                     supabase.table("unified_messages")
                     .select("external_id")
                     .eq("id", req.reply_to_id)
                     .single()
-                    .execute()
                 )
                 if msg_res.data:
                     in_reply_to_id = msg_res.data["external_id"]
 
             if not in_reply_to_id:
                 # Fallback to latest inbound
-                last_inbound = (
+                last_inbound = await run_query(
                     supabase.table("unified_messages")
                     .select("external_id")
                     .eq("session_id", req.session_id)
                     .eq("direction", "inbound")
                     .order("created_at", desc=True)
                     .limit(1)
-                    .execute()
                 )
                 in_reply_to_id = (
                     last_inbound.data[0]["external_id"] if last_inbound.data else None
@@ -257,17 +387,20 @@ async def send_message(req: SendMessageRequest):
             )
 
             if res.get("status") == "success":
-                supabase.table("unified_messages").insert(
-                    {
-                        "session_id": req.session_id,
-                        "platform": "pixelfed",
-                        "direction": "outbound",
-                        "content": req.text,
-                        "sender_handle": "AI Assistant",
-                        "status": "sent",
-                        "external_id": str(res.get("data", {}).get("id")),
-                    }
-                ).execute()
+                inserted = await run_query(
+                    supabase.table("unified_messages").insert(
+                        {
+                            "session_id": req.session_id,
+                            "platform": "pixelfed",
+                            "direction": "outbound",
+                            "content": req.text,
+                            "sender_handle": "AI Assistant",
+                            "status": "sent",
+                            "external_id": str(res.get("data", {}).get("id")),
+                        }
+                    )
+                )
+                message_hub.publish_rows(inserted.data)
 
             return res
 
@@ -0,0 +1,135 @@
+"""
+Message engagement histogram for the dashboard.
+
+Counts unified_messages per time bucket and platform. The group-by runs in
+Postgres (engagement_histogram RPC) so only one row per bucket/platform comes
+back, and results are cached for DASHBOARD_CACHE_SECONDS so dashboard polling
+doesn't re-aggregate. Falls back to counting rows in Python if the SQL
+function isn't installed.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from lib.supabase_lib import supabase, run_query
+from lib.ttl_cache import TTLCache
+
+DASHBOARD_CACHE_SECONDS = float(os.getenv("DASHBOARD_CACHE_SECONDS", "30"))
+PLATFORMS = ["whatsapp", "instagram", "bluesky", "pixelfed"]
+
+# granularity -> (date_trunc unit, bucket width)
+GRANULARITIES = {
+    "hourly": ("hour", timedelta(hours=1)),
+    "daily": ("day", timedelta(days=1)),
+    "weekly": ("week", timedelta(weeks=1)),
+}
+
+
+def _bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Same truncation as Postgres date_trunc (weeks start on Monday)."""
+    moment = moment.astimezone(timezone.utc)
+    if granularity == "hourly":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "weekly":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _bucket_label(bucket: datetime, granularity: str) -> str:
+    if granularity == "hourly":
+        return bucket.strftime("%Y-%m-%dT%H:00")
+    return bucket.strftime("%Y-%m-%d")
+
+
+def _parse_timestamp(value: str) -> datetime:
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+class EngagementService:
+    def __init__(self, cache_seconds: float = DASHBOARD_CACHE_SECONDS):
+        self.cache = TTLCache(ttl_seconds=cache_seconds, max_entries=32)
+        self.use_rpc = True
+
+    async def get_histogram(
+        self, window_days: int = 7, granularity: str = "daily"
+    ) -> List[Dict[str, Any]]:
+        """
+        Message counts per bucket for the last `window_days` (including the
+        current bucket), oldest first:
+        [{"date": "2024-05-01", "whatsapp": 3, "instagram": 0, ...}, ...]
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(
+                f"Unknown granularity '{granularity}', use one of {list(GRANULARITIES)}"
+            )
+        return await self.cache.get_or_load(
+            (window_days, granularity),
+            lambda: self._compute(window_days, granularity),
+        )
+
+    async def _compute(self, window_days: int, granularity: str):
+        _, width = GRANULARITIES[granularity]
+        bucket_count = max(1, -(-timedelta(days=window_days) // width))
+        current = _bucket_start(datetime.now(timezone.utc), granularity)
+        since = current - width * (bucket_count - 1)
+
+        # Initialize buckets
+        buckets: Dict[str, Dict[str, Any]] = {}
+        for i in range(bucket_count):
+            label = _bucket_label(since + width * i, granularity)
+            buckets[label] = {"date": label, **{p: 0 for p in PLATFORMS}}
+
+        for bucket, platform, count in await self._counts(since, granularity):
+            label = _bucket_label(_bucket_start(bucket, granularity), granularity)
+            if label in buckets:
+                buckets[label][platform] = buckets[label].get(platform, 0) + count
+
+        return list(buckets.values())
+
+    async def _counts(self, since: datetime, granularity: str):
+        """(bucket start, platform, count) rows since `since`."""
+        if self.use_rpc:
+            try:
+                res = await run_query(
+                    supabase.rpc(
+                        "engagement_histogram",
+                        {
+                            "p_since": since.isoformat(),
+                            "p_unit": GRANULARITIES[granularity][0],
+                        },
+                    )
+                )
+                return [
+                    (
+                        _parse_timestamp(row["bucket"]),
+                        row["platform"],
+                        int(row["count"]),
+                    )
+                    for row in res.data
+                ]
+            except Exception as e:
+                # PGRST202: function not found in the schema cache
+                if getattr(e, "code", None) != "PGRST202":
+                    raise
+                print(
+                    f"⚠️ [EngagementService] engagement_histogram RPC unavailable: {e}"
+                )
+                self.use_rpc = False
+
+        msg_res = await run_query(
+            supabase.table("unified_messages")
+            .select("created_at, platform")
+            .gte("created_at", since.isoformat())
+        )
+        return [
+            (_parse_timestamp(msg["created_at"]), msg["platform"], 1)
+            for msg in msg_res.data
+        ]
+
+
+engagement_service = EngagementService()
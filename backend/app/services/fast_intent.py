@@ -0,0 +1,175 @@
+"""
+Deterministic fast path ahead of the LLM intent parser.
+
+Short, well-structured commands ("stock of PVC pipe", "Rahul paid 500",
+"how much does Rahul owe") are matched against a few patterns and resolved
+against the in-memory product index and ledger customers. A hit builds the
+UserIntent directly, skipping the gpt-4o-mini round trip; anything else
+(unknown product/customer, ambiguous name, extra words) returns None and the
+caller falls back to IntentService.parse_message.
+
+Only used for fresh conversations: with an existing draft the LLM has to
+merge the new message into it.
+"""
+
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+from services.intent_service import (
+    CheckStockIntent,
+    PaymentReminderIntent,
+    RecordPaymentIntent,
+    UserIntent,
+)
+from services.ledger_aggregates import ledger_aggregates
+from services.product_index import product_index
+
+FAST_INTENT_ENABLED = os.getenv("FAST_INTENT_ENABLED", "true").lower() == "true"
+
+_AMOUNT = r"(?:rs\.?|₹|inr)?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?:rs\.?|rupees?|/-)?"
+_NAME = r"(?P<name>[a-z][a-z .'-]*?)"
+_PRODUCT = r"(?P<product>[a-z0-9][a-z0-9 .'\"/&x-]*?)"
+
+PATTERNS = {
+    "CHECK_STOCK": [
+        re.compile(
+            rf"^(?:what is |what's |check )?(?:the )?(?:stock|quantity|qty) (?:of|for) {_PRODUCT}$"
+        ),
+        re.compile(rf"^how (?:much|many) {_PRODUCT} (?:is |are )?(?:left|in stock)$"),
+        re.compile(
+            rf"^{_PRODUCT} (?:ka |ki |ke )?(?:stock|kitna stock|stock kitna)(?: hai| left)?$"
+        ),
+    ],
+    "RECORD_PAYMENT": [
+        re.compile(rf"^{_NAME} (?:has )?(?:paid|gave|sent) {_AMOUNT}$"),
+        re.compile(rf"^(?:received|got) {_AMOUNT} from {_NAME}$"),
+        re.compile(rf"^{_NAME} ne {_AMOUNT} (?:diye|de diye|jama kiye|bheje)$"),
+    ],
+    "PAYMENT_REMINDER": [
+        re.compile(rf"^how much (?:does|do) {_NAME} owe(?: me| us)?$"),
+        re.compile(rf"^(?:what is |what's )?{_NAME}(?:'s|s') (?:debt|balance|dues?)$"),
+        re.compile(rf"^remind {_NAME}(?: to pay| about (?:the )?(?:payment|dues?))?$"),
+        re.compile(
+            rf"^{_NAME} ka (?:balance|baki|baaki|udhaar|udhar|due)(?: kitna hai)?$"
+        ),
+    ],
+}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split()).rstrip("?.! ")
+
+
+class FastIntentClassifier:
+    def __init__(self, enabled: bool = FAST_INTENT_ENABLED):
+        self.enabled = enabled
+        self.stats: Dict[str, Any] = {
+            "attempts": 0,
+            "hits": 0,
+            "misses": 0,
+            "by_intent": {intent_type: 0 for intent_type in PATTERNS},
+            "total_ms": 0.0,
+        }
+
+    async def classify(self, raw_text: str) -> Optional[UserIntent]:
+        """A UserIntent for a high-confidence command, or None to use the LLM."""
+        if not self.enabled or not raw_text:
+            return None
+        started_at = time.perf_counter()
+        self.stats["attempts"] += 1
+        result = None
+        try:
+            result = await self._classify(_normalize(raw_text))
+        except Exception as e:
+            print(f"⚠️ [FastIntent] Falling back to LLM: {e}")
+        self.stats["total_ms"] += (time.perf_counter() - started_at) * 1000
+        if result is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self.stats["by_intent"][result.intent_type] += 1
+        print(f"⚡ [FastIntent] {result.intent_type} without LLM: {result.data}")
+        return result
+
+    async def _classify(self, text: str) -> Optional[UserIntent]:
+        for intent_type, patterns in PATTERNS.items():
+            for pattern in patterns:
+                match = pattern.match(text)
+                if not match:
+                    continue
+                if intent_type == "CHECK_STOCK":
+                    result = await self._check_stock(match)
+                elif intent_type == "RECORD_PAYMENT":
+                    result = await self._record_payment(match)
+                else:
+                    result = await self._payment_reminder(match)
+                if result:
+                    return result
+        return None
+
+    async def _check_stock(self, match) -> Optional[UserIntent]:
+        if not await product_index.ensure_loaded():
+            return None
+        # Exact or Contains only; loose matches are left to the LLM
+        product = product_index.match(match.group("product"), fuzzy=False)
+        if not product:
+            return None
+        return self._intent(
+            "CHECK_STOCK",
+            CheckStockIntent(product_name=product["name"]),
+            f"Checking stock of {product['name']}.",
+        )
+
+    async def _record_payment(self, match) -> Optional[UserIntent]:
+        customer = await self._customer(match.group("name"))
+        amount = float(match.group("amount").replace(",", ""))
+        if not customer or amount <= 0:
+            return None
+        return self._intent(
+            "RECORD_PAYMENT",
+            RecordPaymentIntent(customer_name=customer["full_name"], amount=amount),
+            f"Recording a payment of Rs. {amount:g} from {customer['full_name']}.",
+        )
+
+    async def _payment_reminder(self, match) -> Optional[UserIntent]:
+        customer = await self._customer(match.group("name"))
+        if not customer:
+            return None
+        return self._intent(
+            "PAYMENT_REMINDER",
+            PaymentReminderIntent(
+                customer_name=customer["full_name"],
+                amount_due=customer["total_debt"],
+            ),
+            f"Checking the balance of {customer['full_name']}.",
+        )
+
+    async def _customer(self, name: str) -> Optional[Dict[str, Any]]:
+        if not await ledger_aggregates.ensure_loaded():
+            return None
+        return ledger_aggregates.match_customer(name)
+
+    @staticmethod
+    def _intent(intent_type: str, data, response_text: str) -> UserIntent:
+        return UserIntent(
+            internal_thought=f"Matched the {intent_type} fast-path rule.",
+            intent_type=intent_type,
+            confidence=1.0,
+            data=data,
+            missing_info=[],
+            response_text=response_text,
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        attempts = self.stats["attempts"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "hit_rate": round(self.stats["hits"] / attempts, 3) if attempts else 0.0,
+            "avg_ms": round(self.stats["total_ms"] / attempts, 3) if attempts else 0.0,
+        }
+
+
+fast_intent = FastIntentClassifier()
@@ -9,16 +9,17 @@
 """
 
 # imports
+import json
 import os
-from typing import List, Optional, Union, Dict
+from typing import List, Optional, Union
 from pydantic import BaseModel, Field
-from openai import OpenAI
 from dotenv import load_dotenv
+from lib.openai_client import openai_call
+from lib.keyed_executor import KeyedExecutor
+from services.session_store import create_session_backend
 
 # config
 load_dotenv()
-# Initialize client with key from environment
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
 # --- SCHEMA DEFINITIONS ---
@@ -131,6 +132,21 @@ class UserIntent(BaseModel):
     response_text: str
 
 
+INTENT_DATA_MODELS = {
+    model.__name__: model
+    for model in (
+        CreateInvoiceIntent,
+        PaymentReminderIntent,
+        CheckStockIntent,
+        RecordPaymentIntent,
+        GenerateReportIntent,
+        GeneratePaymentLinkIntent,
+        PostSocialIntent,
+        UpdateStockIntent,
+    )
+}
+
+
 # --- SESSION MANAGER ---
 """
  -THIS STORES THE CONTEXT FOR FURTHER CHAT FOR A SHORT TIME
@@ -140,21 +156,66 @@ class UserIntent(BaseModel):
 
 
 class SessionManager:
-    def __init__(self):
-        self._sessions: Dict[str, UserIntent] = {}
+    """
+    Draft intents per session, serialized into a TTL-bounded backend
+    (see services.session_store) so memory stays flat and workers can share it.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or create_session_backend()
+
+    @staticmethod
+    def _dump(intent: UserIntent) -> str:
+        # The data model name is stored so e.g. UpdateStockIntent isn't read
+        # back as the CheckStockIntent its fields also satisfy
+        return json.dumps(
+            {
+                "intent": intent.model_dump(mode="json", exclude={"data"}),
+                "data_type": type(intent.data).__name__ if intent.data else None,
+                "data": (
+                    intent.data.model_dump(mode="json", exclude_none=True)
+                    if intent.data
+                    else None
+                ),
+            },
+            separators=(",", ":"),
+        )
+
+    @staticmethod
+    def _load(payload: str) -> UserIntent:
+        raw = json.loads(payload)
+        data = None
+        if raw.get("data") is not None:
+            data = INTENT_DATA_MODELS[raw["data_type"]].model_validate(raw["data"])
+        return UserIntent(**raw["intent"], data=data)
+
+    async def save_session(self, session_id: str, intent: UserIntent):
+        await self.backend.set(session_id, self._dump(intent))
 
-    def save_session(self, session_id: str, intent: UserIntent):
-        self._sessions[session_id] = intent
+    async def get_session(self, session_id: str) -> Optional[UserIntent]:
+        payload = await self.backend.get(session_id)
+        if payload is None:
+            return None
+        try:
+            return self._load(payload)
+        except Exception as e:
+            print(f"⚠️ [SessionManager] Dropping unreadable session {session_id}: {e}")
+            await self.backend.delete(session_id)
+            return None
 
-    def get_session(self, session_id: str) -> Optional[UserIntent]:
-        return self._sessions.get(session_id)
+    async def clear_session(self, session_id: str):
+        await self.backend.delete(session_id)
 
-    def clear_session(self, session_id: str):
-        if session_id in self._sessions:
-            del self._sessions[session_id]
+    def stats(self):
+        return self.backend.stats()
 
 
 session_manager = SessionManager()
+# Handlers that read and then save/clear a session's memory run through this,
+# one message at a time per session id (different sessions run in parallel)
+session_executor = KeyedExecutor(
+    "SessionExecutor", max_pending=int(os.getenv("SESSION_MAX_PENDING", "5"))
+)
 
 
 # --- SERVICE LOGIC ---
@@ -191,16 +252,19 @@ class IntentService:
         )
 
     async def parse_message(self, text, language):
-        completion = client.beta.chat.completions.parse(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"{self.system_instruction}\n\nIMPORTANT: Speak ONLY in English or Hinglish.",
-                },
-                {"role": "user", "content": text},
-            ],
-            response_format=UserIntent,
+        completion = await openai_call(
+            "intent.parse_message",
+            lambda client: client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": f"{self.system_instruction}\n\nIMPORTANT: Speak ONLY in English or Hinglish.",
+                    },
+                    {"role": "user", "content": text},
+                ],
+                response_format=UserIntent,
+            ),
         )
 
         return completion.choices[0].message.parsed
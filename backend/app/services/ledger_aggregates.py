@@ -0,0 +1,214 @@
+"""
+Ledger aggregates for the dashboard and the intent fast path.
+
+get_overall_ledger and get_all_debtors used to scan every invoice and payment
+(or every indebted customer) on each dashboard load. The aggregates are now
+materialized in the database and kept current on every write:
+
+- Totals: the single ledger_summary row, updated by triggers on invoices and
+  payments (db.sql), so reading them is one primary-key lookup whichever
+  worker or path wrote the rows. Without the table the totals are summed
+  from invoices and payments as before.
+- Per-customer balances: customers.total_debt, maintained by the atomic
+  commit_invoice / increment_customer_debt RPCs. The debtor list walks the
+  partial customers_debtors_idx index, i.e. only customers who owe money.
+- A customer directory (id -> full_name, total_debt) is also kept in memory
+  for name matching in services.fast_intent. It is updated in place from the
+  balances returned by the atomic debt updates and refreshed in the
+  background every LEDGER_AGGREGATES_REFRESH_SECONDS; balances written while
+  a refresh is in flight are re-applied on top of its snapshot.
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from lib.supabase_lib import get_supabase_client, run_query
+
+LEDGER_AGGREGATES_REFRESH_SECONDS = float(
+    os.getenv("LEDGER_AGGREGATES_REFRESH_SECONDS", "300")
+)
+
+# PostgREST / Postgres codes for a missing table
+MISSING_TABLE_CODES = {"PGRST205", "42P01"}
+
+
+class LedgerAggregates:
+    def __init__(self, refresh_seconds: float = LEDGER_AGGREGATES_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.use_summary = True
+        self._customers: Dict[str, Dict[str, Any]] = {}  # id -> {full_name, total_debt}
+        self._loaded_at: Optional[float] = None
+        self._reload_requested = False
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Set while load() runs: customers written meanwhile, re-applied after it
+        self._written_during_load: Optional[Dict[str, Dict[str, Any]]] = None
+
+    # --- DASHBOARD READS ---
+    async def overall(self) -> Dict[str, float]:
+        totals = await self._totals()
+        return {
+            **totals,
+            "balance_due": totals["total_billed"] - totals["total_paid"],
+        }
+
+    async def debtors(self) -> List[Dict[str, Any]]:
+        """Customers who owe money (> 0), highest debt first."""
+        res = await run_query(
+            get_supabase_client()
+            .table("customers")
+            .select("full_name, total_debt")
+            .gt("total_debt", 0)
+            .order("total_debt", desc=True)
+        )
+        return res.data
+
+    async def _totals(self) -> Dict[str, float]:
+        supabase = get_supabase_client()
+        if self.use_summary:
+            try:
+                res = await run_query(
+                    supabase.table("ledger_summary")
+                    .select("total_billed, total_paid")
+                    .limit(1)
+                )
+                if res.data:
+                    return {
+                        "total_billed": float(res.data[0]["total_billed"] or 0),
+                        "total_paid": float(res.data[0]["total_paid"] or 0),
+                    }
+                print("⚠️ [LedgerAggregates] ledger_summary is not seeded")
+            except Exception as e:
+                if getattr(e, "code", None) not in MISSING_TABLE_CODES:
+                    raise
+                print(f"⚠️ [LedgerAggregates] ledger_summary table unavailable: {e}")
+                self.use_summary = False
+
+        inv_data = await run_query(supabase.table("invoices").select("total_amount"))
+        pay_data = await run_query(supabase.table("payments").select("amount_received"))
+        return {
+            "total_billed": sum(
+                float(row.get("total_amount") or 0) for row in inv_data.data
+            ),
+            "total_paid": sum(
+                float(row.get("amount_received") or 0) for row in pay_data.data
+            ),
+        }
+
+    # --- CUSTOMER DIRECTORY ---
+    async def load(self):
+        """(Re)loads the customer directory from Supabase."""
+        self._written_during_load = {}
+        try:
+            cust_data = await run_query(
+                get_supabase_client()
+                .table("customers")
+                .select("id, full_name, total_debt")
+            )
+            customers = {
+                row["id"]: {
+                    "full_name": row["full_name"],
+                    "total_debt": float(row.get("total_debt") or 0),
+                }
+                for row in cust_data.data
+            }
+            # Newer than the snapshot: written after the query was sent
+            customers.update(self._written_during_load)
+        finally:
+            self._written_during_load = None
+
+        self._customers = customers
+        self._loaded_at = time.monotonic()
+        self._reload_requested = False
+        print(f"✅ [LedgerAggregates] Loaded {len(customers)} customer balances")
+
+    def is_stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or self._reload_requested
+            or time.monotonic() - self._loaded_at > self.refresh_seconds
+        )
+
+    async def ensure_loaded(self) -> bool:
+        """
+        Loads the customer directory on first use; later refreshes run in the
+        background. False if it has never been loaded.
+        """
+        if self._loaded_at is None:
+            async with self._lock:
+                if self._loaded_at is None:
+                    try:
+                        await self.load()
+                    except Exception as e:
+                        print(f"⚠️ [LedgerAggregates] Load failed: {e}")
+            return self._loaded_at is not None
+        if self.is_stale() and (
+            self._refresh_task is None or self._refresh_task.done()
+        ):
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return True
+
+    async def _refresh(self):
+        async with self._lock:
+            if not self.is_stale():
+                return
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"⚠️ [LedgerAggregates] Refresh failed: {e}")
+
+    def match_customer(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        The customer `name` unambiguously refers to: an exact (case-insensitive)
+        full name, else the only customer whose name starts with it or contains
+        it as whole words ("rahul" or "sharma" for "Rahul Sharma", but not "ram"
+        for "Shriram Traders"). None otherwise.
+        """
+        query = " ".join(str(name).lower().split())
+        if not query:
+            return None
+        partial = re.compile(rf"(?:^|\s){re.escape(query)}(?:\s|$)")
+        candidates = []
+        for customer_id, customer in self._customers.items():
+            full_name = " ".join(str(customer["full_name"] or "").lower().split())
+            if full_name == query:
+                return {"id": customer_id, **customer}
+            if full_name.startswith(query) or partial.search(full_name):
+                candidates.append({"id": customer_id, **customer})
+        return candidates[0] if len(candidates) == 1 else None
+
+    # --- LOCAL WRITES ---
+    def add_customer(self, customer_id: str, full_name: str):
+        customer = self._customers.setdefault(
+            customer_id, {"full_name": full_name, "total_debt": 0.0}
+        )
+        self._remember(customer_id, customer)
+
+    def set_debt(
+        self,
+        customer_id: str,
+        total_debt: Optional[float],
+        full_name: Optional[str] = None,
+    ):
+        """Stores a customer's new balance (as returned by the atomic debt update)."""
+        if total_debt is None:
+            return
+        customer = self._customers.get(customer_id)
+        if customer is None:
+            if full_name is None:
+                # Unknown customer: let the next read refresh the directory
+                self._reload_requested = True
+                return
+            customer = self._customers[customer_id] = {"full_name": full_name}
+        customer["total_debt"] = float(total_debt)
+        self._remember(customer_id, customer)
+
+    def _remember(self, customer_id: str, customer: Dict[str, Any]):
+        if self._written_during_load is not None:
+            self._written_during_load[customer_id] = dict(customer)
+
+
+ledger_aggregates = LedgerAggregates()
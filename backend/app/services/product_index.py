@@ -0,0 +1,237 @@
+"""
+In-memory product catalog index for name matching.
+
+Voice/WhatsApp invoices name products loosely ("pvc pipe", "Cement bag"). Instead
+of up to three `ilike` queries per item (exact, contains, per-word OR), the
+catalog (id, name, price, stock) is loaded once and every item is resolved
+locally with the same precedence, scored:
+
+1. Exact     - case/whitespace-insensitive name equality
+2. Contains  - the product name contains the input (closest length wins)
+3. Fuzzy     - multi-word input, product name contains any of the words
+               (most words matched wins, then trigram similarity)
+4. Similar   - trigram similarity above PRODUCT_MATCH_MIN_SIMILARITY (typos)
+
+Substring candidates come from a trigram index, so matching stays cheap as the
+catalog grows. Writes made through ActionService update the index in place;
+changes from elsewhere are picked up by a reload every
+PRODUCT_INDEX_REFRESH_SECONDS.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from lib.supabase_lib import get_supabase_client, run_query
+
+PRODUCT_INDEX_REFRESH_SECONDS = float(os.getenv("PRODUCT_INDEX_REFRESH_SECONDS", "60"))
+PRODUCT_MATCH_MIN_SIMILARITY = float(os.getenv("PRODUCT_MATCH_MIN_SIMILARITY", "0.5"))
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(str(name).lower().split())
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _padded_trigrams(text: str) -> Set[str]:
+    return _trigrams(f"  {text} ")
+
+
+class ProductIndex:
+    def __init__(self, refresh_seconds: float = PRODUCT_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._products: Dict[str, Dict[str, Any]] = {}  # id -> row (load order)
+        self._names: Dict[str, str] = {}  # id -> normalized name
+        self._by_name: Dict[str, str] = {}  # normalized name -> first id
+        self._by_trigram: Dict[str, Set[str]] = {}
+        self._trigram_sets: Dict[str, Set[str]] = {}
+        self._order: Dict[str, int] = {}  # id -> catalog position, for tie-breaks
+        self._next_position = 0
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        """(Re)builds the index from the products table."""
+        res = await run_query(
+            get_supabase_client()
+            .table("products")
+            .select("id, name, base_price, current_stock")
+        )
+        self._products = {}
+        self._names = {}
+        self._by_name = {}
+        self._by_trigram = {}
+        self._trigram_sets = {}
+        self._order = {}
+        for row in res.data:
+            self._add(row)
+        self._loaded_at = time.monotonic()
+        print(f"✅ [ProductIndex] Indexed {len(self._products)} products")
+
+    def is_stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > self.refresh_seconds
+        )
+
+    async def ensure_loaded(self) -> bool:
+        """Loads/refreshes the index if needed. False if it is unavailable."""
+        if self.is_stale():
+            async with self._lock:
+                if self.is_stale():
+                    try:
+                        await self.load()
+                    except Exception as e:
+                        print(f"⚠️ [ProductIndex] Load failed: {e}")
+        return self._loaded_at is not None
+
+    # --- MATCHING ---
+    def match(self, name: str, fuzzy: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Best product for `name`, as the product row plus "method" and "score".
+        With fuzzy=False only Exact and Contains matches are considered.
+        """
+        query = normalize_name(name)
+        if not query:
+            return None
+
+        product_id = self._by_name.get(query)
+        if product_id:
+            return self._result(product_id, "Exact", 1.0)
+
+        contains = [
+            pid
+            for pid in self._substring_candidates(query)
+            if query in self._names[pid]
+        ]
+        if contains:
+            # Closest in length to the input, i.e. the least extra text around it
+            best = max(contains, key=lambda pid: len(query) / len(self._names[pid]))
+            return self._result(
+                best, "Contains", 0.5 + 0.4 * len(query) / len(self._names[best])
+            )
+
+        if not fuzzy:
+            return None
+
+        words = query.split()
+        if len(words) > 1:
+            matched_words: Dict[str, int] = {}
+            for word in words:
+                for pid in self._substring_candidates(word):
+                    if word in self._names[pid]:
+                        matched_words[pid] = matched_words.get(pid, 0) + 1
+            if matched_words:
+                query_trigrams = _padded_trigrams(query)
+                best = max(
+                    matched_words,
+                    key=lambda pid: (
+                        matched_words[pid],
+                        self._similarity(query_trigrams, pid),
+                    ),
+                )
+                return self._result(
+                    best, "Fuzzy", 0.2 + 0.3 * matched_words[best] / len(words)
+                )
+
+        best, similarity = self._most_similar(query)
+        if best and similarity >= PRODUCT_MATCH_MIN_SIMILARITY:
+            return self._result(best, "Similar", 0.5 * similarity)
+        return None
+
+    def match_many(
+        self, names: Iterable[str], fuzzy: bool = True
+    ) -> List[Optional[Dict[str, Any]]]:
+        return [self.match(name, fuzzy=fuzzy) for name in names]
+
+    def get_exact(self, name: str) -> Optional[Dict[str, Any]]:
+        product_id = self._by_name.get(normalize_name(name))
+        return self._products.get(product_id) if product_id else None
+
+    # --- WRITES ---
+    def upsert(self, row: Dict[str, Any]):
+        """Indexes a (possibly partial) product row, merging into the cached one."""
+        merged = {**self._products.get(row["id"], {}), **row}
+        self.remove(row["id"])
+        self._add(merged)
+
+    def set_stock(self, product_id: str, stock: float):
+        if product_id in self._products:
+            self._products[product_id]["current_stock"] = stock
+
+    def remove(self, product_id: str):
+        row = self._products.pop(product_id, None)
+        if row is None:
+            return
+        name = self._names.pop(product_id)
+        self._order.pop(product_id, None)
+        if self._by_name.get(name) == product_id:
+            del self._by_name[name]
+            # Another product may share the name
+            for pid, other in self._names.items():
+                if other == name:
+                    self._by_name[name] = pid
+                    break
+        for trigram in self._trigram_sets.pop(product_id):
+            self._by_trigram[trigram].discard(product_id)
+
+    # --- INTERNALS ---
+    def _add(self, row: Dict[str, Any]):
+        name = normalize_name(row.get("name") or "")
+        if not name:
+            return
+        product_id = row["id"]
+        self._products[product_id] = row
+        self._names[product_id] = name
+        self._order[product_id] = self._next_position
+        self._next_position += 1
+        self._by_name.setdefault(name, product_id)
+        trigrams = _padded_trigrams(name)
+        self._trigram_sets[product_id] = trigrams
+        for trigram in trigrams:
+            self._by_trigram.setdefault(trigram, set()).add(product_id)
+
+    def _substring_candidates(self, text: str) -> Iterable[str]:
+        """Products that may contain `text`: those holding all of its trigrams."""
+        trigrams = _trigrams(text)
+        if not trigrams:
+            return list(self._products)  # Too short to filter, check them all
+        candidates = set.intersection(
+            *(self._by_trigram.get(t, set()) for t in trigrams)
+        )
+        # Catalog order, so equal scores resolve like the old first-row pick
+        return sorted(candidates, key=self._order.__getitem__)
+
+    def _similarity(self, query_trigrams: Set[str], product_id: str) -> float:
+        trigrams = self._trigram_sets[product_id]
+        union = len(query_trigrams | trigrams)
+        return len(query_trigrams & trigrams) / union if union else 0.0
+
+    def _most_similar(self, query: str):
+        query_trigrams = _padded_trigrams(query)
+        overlap: Dict[str, int] = {}
+        for trigram in query_trigrams:
+            for pid in self._by_trigram.get(trigram, ()):
+                overlap[pid] = overlap.get(pid, 0) + 1
+        best, best_similarity = None, 0.0
+        for pid, shared in overlap.items():
+            similarity = shared / (
+                len(query_trigrams) + len(self._trigram_sets[pid]) - shared
+            )
+            if similarity > best_similarity:
+                best, best_similarity = pid, similarity
+        return best, best_similarity
+
+    def _result(self, product_id: str, method: str, score: float) -> Dict[str, Any]:
+        return {
+            **self._products[product_id],
+            "method": method,
+            "score": round(score, 3),
+        }
+
+
+product_index = ProductIndex()
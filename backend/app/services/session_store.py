@@ -0,0 +1,153 @@
+"""
+Storage backends for SessionManager (services.intent_service).
+
+A session is the serialized draft intent of one conversation (phone number,
+voice session id), kept between messages until the action completes. Both
+backends store opaque strings and expire them after a TTL:
+
+- MemorySessionBackend: per-process, bounded LRU of zlib-compressed payloads.
+  Used by default, in single-worker setups and as the local stand-in for tests.
+- SupabaseSessionBackend: the intent_sessions table, shared by every uvicorn
+  worker behind a load balancer. Falls back to memory if the table is missing.
+"""
+
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from lib.supabase_lib import supabase, run_query
+from lib.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+# Expired rows are deleted once every this many saves (shared backend only)
+SESSION_PURGE_EVERY = int(os.getenv("SESSION_PURGE_EVERY", "200"))
+
+# PostgREST / Postgres codes for a missing table
+MISSING_TABLE_CODES = {"PGRST205", "42P01"}
+
+
+class MemorySessionBackend:
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        max_entries: int = SESSION_MAX_ENTRIES,
+    ):
+        self._cache = TTLCache(ttl_seconds, max_entries=max_entries)
+
+    async def get(self, session_id: str) -> Optional[str]:
+        payload = self._cache.get(session_id)
+        return zlib.decompress(payload).decode() if payload is not None else None
+
+    async def set(self, session_id: str, payload: str):
+        self._cache.set(session_id, zlib.compress(payload.encode()))
+
+    async def delete(self, session_id: str):
+        self._cache.pop(session_id)
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._cache),
+            "max_entries": self._cache.max_entries,
+            "hits": self._cache.hits,
+            "misses": self._cache.misses,
+        }
+
+
+class SupabaseSessionBackend:
+    def __init__(self, ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.persist = True
+        self._fallback = MemorySessionBackend(ttl_seconds)
+        self._saves = 0
+
+    def _disable(self, e: Exception):
+        if getattr(e, "code", None) not in MISSING_TABLE_CODES:
+            raise e
+        logger.warning(
+            f"⚠️ intent_sessions table unavailable, sessions kept in memory: {e}"
+        )
+        self.persist = False
+
+    async def get(self, session_id: str) -> Optional[str]:
+        if self.persist:
+            try:
+                res = await run_query(
+                    supabase.table("intent_sessions")
+                    .select("payload")
+                    .eq("session_id", session_id)
+                    .gt("expires_at", datetime.now(timezone.utc).isoformat())
+                    .limit(1)
+                )
+                return res.data[0]["payload"] if res.data else None
+            except Exception as e:
+                self._disable(e)
+        return await self._fallback.get(session_id)
+
+    async def set(self, session_id: str, payload: str):
+        if self.persist:
+            now = datetime.now(timezone.utc)
+            try:
+                await run_query(
+                    supabase.table("intent_sessions").upsert(
+                        {
+                            "session_id": session_id,
+                            "payload": payload,
+                            "expires_at": (
+                                now + timedelta(seconds=self.ttl_seconds)
+                            ).isoformat(),
+                            "updated_at": now.isoformat(),
+                        },
+                        on_conflict="session_id",
+                    )
+                )
+                self._saves += 1
+                if self._saves % SESSION_PURGE_EVERY == 0:
+                    await self._purge_expired(now)
+                return
+            except Exception as e:
+                self._disable(e)
+        await self._fallback.set(session_id, payload)
+
+    async def delete(self, session_id: str):
+        if self.persist:
+            try:
+                await run_query(
+                    supabase.table("intent_sessions")
+                    .delete()
+                    .eq("session_id", session_id)
+                )
+                return
+            except Exception as e:
+                self._disable(e)
+        await self._fallback.delete(session_id)
+
+    async def _purge_expired(self, now: datetime):
+        try:
+            await run_query(
+                supabase.table("intent_sessions")
+                .delete()
+                .lt("expires_at", now.isoformat())
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to purge expired intent sessions: {e}")
+
+    def stats(self):
+        if not self.persist:
+            return {**self._fallback.stats(), "backend": "memory (fallback)"}
+        return {"backend": "supabase", "saves": self._saves}
+
+
+def create_session_backend(kind: Optional[str] = None):
+    """Backend named by SESSION_BACKEND: 'memory' (default) or 'supabase'."""
+    kind = (kind or os.getenv("SESSION_BACKEND", "memory")).lower()
+    if kind == "supabase":
+        return SupabaseSessionBackend()
+    if kind != "memory":
+        logger.warning(f"⚠️ Unknown SESSION_BACKEND '{kind}', using memory")
+    return MemorySessionBackend()
@@ -1,15 +1,12 @@
-import os
 import logging
 from typing import Dict, Any, Optional
-from openai import OpenAI
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+from lib.openai_client import openai_call
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 
 class SocialMention(BaseModel):
     platform: str = Field(description="The platform (e.g., 'bluesky', 'instagram')")
@@ -60,13 +57,16 @@ class SocialService:
         )
 
         try:
-            completion = client.beta.chat.completions.parse(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self.system_instruction},
-                    {"role": "user", "content": prompt},
-                ],
-                response_format=SocialReply,
+            completion = await openai_call(
+                "social.draft_reply",
+                lambda client: client.beta.chat.completions.parse(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": self.system_instruction},
+                        {"role": "user", "content": prompt},
+                    ],
+                    response_format=SocialReply,
+                ),
             )
             return completion.choices[0].message.parsed
         except Exception as e:
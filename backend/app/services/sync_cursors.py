@@ -0,0 +1,77 @@
+"""
+Per-account sync high-water marks for SyncService.
+
+Each (platform, account) has a small JSON cursor, e.g. the last seen rev of
+every Bluesky convo or the newest Pixelfed notification id, so a sync cycle
+only fetches what is new. Cursors are kept in memory and persisted to the
+sync_cursors table; if that table doesn't exist they live in memory only
+(a restart then re-reads the latest page, which ingestion dedups).
+"""
+
+import logging
+from typing import Any, Dict, Tuple
+
+from lib.supabase_lib import supabase, run_query
+
+logger = logging.getLogger(__name__)
+
+# PostgREST / Postgres codes for a missing table
+MISSING_TABLE_CODES = {"PGRST205", "42P01"}
+
+
+class SyncCursorStore:
+    def __init__(self):
+        self._cursors: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._loaded = False
+        self.persist = True
+
+    async def _load(self):
+        try:
+            res = await run_query(
+                supabase.table("sync_cursors").select("platform, account, cursor")
+            )
+        except Exception as e:
+            self._disable(e)
+            self._loaded = True
+            return
+        self._loaded = True
+        for row in res.data or []:
+            self._cursors[(row["platform"], row["account"])] = row.get("cursor") or {}
+
+    def _disable(self, e: Exception):
+        if getattr(e, "code", None) not in MISSING_TABLE_CODES:
+            raise e
+        logger.warning(
+            f"⚠️ sync_cursors table unavailable, cursors kept in memory: {e}"
+        )
+        self.persist = False
+
+    async def get(self, platform: str, account: str) -> Dict[str, Any]:
+        """A copy of the cursor for (platform, account); {} if never synced."""
+        if not self._loaded:
+            await self._load()
+        return dict(self._cursors.get((platform, account), {}))
+
+    async def save(self, platform: str, account: str, cursor: Dict[str, Any]):
+        if self._cursors.get((platform, account)) == cursor:
+            return
+        self._cursors[(platform, account)] = dict(cursor)
+        if not self.persist:
+            return
+        try:
+            await run_query(
+                supabase.table("sync_cursors").upsert(
+                    {
+                        "platform": platform,
+                        "account": account,
+                        "cursor": cursor,
+                        "updated_at": "now()",
+                    },
+                    on_conflict="platform, account",
+                )
+            )
+        except Exception as e:
+            self._disable(e)
+
+
+sync_cursors = SyncCursorStore()
@@ -1,13 +1,24 @@
+import asyncio
 import logging
-from typing import Dict, Any
+import os
+from typing import Any, Dict, List, Optional
 from integrations.bluesky_tool import BlueskyTool
 from integrations.pixelfed_tool import PixelfedTool
-from lib.supabase_lib import supabase, get_active_workflows_by_trigger
-from workflows.engine import inngest_client
-from inngest import Event
+from lib.supabase_lib import supabase, run_query
+from lib.message_hub import message_hub
+from workflows.dispatch import dispatch_workflow_runs
+from workflows.trigger_index import trigger_index
+from services.sync_cursors import sync_cursors
 
 logger = logging.getLogger(__name__)
 
+# Conversations fetched in parallel per sync cycle
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "8"))
+# Older pages fetched per convo/feed when everything on a page is new
+SYNC_MAX_PAGES = int(os.getenv("SYNC_MAX_PAGES", "5"))
+# External ids per existence-check query (keeps the in_ URL short)
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "200"))
+
 
 class SyncService:
     def __init__(self):
@@ -15,9 +26,15 @@ class SyncService:
         self.pixelfed = PixelfedTool()
 
     async def sync_all(self):
-        """Main entry point to sync all platforms"""
-        await self.sync_bluesky()
-        await self.sync_pixelfed()
+        """Main entry point to sync all platforms (concurrently)"""
+        results = await asyncio.gather(
+            self.sync_bluesky(), self.sync_pixelfed(), return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        for error in errors:
+            logger.error(f"❌ Sync failed: {error}")
+        if errors:
+            raise errors[0]
 
     async def sync_bluesky(self):
         logger.info("🔄 Syncing Bluesky DMs...")
@@ -30,8 +47,33 @@ class SyncService:
             logger.error(f"Failed to list Bluesky convos: {convo_res.get('message')}")
             return
 
-        for convo in convo_res.get("convos", []):
+        # convo_id -> {"rev": convo rev, "message_rev": newest ingested message rev}
+        cursor = await sync_cursors.get("bluesky", my_handle)
+        seen = cursor.get("convos", {})
+
+        # A convo's rev only changes when something happens in it, so unchanged
+        # convos cost nothing beyond the list call
+        changed = [
+            convo
+            for convo in convo_res.get("convos", [])
+            if not convo.get("rev")
+            or seen.get(convo["id"], {}).get("rev") != convo["rev"]
+        ]
+        if not changed:
+            logger.info("✅ Bluesky: no new messages")
+            return
+
+        # We need our own DID to tell our messages from theirs.
+        # In atproto, msg.sender is a MessageViewSender with 'did'.
+        my_did = self.bluesky.client.me.did
+        semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+
+        fetched: Dict[str, Dict[str, Any]] = {}  # convo_id -> new mark
+        batch: List[Dict[str, Any]] = []
+
+        async def fetch_convo(convo):
             convo_id = convo["id"]
+            state = seen.get(convo_id, {})
             # Find the other member's handle
             other_members = [m for m in convo["members"] if m != my_handle]
             if not other_members:
@@ -40,146 +82,229 @@ class SyncService:
             else:
                 other_handle = other_members[0]
 
-            # 2. Fetch messages for this convo
+            # 2. Fetch messages for this convo that arrived since the last sync
+            async with semaphore:
+                messages = await self._fetch_new_convo_messages(
+                    convo_id, state.get("message_rev")
+                )
+            if messages is None:
+                return  # Keep the old mark so the convo is retried
+
+            # API returns newest first; ingest in the order they were sent
+            for msg in reversed(messages):
+                # We can't easily get the handle from a DID without another lookup,
+                # but we know it's either us or the 'other_handle'.
+                # Sessions are keyed by platform + external_id (other_handle).
+                is_me = msg["sender_did"] == my_did
+                batch.append(
+                    {
+                        "external_id": other_handle,
+                        "content": msg["text"],
+                        "sender_handle": my_handle if is_me else other_handle,
+                        "msg_external_id": msg["id"],
+                        "metadata": {"convo_id": convo_id},
+                        "session_metadata": {"convo_id": convo_id},
+                        "direction": "outbound" if is_me else "inbound",
+                    }
+                )
+            fetched[convo_id] = {
+                "rev": convo.get("rev"),
+                "message_rev": (
+                    messages[0]["rev"] if messages else state.get("message_rev")
+                ),
+            }
+
+        await asyncio.gather(*(fetch_convo(convo) for convo in changed))
+        # 3. Store everything in one batch; marks only move once it is stored
+        await self._ingest_batch("bluesky", batch)
+        seen.update(fetched)
+        cursor["convos"] = seen
+        await sync_cursors.save("bluesky", my_handle, cursor)
+
+    async def _fetch_new_convo_messages(
+        self, convo_id: str, since_rev: Optional[str]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Messages newer than `since_rev` (message revs sort chronologically),
+        newest first. Pages back while a whole page is new, up to SYNC_MAX_PAGES;
+        a convo seen for the first time only gets its latest page.
+        None if any fetch failed, so the convo is retried as a whole next cycle.
+        """
+        messages: List[Dict[str, Any]] = []
+        page_cursor = None
+        for _ in range(SYNC_MAX_PAGES if since_rev else 1):
             msg_res = await self.bluesky.execute(
-                "get_convo_messages", {"convo_id": convo_id, "limit": 20}
+                "get_convo_messages",
+                {"convo_id": convo_id, "limit": 20, "cursor": page_cursor},
             )
-            if msg_res.get("status") == "success":
-                for msg in msg_res.get("messages", []):
-                    # We don't have sender handle in msg objects from get_messages easily,
-                    # but we have sender_did.
-                    # For simplicity, if we are syncign we can just use the other_handle for the session.
-                    # _ingest_message upserts based on platform + external_id (other_handle).
-
-                    # We need to know who sent it.
-                    # In atproto, msg.sender is a MessageViewSender with 'did'.
-                    # We can't easily get handle from DID without another lookup,
-                    # but we know it's either us or the 'other_handle'.
-
-                    # For now, let's assume if it's not our DID, it's from the other_handle.
-                    # We need our own DID.
-                    my_did = self.bluesky.client.me.did
-
-                    is_me = msg["sender_did"] == my_did
-                    direction = "outbound" if is_me else "inbound"
-                    sender_handle = my_handle if is_me else other_handle
-
-                    await self._ingest_message(
-                        platform="bluesky",
-                        external_id=other_handle,
-                        content=msg["text"],
-                        sender_handle=sender_handle,
-                        msg_external_id=msg["id"],
-                        metadata={"convo_id": convo_id},
-                        direction=direction,
-                    )
-
-            # Update session metadata if needed
-            supabase.table("sessions").update({"metadata": {"convo_id": convo_id}}).eq(
-                "platform", "bluesky"
-            ).eq("external_id", other_handle).execute()
+            if msg_res.get("status") != "success":
+                logger.error(
+                    f"Failed to fetch Bluesky convo {convo_id}: {msg_res.get('message')}"
+                )
+                return None
+            page = msg_res.get("messages", [])
+            new = [m for m in page if not since_rev or m["rev"] > since_rev]
+            messages.extend(new)
+            page_cursor = msg_res.get("cursor")
+            if len(new) < len(page) or not page_cursor:
+                break
+        return messages
 
     async def sync_pixelfed(self):
         logger.info("🔄 Syncing Pixelfed notifications...")
-        res = await self.pixelfed.execute("get_notifications", {})
-        if res.get("status") == "success":
-            for note in res.get("notifications", []):
-                if note.get("type") == "mention":
-                    status = note.get("status", {})
-                    account = note.get("account", {})
-                    await self._ingest_message(
-                        platform="pixelfed",
-                        external_id=account.get("username"),
-                        content=status.get(
-                            "content", ""
-                        ),  # Pixelfed content might be HTML
-                        sender_handle=account.get("username"),
-                        msg_external_id=str(status.get("id")),
-                        metadata={"status_id": status.get("id")},
-                    )
-
-    async def _ingest_message(
-        self,
-        platform: str,
-        external_id: str,
-        content: str,
-        sender_handle: str,
-        msg_external_id: str,
-        metadata: Dict[str, Any] = None,
-        direction: str = "inbound",
-    ):
-        try:
-            # 1. UPSERT Session
-            session_payload = {
-                "platform": platform,
-                "external_id": external_id,
-                "updated_at": "now()",
-            }
-            session_res = (
-                supabase.table("sessions")
-                .upsert(session_payload, on_conflict="platform, external_id")
-                .execute()
+        account = self.pixelfed.instance_url
+        cursor = await sync_cursors.get("pixelfed", account)
+        since_id = cursor.get("since_id")
+
+        # Newest first; page back (max_id) while whole pages are new
+        notifications: List[Dict[str, Any]] = []
+        max_id = None
+        complete = True
+        for _ in range(SYNC_MAX_PAGES if since_id else 1):
+            res = await self.pixelfed.execute(
+                "get_notifications",
+                {"limit": 20, "since_id": since_id, "max_id": max_id},
             )
+            if res.get("status") != "success":
+                logger.error(
+                    f"Failed to fetch Pixelfed notifications: {res.get('message')}"
+                )
+                complete = False
+                break
+            page = res.get("notifications", [])
+            notifications.extend(page)
+            if not page or len(page) < 20:
+                break
+            max_id = page[-1].get("id")
 
-            if not session_res.data:
-                return
+        batch = []
+        for note in reversed(notifications):
+            if note.get("type") == "mention":
+                status = note.get("status", {})
+                account_info = note.get("account", {})
+                batch.append(
+                    {
+                        "external_id": account_info.get("username"),
+                        # Pixelfed content might be HTML
+                        "content": status.get("content", ""),
+                        "sender_handle": account_info.get("username"),
+                        "msg_external_id": str(status.get("id")),
+                        "metadata": {"status_id": status.get("id")},
+                    }
+                )
+        await self._ingest_batch("pixelfed", batch)
 
-            session_id = session_res.data[0]["id"]
-            is_bot_active = session_res.data[0].get("is_bot_active", True)
+        # Only move the mark past a fully fetched range, so a gap is retried
+        if notifications and complete:
+            cursor["since_id"] = str(notifications[0].get("id"))
+            await sync_cursors.save("pixelfed", account, cursor)
 
-            # 2. Check if message already exists to avoid duplicates
-            existing = (
+    async def _ingest_batch(self, platform: str, messages: List[Dict[str, Any]]) -> int:
+        """
+        Stores one sync cycle's messages for a platform in a handful of round
+        trips: an existence check per INGEST_CHUNK_SIZE external ids, then for
+        the new messages only one session upsert, one bulk insert and one
+        trigger lookup for the workflow dispatches.
+
+        Each message has external_id (the session handle), content,
+        sender_handle, msg_external_id and optionally metadata,
+        session_metadata and direction ("inbound" by default).
+        Returns the number of new messages; raises if they couldn't be stored.
+        """
+        # 1. Drop messages we already have (and repeats within the batch)
+        ids = list(dict.fromkeys(m["msg_external_id"] for m in messages))
+        known = set()
+        for i in range(0, len(ids), INGEST_CHUNK_SIZE):
+            existing = await run_query(
                 supabase.table("unified_messages")
-                .select("id")
-                .eq("external_id", msg_external_id)
-                .execute()
+                .select("external_id")
+                .in_("external_id", ids[i : i + INGEST_CHUNK_SIZE])
             )
-            if existing.data:
-                return
+            known.update(row["external_id"] for row in existing.data or [])
+        new_messages = []
+        for msg in messages:
+            if msg["msg_external_id"] not in known:
+                known.add(msg["msg_external_id"])
+                new_messages.append(msg)
+        if not new_messages:
+            return 0
 
-            # 3. Insert Message
+        # 2. UPSERT the sessions that got new messages, once each
+        session_payloads: Dict[str, Dict[str, Any]] = {}
+        for msg in new_messages:
+            payload = {
+                "platform": platform,
+                "external_id": msg["external_id"],
+                "updated_at": "now()",
+            }
+            if msg.get("session_metadata"):
+                payload["metadata"] = msg["session_metadata"]
+            session_payloads[msg["external_id"]] = payload
+        session_res = await run_query(
+            supabase.table("sessions").upsert(
+                list(session_payloads.values()), on_conflict="platform, external_id"
+            )
+        )
+        sessions = {row["external_id"]: row for row in session_res.data or []}
+
+        # 3. Insert Messages
+        rows = []
+        for msg in new_messages:
+            session = sessions.get(msg["external_id"])
+            if not session:
+                continue
+            content = msg["content"]
+            metadata = msg.get("metadata")
+            direction = msg.get("direction", "inbound")
             display_content = content
             if metadata and metadata.get("parent_content"):
                 parent_preview = metadata["parent_content"][:50]
                 if len(metadata["parent_content"]) > 50:
                     parent_preview += "..."
                 display_content = f'💬 [Replying to: "{parent_preview}"]\n\n{content}'
-
-            supabase.table("unified_messages").insert(
+            rows.append(
                 {
-                    "session_id": session_id,
+                    "session_id": session["id"],
                     "platform": platform,
                     "direction": direction,
                     "content": display_content,
-                    "external_id": msg_external_id,
-                    "sender_handle": sender_handle,
+                    "external_id": msg["msg_external_id"],
+                    "sender_handle": msg["sender_handle"],
                     "status": "received" if direction == "inbound" else "sent",
                 }
-            ).execute()
-
-            logger.info(f"✅ Ingested {platform} message from {sender_handle}")
-
-            # 4. Trigger Workflows if bot is active
-            if is_bot_active:
-                blueprints = get_active_workflows_by_trigger(platform)
-                for bp in blueprints:
-                    await inngest_client.send(
-                        Event(
-                            name="workflow/run_requested",
-                            data={
-                                "blueprint": bp,
-                                "payload": {
-                                    "author": sender_handle,
-                                    "text": content,
-                                    "platform": platform,
-                                    "external_id": external_id,
-                                    "metadata": metadata,
-                                },
-                            },
-                        )
-                    )
-        except Exception as e:
-            logger.error(f"❌ Error ingesting {platform} message: {e}")
+            )
+        if not rows:
+            return 0
+        inserted = await run_query(supabase.table("unified_messages").insert(rows))
+
+        message_hub.publish_rows(inserted.data)
+        logger.info(f"✅ Ingested {len(rows)} {platform} messages")
+
+        # 4. Trigger Workflows for sessions where the bot is active, in one send
+        blueprints = await trigger_index.lookup(platform)
+        runs = [
+            (
+                bp,
+                {
+                    "author": msg["sender_handle"],
+                    "text": msg["content"],
+                    "platform": platform,
+                    "external_id": msg["external_id"],
+                    "metadata": msg.get("metadata"),
+                },
+                f"{platform}:{msg['msg_external_id']}",  # One run per message
+            )
+            for msg in new_messages
+            if msg["external_id"] in sessions
+            and sessions[msg["external_id"]].get("is_bot_active", True)
+            for bp in blueprints
+        ]
+        if runs:
+            try:
+                await dispatch_workflow_runs(runs)
+            except Exception as e:
+                logger.error(f"❌ Error dispatching {platform} workflows: {e}")
+        return len(rows)
 
 
 sync_service = SyncService()
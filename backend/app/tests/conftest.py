@@ -0,0 +1,27 @@
+"""
+Shared test setup. Run from backend/app:
+    python -m pytest -q
+
+Modules create their Supabase / OpenAI clients at import time, so dummy
+credentials are set before anything is imported; no test talks to a real
+service. The real tool registry (integrations/) builds Twilio, Bluesky, etc.
+clients from live credentials, so the engine is imported against an empty
+registry and each test registers the tools it needs.
+"""
+
+import os
+import sys
+import types
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test.test.test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+if "integrations" not in sys.modules:
+    integrations = types.ModuleType("integrations")
+    integrations.TOOL_REGISTRY = {}
+    sys.modules["integrations"] = integrations
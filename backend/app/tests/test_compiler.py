@@ -0,0 +1,78 @@
+from workflows.compiler import CompiledBlueprint
+
+
+def _node(node_id, node_type="action", **extra):
+    return {"id": node_id, "type": node_type, "data": {}, **extra}
+
+
+def test_linear_blueprint_without_edges_is_not_dag():
+    compiled = CompiledBlueprint(
+        {"nodes": [_node("t", "trigger"), _node("a"), _node("b")]}
+    )
+    assert compiled.next_node("t") == "a"
+    assert compiled.next_node("b") is None
+    assert compiled.topo_order == ["t", "a", "b"]
+    assert not compiled.supports_dag
+
+
+def test_topo_order_respects_edges_and_list_order():
+    compiled = CompiledBlueprint(
+        {
+            "nodes": [_node("t", "trigger"), _node("c"), _node("a"), _node("b")],
+            "edges": [
+                {"source": "t", "target": "a"},
+                {"source": "t", "target": "b"},
+                {"source": "a", "target": "c"},
+                {"source": "b", "target": "c"},
+                {"source": "b", "target": "unknown"},
+            ],
+        }
+    )
+    assert compiled.topo_order == ["t", "a", "b", "c"]
+    assert compiled.dependencies["c"] == ["a", "b"]
+    assert compiled.supports_dag
+
+
+def test_router_targets_are_dependencies():
+    router = _node(
+        "r",
+        "router",
+        data={
+            "routes": [
+                {"condition": {}, "next_node_id": "x"},
+                {"next_node_id": "missing"},
+            ]
+        },
+    )
+    compiled = CompiledBlueprint(
+        {
+            "nodes": [_node("t", "trigger"), router, _node("x")],
+            "edges": [{"source": "t", "target": "r"}],
+        }
+    )
+    assert compiled.router_targets["r"] == ["x"]
+    assert compiled.dependencies["x"] == ["r"]
+    assert compiled.topo_order == ["t", "r", "x"]
+
+
+def test_cycle_has_no_topo_order():
+    compiled = CompiledBlueprint(
+        {
+            "nodes": [_node("a"), _node("b")],
+            "edges": [
+                {"source": "a", "target": "b"},
+                {"source": "b", "target": "a"},
+            ],
+        }
+    )
+    assert compiled.topo_order is None
+    assert not compiled.supports_dag
+
+
+def test_duplicate_ids_keep_legacy_semantics():
+    first = _node("a", data={"params": {"v": 1}})
+    last = _node("a", data={"params": {"v": 2}})
+    compiled = CompiledBlueprint({"nodes": [first, _node("b"), last]})
+    assert compiled.node_map["a"] is last
+    assert compiled.next_node("a") == "b"
+    assert compiled.order == ["a", "b"]
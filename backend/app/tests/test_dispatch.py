@@ -0,0 +1,49 @@
+"""dispatch_workflow_runs: batching, dedupe and the ids it reports back."""
+
+import asyncio
+
+import pytest
+
+import workflows.dispatch as dispatch
+from workflows.dispatch import dispatch_workflow_runs, idempotency_key
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    batches = []
+
+    async def fake_send(events):
+        batches.append(list(events))
+
+    monkeypatch.setattr(dispatch.inngest_client, "send", fake_send)
+    return batches
+
+
+def test_deduped_runs_return_the_event_ids_sent(sent):
+    blueprint = {"id": "wf-1"}
+    ids = asyncio.run(
+        dispatch_workflow_runs(
+            [(blueprint, {"n": 1}), (blueprint, {"n": 1}), (blueprint, {"n": 2})]
+        )
+    )
+
+    assert ids == [
+        idempotency_key(blueprint, {"n": 1}),
+        idempotency_key(blueprint, {"n": 2}),
+    ]
+    assert [event.id for event in sent[0]] == ids
+
+
+def test_explicit_key_overrides_the_payload(sent):
+    blueprint = {"id": "wf-1"}
+    ids = asyncio.run(
+        dispatch_workflow_runs([(blueprint, {"n": 1}, "k"), (blueprint, {"n": 2}, "k")])
+    )
+    assert ids == [idempotency_key(blueprint, "k")]
+
+
+def test_without_dedupe_every_run_is_sent_under_its_returned_id(sent):
+    blueprint = {"id": "wf-1"}
+    ids = asyncio.run(dispatch_workflow_runs([(blueprint, {"n": 1})] * 2, dedupe=False))
+    assert len(set(ids)) == 2
+    assert [event.id for event in sent[0]] == ids
@@ -0,0 +1,184 @@
+"""
+EngagementService bucketing (UTC, like the SQL date_trunc) on the Python
+fallback path, and single-flight cache loads on the RPC path.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import services.engagement_service as module
+from services.engagement_service import EngagementService
+
+NOW = datetime(2024, 5, 8, 10, 30, tzinfo=timezone.utc)  # a Wednesday
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW.astimezone(tz) if tz else NOW.replace(tzinfo=None)
+
+
+class MissingFunction(Exception):
+    code = "PGRST202"
+
+
+class FakeQuery:
+    def __init__(self, db, name, args=None):
+        self.db, self.name, self.args = db, name, args
+
+    def select(self, *args):
+        return self
+
+    def gte(self, column, value):
+        self.db.since = value
+        return self
+
+
+@pytest.fixture
+def db(monkeypatch):
+    state = SimpleNamespace(messages=[], rpc_rows=None, rpc_calls=0, since=None)
+
+    async def fake_run_query(query):
+        if query.name == "engagement_histogram":
+            state.rpc_calls += 1
+            await asyncio.sleep(0.01)
+            if state.rpc_rows is None:
+                raise MissingFunction("function not found")
+            return SimpleNamespace(data=state.rpc_rows)
+        return SimpleNamespace(data=state.messages)
+
+    fake_supabase = SimpleNamespace(
+        rpc=lambda name, args: FakeQuery(state, name, args),
+        table=lambda name: FakeQuery(state, name),
+    )
+    monkeypatch.setattr(module, "datetime", FrozenDatetime)
+    monkeypatch.setattr(module, "supabase", fake_supabase)
+    monkeypatch.setattr(module, "run_query", fake_run_query)
+    return state
+
+
+def _histogram(service, window_days, granularity):
+    return asyncio.run(service.get_histogram(window_days, granularity))
+
+
+def test_daily_fallback_buckets_in_utc(db):
+    db.messages = [
+        {"created_at": "2024-05-08T09:00:00Z", "platform": "whatsapp"},
+        {"created_at": "2024-05-08T00:00:00+00:00", "platform": "whatsapp"},
+        # 01:30 in India is still the previous day in UTC
+        {"created_at": "2024-05-08T01:30:00+05:30", "platform": "instagram"},
+        # Naive timestamps are UTC
+        {"created_at": "2024-05-06T00:00:00", "platform": "bluesky"},
+    ]
+    service = EngagementService()
+
+    histogram = _histogram(service, 3, "daily")
+
+    assert not service.use_rpc
+    assert db.since == "2024-05-06T00:00:00+00:00"
+    assert histogram == [
+        {
+            "date": "2024-05-06",
+            "whatsapp": 0,
+            "instagram": 0,
+            "bluesky": 1,
+            "pixelfed": 0,
+        },
+        {
+            "date": "2024-05-07",
+            "whatsapp": 0,
+            "instagram": 1,
+            "bluesky": 0,
+            "pixelfed": 0,
+        },
+        {
+            "date": "2024-05-08",
+            "whatsapp": 2,
+            "instagram": 0,
+            "bluesky": 0,
+            "pixelfed": 0,
+        },
+    ]
+
+
+def test_hourly_fallback_covers_the_window_up_to_the_current_hour(db):
+    db.messages = [
+        {"created_at": "2024-05-08T10:29:59Z", "platform": "pixelfed"},
+        {"created_at": "2024-05-07T11:00:00Z", "platform": "pixelfed"},
+    ]
+
+    histogram = _histogram(EngagementService(), 1, "hourly")
+
+    assert len(histogram) == 24
+    assert db.since == "2024-05-07T11:00:00+00:00"
+    assert histogram[0]["date"] == "2024-05-07T11:00"
+    assert histogram[-1]["date"] == "2024-05-08T10:00"
+    assert histogram[0]["pixelfed"] == histogram[-1]["pixelfed"] == 1
+
+
+def test_weekly_fallback_buckets_start_on_monday(db):
+    db.messages = [
+        {"created_at": "2024-05-01T12:00:00Z", "platform": "whatsapp"},
+        {"created_at": "2024-05-12T23:59:00Z", "platform": "whatsapp"},
+    ]
+
+    histogram = _histogram(EngagementService(), 14, "weekly")
+
+    assert [(row["date"], row["whatsapp"]) for row in histogram] == [
+        ("2024-04-29", 1),
+        ("2024-05-06", 1),
+    ]
+
+
+def test_unknown_granularity_is_rejected(db):
+    with pytest.raises(ValueError, match="Unknown granularity"):
+        _histogram(EngagementService(), 7, "monthly")
+
+
+def test_concurrent_misses_share_one_rpc_call(db):
+    db.rpc_rows = [
+        {"bucket": "2024-05-08T00:00:00", "platform": "whatsapp", "count": 5},
+    ]
+    service = EngagementService()
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(service.get_histogram(3, "daily") for _ in range(10))
+        )
+        # Cached afterwards
+        results.append(await service.get_histogram(3, "daily"))
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert db.rpc_calls == 1
+    assert all(result == results[0] for result in results)
+    assert results[0][-1]["whatsapp"] == 5
+
+
+def test_a_failed_load_is_shared_but_not_cached(db):
+    service = EngagementService()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        first = await asyncio.gather(
+            *(service.cache.get_or_load("key", failing) for _ in range(3)),
+            return_exceptions=True,
+        )
+        second = await asyncio.gather(
+            service.cache.get_or_load("key", failing), return_exceptions=True
+        )
+        return first + second
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(calls) == 2
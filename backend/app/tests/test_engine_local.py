@@ -0,0 +1,169 @@
+"""
+Drives workflows.engine.run_workflow through the in-process LocalContext.
+Supabase writes are captured instead of sent; tools are registered per test.
+"""
+
+import asyncio
+
+import pytest
+
+import workflows.engine as engine
+import workflows.log_writer as log_writer
+from workflows.local_executor import LocalContext
+
+
+class RecordingTool:
+    def __init__(self, delay: float = 0.0, fail_tasks=()):
+        self.delay = delay
+        self.fail_tasks = set(fail_tasks)
+        self.calls = []
+        self.events = []  # ("start" | "end", task), in order
+
+    async def execute(self, task, params):
+        self.calls.append((task, params))
+        self.events.append(("start", task))
+        await asyncio.sleep(self.delay)
+        self.events.append(("end", task))
+        if task in self.fail_tasks:
+            return {"status": "error", "message": f"{task} broke"}
+        return {"status": "success", "task": task, "params": params}
+
+
+@pytest.fixture
+def db_writes(monkeypatch):
+    """Captures every query the engine and log writer would execute."""
+    writes = []
+
+    async def fake_query(query):
+        writes.append(query)
+        return None
+
+    async def fake_run_query(query):
+        writes.append(query)
+        return None
+
+    monkeypatch.setattr(engine, "query_data", fake_query)
+    monkeypatch.setattr(log_writer, "run_query", fake_run_query)
+    return writes
+
+
+@pytest.fixture
+def tool(monkeypatch):
+    tool = RecordingTool()
+    monkeypatch.setitem(engine.TOOL_REGISTRY, "rec", tool)
+    return tool
+
+
+def _action(node_id, params=None, **extra):
+    return {
+        "id": node_id,
+        "type": "action",
+        "data": {"service": "rec", "task": node_id, "params": params or {}},
+        **extra,
+    }
+
+
+def _run(blueprint, payload):
+    ctx = LocalContext("run-1", {"blueprint": blueprint, "payload": payload})
+    asyncio.run(engine.run_workflow(ctx))
+    return ctx
+
+
+def test_linear_blueprint_runs_in_order_and_resolves_params(db_writes, tool):
+    blueprint = {
+        "nodes": [
+            {"id": "t", "type": "trigger", "data": {}},
+            _action("greet", {"text": "Hi {{trigger_data.name}}"}),
+            _action("follow_up", {"prev": "{{greet.task}}"}),
+        ]
+    }
+    _run(blueprint, {"name": "Rahul"})
+
+    assert tool.calls == [
+        ("greet", {"text": "Hi Rahul"}),
+        ("follow_up", {"prev": "greet"}),
+    ]
+    assert db_writes  # initialize / status / finalize went through query_data
+
+
+def test_router_follows_the_selected_branch(db_writes, tool):
+    router = {
+        "id": "r",
+        "type": "router",
+        "data": {
+            "routes": [
+                {
+                    "condition": {
+                        "variable": "{{trigger_data.amount}}",
+                        "operator": ">",
+                        "value": 100,
+                    },
+                    "next_node_id": "big",
+                },
+                {"next_node_id": "small"},
+            ]
+        },
+    }
+    blueprint = {
+        "nodes": [
+            {"id": "t", "type": "trigger", "data": {}},
+            router,
+            _action("small", next_node_id="end"),
+            _action("big", next_node_id="end"),
+            _action("end"),
+        ]
+    }
+    _run(blueprint, {"amount": 500})
+    assert [task for task, _ in tool.calls] == ["big", "end"]
+
+    tool.calls.clear()
+    _run(blueprint, {"amount": 5})
+    assert [task for task, _ in tool.calls] == ["small", "end"]
+
+
+def test_dag_runs_a_wave_of_branches_concurrently(db_writes, monkeypatch):
+    tool = RecordingTool(delay=0.05)
+    monkeypatch.setitem(engine.TOOL_REGISTRY, "rec", tool)
+    blueprint = {
+        "execution_mode": "dag",
+        "nodes": [
+            {"id": "t", "type": "trigger", "data": {}},
+            _action("a"),
+            _action("b"),
+            _action("join", {"left": "{{a.task}}", "right": "{{b.task}}"}),
+        ],
+        "edges": [
+            {"source": "t", "target": "a"},
+            {"source": "t", "target": "b"},
+            {"source": "a", "target": "join"},
+            {"source": "b", "target": "join"},
+        ],
+    }
+    _run(blueprint, {})
+
+    # Both branches start before either finishes, the join runs after both
+    assert tool.events[:2] == [("start", "a"), ("start", "b")]
+    assert tool.events[-2:] == [("start", "join"), ("end", "join")]
+    assert tool.calls[-1] == ("join", {"left": "a", "right": "b"})
+
+
+def test_failing_node_stops_the_run_and_logs_failure(db_writes, monkeypatch):
+    tool = RecordingTool(fail_tasks={"charge"})
+    monkeypatch.setitem(engine.TOOL_REGISTRY, "rec", tool)
+    blueprint = {
+        "nodes": [
+            {"id": "t", "type": "trigger", "data": {}},
+            _action("charge"),
+            _action("receipt"),
+        ]
+    }
+    with pytest.raises(ValueError, match="charge broke"):
+        _run(blueprint, {})
+
+    assert [task for task, _ in tool.calls] == ["charge"]
+    # The last write marks the run failed with the node's error
+    failure = db_writes[-1]
+    assert failure.json == {
+        "status": "failed",
+        "error_message": "Node charge failed: charge broke",
+    }
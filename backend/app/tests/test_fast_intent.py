@@ -0,0 +1,174 @@
+"""
+Table-driven checks of the fast intent patterns against a fixed catalog and
+customer list: confident commands resolve without the LLM, anything less
+certain returns None so the caller falls back to it.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+import services.fast_intent as fast_intent_module
+from services.fast_intent import FastIntentClassifier
+from services.ledger_aggregates import LedgerAggregates
+from services.product_index import ProductIndex
+
+PRODUCTS = [
+    {"id": "p1", "name": "PVC Pipe", "base_price": 120, "current_stock": 40},
+    {"id": "p2", "name": "Cement Bag", "base_price": 400, "current_stock": 12},
+]
+CUSTOMERS = {
+    "c1": {"full_name": "Rahul Sharma", "total_debt": 500.0},
+    "c2": {"full_name": "Shriram Traders", "total_debt": 1200.0},
+    "c3": {"full_name": "Amit Kumar", "total_debt": 0.0},
+    "c4": {"full_name": "Amit Verma", "total_debt": 300.0},
+}
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    products = ProductIndex()
+    for row in PRODUCTS:
+        products._add(dict(row))
+    products._loaded_at = time.monotonic()
+
+    ledger = LedgerAggregates()
+    ledger._customers = {cid: dict(c) for cid, c in CUSTOMERS.items()}
+    ledger._loaded_at = time.monotonic()
+
+    monkeypatch.setattr(fast_intent_module, "product_index", products)
+    monkeypatch.setattr(fast_intent_module, "ledger_aggregates", ledger)
+    return FastIntentClassifier(enabled=True)
+
+
+def _classify(classifier, text):
+    return asyncio.run(classifier.classify(text))
+
+
+@pytest.mark.parametrize(
+    "text, intent_type, data",
+    [
+        # CHECK_STOCK
+        ("stock of pvc pipe", "CHECK_STOCK", {"product_name": "PVC Pipe"}),
+        ("What's the stock of PVC pipe?", "CHECK_STOCK", {"product_name": "PVC Pipe"}),
+        ("check qty for cement bag", "CHECK_STOCK", {"product_name": "Cement Bag"}),
+        ("how much cement bag is left", "CHECK_STOCK", {"product_name": "Cement Bag"}),
+        ("pvc pipe ka stock kitna hai", "CHECK_STOCK", {"product_name": "PVC Pipe"}),
+        ("cement bag ki stock", "CHECK_STOCK", {"product_name": "Cement Bag"}),
+        # RECORD_PAYMENT
+        (
+            "Rahul paid 500",
+            "RECORD_PAYMENT",
+            {"customer_name": "Rahul Sharma", "amount": 500.0},
+        ),
+        (
+            "rahul sharma has paid Rs. 1,500",
+            "RECORD_PAYMENT",
+            {"customer_name": "Rahul Sharma", "amount": 1500.0},
+        ),
+        (
+            "received ₹500 from sharma",
+            "RECORD_PAYMENT",
+            {"customer_name": "Rahul Sharma", "amount": 500.0},
+        ),
+        (
+            "got 250 rupees from shriram",
+            "RECORD_PAYMENT",
+            {"customer_name": "Shriram Traders", "amount": 250.0},
+        ),
+        (
+            "rahul ne 500 diye",
+            "RECORD_PAYMENT",
+            {"customer_name": "Rahul Sharma", "amount": 500.0},
+        ),
+        (
+            "Amit Verma ne 300/- jama kiye",
+            "RECORD_PAYMENT",
+            {"customer_name": "Amit Verma", "amount": 300.0},
+        ),
+        # PAYMENT_REMINDER
+        (
+            "how much does Rahul owe me?",
+            "PAYMENT_REMINDER",
+            {"customer_name": "Rahul Sharma", "amount_due": 500.0},
+        ),
+        (
+            "Rahul's balance",
+            "PAYMENT_REMINDER",
+            {"customer_name": "Rahul Sharma", "amount_due": 500.0},
+        ),
+        (
+            "what's shriram traders' dues",
+            "PAYMENT_REMINDER",
+            {"customer_name": "Shriram Traders", "amount_due": 1200.0},
+        ),
+        (
+            "remind amit verma to pay",
+            "PAYMENT_REMINDER",
+            {"customer_name": "Amit Verma", "amount_due": 300.0},
+        ),
+        (
+            "rahul ka udhaar kitna hai",
+            "PAYMENT_REMINDER",
+            {"customer_name": "Rahul Sharma", "amount_due": 500.0},
+        ),
+        (
+            "shriram ka baaki",
+            "PAYMENT_REMINDER",
+            {"customer_name": "Shriram Traders", "amount_due": 1200.0},
+        ),
+    ],
+)
+def test_confident_commands_skip_the_llm(classifier, text, intent_type, data):
+    intent = _classify(classifier, text)
+
+    assert intent is not None
+    assert intent.intent_type == intent_type
+    assert intent.confidence == 1.0
+    assert intent.missing_info == []
+    assert intent.data.model_dump(include=set(data)) == data
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Extra words the patterns don't account for
+        "rahul paid 500 for cement yesterday",
+        "please check stock of pvc pipe and cement bag",
+        "how much does rahul owe for last month",
+        # Ambiguous customer: two Amits
+        "amit paid 500",
+        "how much does amit owe",
+        # Unknown customer or product
+        "suresh paid 500",
+        "remind suresh to pay",
+        "stock of steel rod",
+        # Only a substring inside another word ("ram" in "Shriram")
+        "ram paid 500",
+        "ram ka balance",
+        # Zero amount
+        "rahul paid 0",
+        "received rs 0 from rahul",
+        # Not a command at all
+        "hello",
+    ],
+)
+def test_near_misses_fall_back_to_the_llm(classifier, text):
+    assert _classify(classifier, text) is None
+
+
+def test_stats_count_hits_and_misses(classifier):
+    _classify(classifier, "rahul paid 500")
+    _classify(classifier, "amit paid 500")
+
+    snapshot = classifier.snapshot()
+    assert snapshot["attempts"] == 2
+    assert snapshot["hits"] == 1
+    assert snapshot["by_intent"]["RECORD_PAYMENT"] == 1
+    assert snapshot["hit_rate"] == 0.5
+
+
+def test_disabled_classifier_never_matches(classifier):
+    classifier.enabled = False
+    assert _classify(classifier, "rahul paid 500") is None
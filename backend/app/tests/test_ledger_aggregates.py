@@ -0,0 +1,109 @@
+"""
+LedgerAggregates against a fake Supabase: dashboard reads from the
+ledger_summary row, and the customer directory keeping balances written
+while it reloads.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import services.ledger_aggregates as module
+from services.ledger_aggregates import LedgerAggregates
+
+
+class FakeQuery:
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, _):
+        return lambda *args, **kwargs: self
+
+
+class FakeClient:
+    def table(self, name):
+        return FakeQuery(name)
+
+    def rpc(self, name, params):
+        return FakeQuery(name)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Responses by table/RPC name; `hooks` run while a query is in flight."""
+    state = SimpleNamespace(rows={}, hooks={}, queries=[])
+
+    async def fake_run_query(query):
+        state.queries.append(query.name)
+        hook = state.hooks.pop(query.name, None)
+        if hook:
+            hook()
+        await asyncio.sleep(0)
+        rows = state.rows[query.name]
+        if isinstance(rows, Exception):
+            raise rows
+        return SimpleNamespace(data=rows)
+
+    monkeypatch.setattr(module, "get_supabase_client", FakeClient)
+    monkeypatch.setattr(module, "run_query", fake_run_query)
+    return state
+
+
+class MissingTable(Exception):
+    code = "PGRST205"
+
+
+def test_overall_reads_the_summary_row(db):
+    ledger = LedgerAggregates()
+    db.rows["ledger_summary"] = [{"total_billed": "1000.50", "total_paid": 400}]
+
+    totals = asyncio.run(ledger.overall())
+
+    assert totals == {"total_billed": 1000.5, "total_paid": 400.0, "balance_due": 600.5}
+    assert db.queries == ["ledger_summary"]
+
+
+def test_overall_sums_the_tables_without_the_summary_table(db):
+    ledger = LedgerAggregates()
+    db.rows["ledger_summary"] = MissingTable("relation does not exist")
+    db.rows["invoices"] = [{"total_amount": 700}, {"total_amount": None}]
+    db.rows["payments"] = [{"amount_received": 200}]
+
+    async def scenario():
+        return await ledger.overall(), await ledger.overall()
+
+    first, second = asyncio.run(scenario())
+    assert first == {"total_billed": 700.0, "total_paid": 200.0, "balance_due": 500.0}
+    assert second == first
+    # The missing table is only tried once
+    assert db.queries == [
+        "ledger_summary",
+        "invoices",
+        "payments",
+        "invoices",
+        "payments",
+    ]
+
+
+def test_other_summary_errors_are_raised(db):
+    ledger = LedgerAggregates()
+    db.rows["ledger_summary"] = RuntimeError("connection reset")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(ledger.overall())
+    assert ledger.use_summary
+
+
+def test_balances_written_during_a_reload_survive_it(db):
+    ledger = LedgerAggregates()
+    db.rows["customers"] = [
+        {"id": "c1", "full_name": "Rahul Sharma", "total_debt": 500},
+    ]
+    asyncio.run(ledger.load())
+
+    # The snapshot still says 500; the payment lands while it is in flight
+    db.hooks["customers"] = lambda: ledger.set_debt("c1", 200)
+    asyncio.run(ledger.load())
+
+    assert ledger.match_customer("rahul sharma")["total_debt"] == 200.0
@@ -0,0 +1,93 @@
+"""MessageHub fan-out: filtering, bounded queues that drop the oldest, and the subscriber cap."""
+
+import asyncio
+
+import pytest
+
+from lib.message_hub import HubFullError, MessageHub
+
+
+async def _events(subscription):
+    events = []
+    while True:
+        event = await subscription.get(timeout=0.01)
+        if event is None:
+            return events
+        events.append(event)
+
+
+def _drain(subscription):
+    return asyncio.run(_events(subscription))
+
+
+def _message(n, session_id="s1", platform="whatsapp"):
+    return {"id": n, "session_id": session_id, "platform": platform}
+
+
+def test_subscribers_only_get_matching_messages():
+    hub = MessageHub()
+    everything = hub.subscribe()
+    one_session = hub.subscribe(session_id="s2")
+    one_platform = hub.subscribe(platform="bluesky")
+
+    hub.publish_rows([_message(1), _message(2, "s2"), _message(3, "s3", "bluesky")])
+
+    assert [e["data"]["id"] for e in _drain(everything)] == [1, 2, 3]
+    assert [e["data"]["id"] for e in _drain(one_session)] == [2]
+    assert [e["data"]["id"] for e in _drain(one_platform)] == [3]
+
+
+def test_overflow_drops_the_oldest_and_reports_it_first():
+    hub = MessageHub(queue_size=2)
+    slow = hub.subscribe()
+
+    async def scenario():
+        for n in range(1, 5):
+            hub.publish(_message(n))
+        first = await _events(slow)
+        # Reported once; the next overflow starts a new count
+        hub.publish_rows([_message(5), _message(6), _message(7)])
+        return first, await _events(slow)
+
+    events, later = asyncio.run(scenario())
+    assert events[0] == {"type": "dropped", "data": {"count": 2}}
+    assert [e["data"]["id"] for e in events[1:]] == [3, 4]
+    assert all(e["type"] == "message" for e in events[1:])
+    assert later[0] == {"type": "dropped", "data": {"count": 1}}
+    assert [e["data"]["id"] for e in later[1:]] == [6, 7]
+    assert hub.stats() == {"subscribers": 1, "published": 7, "dropped": 3}
+
+
+def test_subscriber_limit():
+    hub = MessageHub(max_subscribers=2)
+    first = hub.subscribe()
+    hub.subscribe()
+
+    with pytest.raises(HubFullError):
+        hub.subscribe()
+
+    hub.unsubscribe(first)
+    hub.subscribe()
+    assert hub.stats()["subscribers"] == 2
+
+
+def test_unsubscribe_stops_delivery():
+    hub = MessageHub()
+    subscription = hub.subscribe()
+    hub.unsubscribe(subscription)
+    hub.unsubscribe(subscription)  # Idempotent, as the SSE finally block may race
+
+    hub.publish(_message(1))
+
+    assert _drain(subscription) == []
+    assert hub.stats() == {"subscribers": 0, "published": 1, "dropped": 0}
+
+
+def test_empty_messages_are_ignored():
+    hub = MessageHub()
+    subscription = hub.subscribe()
+    hub.publish(None)
+    hub.publish_rows(None)
+
+    assert _drain(subscription) == []
+    assert hub.published == 0
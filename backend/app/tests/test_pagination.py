@@ -0,0 +1,67 @@
+"""Keyset pagination params and cursors, built on a real postgrest builder."""
+
+from urllib.parse import parse_qs
+
+import pytest
+from postgrest import SyncPostgrestClient
+
+from lib.pagination import apply_keyset, decode_cursor, encode_cursor, nth_row, page
+
+
+def _params(builder):
+    return parse_qs(str(builder.params))
+
+
+def _query():
+    return SyncPostgrestClient("http://localhost").from_("messages").select("*")
+
+
+def test_first_page_orders_by_key_and_skips_null_cursor_columns():
+    params = _params(apply_keyset(_query(), "created_at", limit=20))
+
+    assert params["order"] == ["created_at.desc,id.desc"]
+    assert params["created_at"] == ["not.is.null"]
+    assert params["limit"] == ["21"]
+    assert "or" not in params
+
+
+def test_cursor_continues_strictly_after_the_last_row():
+    cursor = encode_cursor("2024-05-01T10:00:00+00:00", "m-9")
+    params = _params(apply_keyset(_query(), "created_at", cursor, descending=False))
+
+    assert params["or"] == [
+        '(created_at.gt."2024-05-01T10:00:00+00:00",'
+        'and(created_at.eq."2024-05-01T10:00:00+00:00",id.gt."m-9"))'
+    ]
+
+
+def test_nth_row_uses_offset_params_not_a_range_header():
+    # The WhatsApp aggregate view starts its stream after the (limit + 1)-th newest row
+    builder = nth_row(_query(), "created_at", 2000)
+    params = _params(builder)
+
+    assert params["order"] == ["created_at.desc,id.desc"]
+    assert params["created_at"] == ["not.is.null"]
+    assert params["limit"] == ["1"]
+    assert params["offset"] == ["2000"]
+    assert "Range" not in builder.headers
+
+
+def test_page_trims_the_probe_row_and_encodes_the_next_cursor():
+    rows = [{"id": i, "created_at": f"t{i}"} for i in range(3)]
+
+    assert page(rows, "created_at", 3) == (rows, None)
+    trimmed, cursor = page(rows, "created_at", 2)
+    assert trimmed == rows[:2]
+    assert decode_cursor(cursor) == ("t1", 1)
+
+
+def test_page_rejects_a_null_cursor_column():
+    rows = [{"id": 1, "created_at": "t1"}, {"id": 2, "created_at": None}, {"id": 3}]
+    with pytest.raises(ValueError, match="created_at is null"):
+        page(rows, "created_at", 2)
+
+
+def test_malformed_cursor_is_a_value_error():
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        apply_keyset(_query(), "created_at", "not-a-cursor")
@@ -0,0 +1,90 @@
+"""
+ProductIndex.match precedence and tie-breaks. The matched product is the one
+whose stock gets decremented, so each method is pinned down by example.
+"""
+
+import pytest
+
+from services.product_index import ProductIndex
+
+CATALOG = [
+    {"id": "p1", "name": "PVC Pipe 1 inch"},
+    {"id": "p2", "name": "PVC Pipe"},
+    {"id": "p3", "name": "Cement Bag 50kg"},
+    {"id": "p4", "name": "White Cement"},
+    {"id": "p5", "name": "Steel Rod 8mm"},
+    {"id": "p6", "name": "Steel Rod 10mm"},
+    {"id": "p7", "name": "Wall Putty"},
+    {"id": "p8", "name": "Tile Red"},
+    {"id": "p9", "name": "Tile Tan"},
+    {"id": "p10", "name": "Gypsum"},
+]
+
+
+@pytest.fixture
+def index():
+    index = ProductIndex()
+    for row in CATALOG:
+        index._add(dict(row))
+    return index
+
+
+@pytest.mark.parametrize(
+    "query, product_id, method, score",
+    [
+        # Exact: case and whitespace don't matter
+        ("pvc pipe", "p2", "Exact", 1.0),
+        ("  PVC   pipe ", "p2", "Exact", 1.0),
+        ("white cement", "p4", "Exact", 1.0),
+        # Contains: the product name contains the input
+        ("pipe 1", "p1", "Contains", 0.66),
+        ("rod 10", "p6", "Contains", 0.671),
+        # ... closest in length wins: "pvc pipe" over "pvc pipe 1 inch"
+        ("pipe", "p2", "Contains", 0.7),
+        # ... "white cement" (12 chars) over "cement bag 50kg" (15)
+        ("cement", "p4", "Contains", 0.7),
+        # ... "steel rod 8mm" (13 chars) over "steel rod 10mm" (14)
+        ("steel rod", "p5", "Contains", 0.777),
+        # ... equal lengths resolve in catalog order
+        ("tile", "p8", "Contains", 0.7),
+        # Fuzzy: multi-word input, most words contained wins
+        ("putty for wall", "p7", "Fuzzy", 0.4),
+        ("cement bags white", "p4", "Fuzzy", 0.4),
+        # Similar: a typo close enough in trigrams
+        ("gypsun", "p10", "Similar", 0.278),
+    ],
+)
+def test_match(index, query, product_id, method, score):
+    result = index.match(query)
+
+    assert result["id"] == product_id
+    assert result["method"] == method
+    assert result["score"] == score
+
+
+@pytest.mark.parametrize("query", ["granite slab", "xyz", "", "   "])
+def test_no_match(index, query):
+    assert index.match(query) is None
+
+
+@pytest.mark.parametrize(
+    "query, product_id",
+    [("pvc pipe", "p2"), ("cement", "p4"), ("tile", "p8")],
+)
+def test_strict_match_keeps_exact_and_contains(index, query, product_id):
+    assert index.match(query, fuzzy=False)["id"] == product_id
+
+
+@pytest.mark.parametrize("query", ["putty for wall", "cement bags white", "gypsun"])
+def test_strict_match_skips_fuzzy_and_similar(index, query):
+    assert index.match(query) is not None
+    assert index.match(query, fuzzy=False) is None
+
+
+def test_writes_update_matches(index):
+    index.upsert({"id": "p2", "name": "PVC Pipe 2 inch"})
+    index.remove("p8")
+
+    assert index.match("pvc pipe 2 inch")["id"] == "p2"
+    assert index.get_exact("pvc pipe") is None
+    assert index.match("tile")["id"] == "p9"
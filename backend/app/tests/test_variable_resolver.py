@@ -0,0 +1,52 @@
+from lib.variable_resolver import compile_template, resolve_recursive
+
+CONTEXT = {
+    "trigger_data": {"customer": {"name": "Rahul"}, "amount": 1500.5},
+    "database_1": {"results": [{"phone": "+9100"}]},
+}
+
+
+def test_static_tree_is_returned_as_is():
+    params = {"to": "+91", "body": "Hello", "tags": ["a", "b"], "count": 3}
+    template = compile_template(params)
+    assert template.is_static
+    assert template.render(CONTEXT) is params
+
+
+def test_placeholders_are_resolved_in_nested_dicts_and_lists():
+    template = compile_template(
+        {
+            "to": "{{database_1.results.0.phone}}",
+            "body": "Hi {{trigger_data.customer.name}}, you owe {{trigger_data.amount}}",
+            "lines": ["static", "{{trigger_data.customer.name}}"],
+            "retries": 2,
+        }
+    )
+    assert not template.is_static
+    assert template.render(CONTEXT) == {
+        "to": "+9100",
+        "body": "Hi Rahul, you owe 1500.50",
+        "lines": ["static", "Rahul"],
+        "retries": 2,
+    }
+
+
+def test_missing_paths_render_a_marker():
+    template = compile_template("{{trigger_data.missing.key}}")
+    assert template.render(CONTEXT) == "[trigger_data.missing.key not found]"
+
+
+def test_template_is_reusable_across_contexts():
+    template = compile_template({"name": "{{trigger_data.customer.name}}"})
+    assert template.render(CONTEXT) == {"name": "Rahul"}
+    other = {"trigger_data": {"customer": {"name": "Amit"}}}
+    assert template.render(other) == {"name": "Amit"}
+
+
+def test_matches_resolve_recursive():
+    params = {
+        "a": ["{{trigger_data.amount}}", {"b": "x{{trigger_data.customer.name}}"}]
+    }
+    assert compile_template(params).render(CONTEXT) == resolve_recursive(
+        params, CONTEXT
+    )
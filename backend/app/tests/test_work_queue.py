@@ -0,0 +1,69 @@
+"""WorkQueue and the LocalExecutor built on it."""
+
+import asyncio
+
+import pytest
+
+import workflows.local_executor as local_executor_module
+from lib.work_queue import WorkQueue
+from workflows.local_executor import LocalExecutor
+
+
+def test_jobs_run_on_workers_and_failures_are_counted():
+    done = []
+
+    async def job(value):
+        done.append(value)
+
+    def broken():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        queue = WorkQueue("Test", workers=2, queue_size=10)
+        queue.submit(job, 1)
+        queue.submit(done.append, 2)  # plain callables work too
+        queue.submit(broken, label="broken job")
+        await queue._queue.join()
+        await queue.stop()
+        return queue.stats
+
+    stats = asyncio.run(scenario())
+    assert sorted(done) == [1, 2]
+    assert stats == {"submitted": 3, "completed": 2, "failed": 1, "rejected": 0}
+
+
+def test_submit_raises_queue_full_when_saturated():
+    async def scenario():
+        queue = WorkQueue("Test", workers=1, queue_size=1)
+        queue.submit(asyncio.sleep, 0)
+        with pytest.raises(asyncio.QueueFull):
+            queue.submit(asyncio.sleep, 0)
+        await queue.stop()
+        return queue.stats
+
+    stats = asyncio.run(scenario())
+    assert stats["submitted"] == 1
+    assert stats["rejected"] == 1
+
+
+def test_local_executor_queues_runs_on_a_work_queue(monkeypatch):
+    ran = []
+
+    async def fake_run(self, blueprint, payload, run_id=None):
+        ran.append((run_id, payload))
+        return run_id
+
+    monkeypatch.setattr(local_executor_module.LocalExecutor, "run", fake_run)
+
+    async def scenario():
+        executor = LocalExecutor(workers=1, queue_size=5)
+        run_id = executor.submit({"nodes": []}, {"n": 1}, run_id="run-1")
+        generated = executor.submit({"nodes": []}, {"n": 2})
+        await executor._queue._queue.join()
+        await executor.stop()
+        return run_id, generated, executor.stats
+
+    run_id, generated, stats = asyncio.run(scenario())
+    assert run_id == "run-1"
+    assert ran == [("run-1", {"n": 1}), (generated, {"n": 2})]
+    assert stats["completed"] == 2
@@ -0,0 +1,156 @@
+"""
+Compiled blueprint representation for the workflow engine.
+
+A blueprint arrives as plain JSON (nodes/edges). Walking it directly means every
+transition re-scans `nodes` to find the successor, which is O(n^2) per run and
+repeated on every Inngest replay and every `loop_seconds` iteration.
+
+`CompiledBlueprint` does that work once:
+- node_map: node id -> node
+- successors: the legacy "next" pointer (explicit next_node_id, else list order)
+- edges_out / edges_in: adjacency built from `WorkflowBlueprint.edges`
+- routers / router_targets: router nodes compiled into predicates, and the nodes they can select
+- param_templates: each action node's params compiled by lib.variable_resolver
+- dependencies / topo_order: the graph used by the DAG scheduler (edges + router targets)
+
+Compiled blueprints are cached keyed by workflow id + `updated_at`, so a new
+version of a saved workflow is recompiled automatically.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from lib.router_logic import CompiledRouter, compile_routes
+from lib.variable_resolver import Template, compile_template
+
+COMPILE_CACHE_SIZE = int(os.getenv("WORKFLOW_COMPILE_CACHE_SIZE", "256"))
+
+
+class CompiledBlueprint:
+    """Immutable, precomputed view of a blueprint used by the engine."""
+
+    def __init__(self, blueprint: Dict[str, Any]):
+        nodes: List[Dict[str, Any]] = blueprint.get("nodes") or []
+        edges: List[Dict[str, Any]] = blueprint.get("edges") or []
+
+        self.workflow_id: Optional[str] = blueprint.get("id")
+        # Duplicate ids keep the legacy engine's semantics: the node data is the
+        # last occurrence (it built node_map with a dict comprehension), while
+        # the list-order successor comes after the first occurrence (its
+        # enumerate() scan stopped at the first match)
+        self.node_map: Dict[str, Dict[str, Any]] = {node["id"]: node for node in nodes}
+        first_index: Dict[str, int] = {}
+        for index, node in enumerate(nodes):
+            first_index.setdefault(node["id"], index)
+        self.order: List[str] = list(first_index)
+
+        self.start_node_id: Optional[str] = nodes[0]["id"] if nodes else None
+
+        # Legacy successor table: explicit next_node_id, else the next node in list order
+        self.successors: Dict[str, Optional[str]] = {}
+        for node_id, index in first_index.items():
+            next_node_id = self.node_map[node_id].get("next_node_id")
+            if not next_node_id and index + 1 < len(nodes):
+                next_node_id = nodes[index + 1]["id"]
+            self.successors[node_id] = next_node_id
+
+        # Edge adjacency (ignores edges pointing at unknown nodes)
+        self.edges_out: Dict[str, List[str]] = {node_id: [] for node_id in self.order}
+        self.edges_in: Dict[str, List[str]] = {node_id: [] for node_id in self.order}
+        for edge in edges:
+            source, target = edge.get("source"), edge.get("target")
+            if source in self.node_map and target in self.node_map:
+                if target not in self.edges_out[source]:
+                    self.edges_out[source].append(target)
+                    self.edges_in[target].append(source)
+
+        self.routers: Dict[str, CompiledRouter] = {}
+        self.router_targets: Dict[str, List[str]] = {}
+        self.param_templates: Dict[str, Template] = {}
+        for node_id, node in self.node_map.items():
+            data = node.get("data") or {}
+            if node.get("type") == "router":
+                routes = data.get("routes", [])
+                self.routers[node_id] = compile_routes(routes)
+                self.router_targets[node_id] = [
+                    route["next_node_id"]
+                    for route in routes
+                    if route.get("next_node_id") in self.node_map
+                ]
+            else:
+                self.param_templates[node_id] = compile_template(data.get("params", {}))
+
+        # DAG view: a node depends on its edge sources and on routers that can select it
+        self.dependencies: Dict[str, List[str]] = {
+            node_id: list(sources) for node_id, sources in self.edges_in.items()
+        }
+        for router_id, targets in self.router_targets.items():
+            for target in targets:
+                if router_id not in self.dependencies[target]:
+                    self.dependencies[target].append(router_id)
+        self.topo_order: Optional[List[str]] = self._topological_order()
+
+    def next_node(self, node_id: str) -> Optional[str]:
+        """Returns the successor of an action/trigger node in O(1)."""
+        return self.successors.get(node_id)
+
+    @property
+    def supports_dag(self) -> bool:
+        """True when the blueprint has edges and they form an acyclic graph."""
+        return bool(self.topo_order) and any(self.dependencies.values())
+
+    def _topological_order(self) -> Optional[List[str]]:
+        """Kahn's algorithm, stable w.r.t. node list order. None if the graph has a cycle."""
+        remaining = {node_id: len(deps) for node_id, deps in self.dependencies.items()}
+        dependents: Dict[str, List[str]] = {node_id: [] for node_id in self.order}
+        for node_id, deps in self.dependencies.items():
+            for dep in deps:
+                dependents[dep].append(node_id)
+
+        ready = [node_id for node_id in self.order if remaining[node_id] == 0]
+        order: List[str] = []
+        while ready:
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for dependent in dependents[node_id]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+
+        return order if len(order) == len(self.order) else None
+
+
+_compiled_cache: "OrderedDict[Tuple[str, ...], CompiledBlueprint]" = OrderedDict()
+
+
+def _cache_key(blueprint: Dict[str, Any]) -> Tuple[str, ...]:
+    workflow_id = blueprint.get("id")
+    updated_at = blueprint.get("updated_at")
+    if workflow_id and updated_at:
+        return ("saved", str(workflow_id), str(updated_at))
+
+    # Ad-hoc blueprints (e.g. /workflow/execute) carry no version; key on content
+    content = json.dumps(
+        {"nodes": blueprint.get("nodes"), "edges": blueprint.get("edges")},
+        sort_keys=True,
+        default=str,
+    )
+    return ("adhoc", hashlib.sha1(content.encode("utf-8")).hexdigest())
+
+
+def get_compiled_blueprint(blueprint: Dict[str, Any]) -> CompiledBlueprint:
+    """Returns the cached compiled form of `blueprint`, compiling it on a miss."""
+    key = _cache_key(blueprint)
+    compiled = _compiled_cache.get(key)
+    if compiled is not None:
+        _compiled_cache.move_to_end(key)
+        return compiled
+
+    compiled = CompiledBlueprint(blueprint)
+    _compiled_cache[key] = compiled
+    while len(_compiled_cache) > COMPILE_CACHE_SIZE:
+        _compiled_cache.popitem(last=False)
+    return compiled
@@ -0,0 +1,134 @@
+"""
+Single entry point for starting workflow runs.
+
+Chooses between the Inngest queue (durable, retried steps) and the in-process
+LocalExecutor (low latency, no external services) per blueprint via its
+`executor` field, falling back to the WORKFLOW_EXECUTOR setting.
+
+Fan-out paths (webhooks, message sync) use dispatch_workflow_runs, which
+sends all their Inngest events in one request, retried with jittered backoff.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from inngest import Event
+from workflows.engine import inngest_client
+from workflows.local_executor import local_executor
+
+DEFAULT_EXECUTOR = os.getenv("WORKFLOW_EXECUTOR", "inngest")
+# Events per Inngest send request, and attempts per request
+DISPATCH_BATCH_SIZE = int(os.getenv("DISPATCH_BATCH_SIZE", "100"))
+DISPATCH_SEND_ATTEMPTS = int(os.getenv("DISPATCH_SEND_ATTEMPTS", "3"))
+DISPATCH_RETRY_BASE_SECONDS = float(os.getenv("DISPATCH_RETRY_BASE_SECONDS", "0.2"))
+
+
+def uses_local_executor(blueprint: Dict[str, Any]) -> bool:
+    return (blueprint.get("executor") or DEFAULT_EXECUTOR) == "local"
+
+
+async def dispatch_workflow_run(
+    blueprint: Dict[str, Any],
+    payload: Dict[str, Any],
+    run_id: Optional[str] = None,
+) -> str:
+    """Starts a run of `blueprint` with `payload` as trigger_data; returns the run_id."""
+    run_id = run_id or str(uuid.uuid4())
+
+    if uses_local_executor(blueprint):
+        try:
+            return local_executor.submit(blueprint, payload, run_id=run_id)
+        except asyncio.QueueFull:
+            print("⚠️ [dispatch] Local executor queue full, handing off to Inngest")
+
+    await _send_events([_run_event(blueprint, payload, event_id=run_id)])
+    return run_id
+
+
+def idempotency_key(blueprint: Dict[str, Any], key: Any) -> str:
+    """Stable id for "start `blueprint` for `key`" (sha256 of both)."""
+    raw = json.dumps(
+        [blueprint.get("id") or blueprint.get("name"), key],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def dispatch_workflow_runs(
+    runs: Iterable[Tuple[Any, ...]], dedupe: bool = True
+) -> List[str]:
+    """
+    Starts several runs at once; returns the id each was started with: its
+    local run_id, or the id of the Inngest event sent for it.
+
+    `runs` holds (blueprint, payload) or (blueprint, payload, key) tuples.
+    Local runs are submitted directly and all Inngest events go out in one
+    send (per DISPATCH_BATCH_SIZE). With `dedupe`, runs sharing an idempotency
+    key (default: the payload) start once; the key is also the Inngest event
+    id, so Inngest drops the same run sent again by a retried request.
+    """
+    ids: List[str] = []
+    events = []
+    seen = set()
+    for blueprint, payload, *key in runs:
+        event_id = None
+        if dedupe:
+            event_id = idempotency_key(blueprint, key[0] if key else payload)
+            if event_id in seen:
+                continue
+            seen.add(event_id)
+
+        if uses_local_executor(blueprint):
+            try:
+                # Always a fresh run_id: workflow_logs rows are keyed by it
+                ids.append(
+                    local_executor.submit(blueprint, payload, run_id=str(uuid.uuid4()))
+                )
+                continue
+            except asyncio.QueueFull:
+                print("⚠️ [dispatch] Local executor queue full, handing off to Inngest")
+
+        event_id = event_id or str(uuid.uuid4())
+        events.append(_run_event(blueprint, payload, event_id=event_id))
+        ids.append(event_id)
+
+    await _send_events(events)
+    return ids
+
+
+def _run_event(blueprint: Dict[str, Any], payload: Dict[str, Any], event_id: str):
+    return Event(
+        name="workflow/run_requested",
+        data={"blueprint": blueprint, "payload": payload},
+        id=event_id,
+    )
+
+
+async def _send_events(events: List[Event]):
+    """
+    Sends events in DISPATCH_BATCH_SIZE chunks, retrying a failed chunk with
+    exponential backoff and jitter. Every event carries an id, so a resend
+    after a partial failure doesn't start runs twice.
+    """
+    for start in range(0, len(events), DISPATCH_BATCH_SIZE):
+        chunk = events[start : start + DISPATCH_BATCH_SIZE]
+        for attempt in range(1, DISPATCH_SEND_ATTEMPTS + 1):
+            try:
+                await inngest_client.send(chunk)
+                break
+            except Exception as e:
+                if attempt == DISPATCH_SEND_ATTEMPTS:
+                    raise
+                delay = DISPATCH_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+                delay *= random.uniform(0.5, 1.5)
+                print(
+                    f"⚠️ [dispatch] Sending {len(chunk)} events failed ({e}), "
+                    f"retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
@@ -1,18 +1,26 @@
 from inngest import Inngest, TriggerEvent
 from integrations import TOOL_REGISTRY
 
+import asyncio
+import os
 from datetime import datetime
-from lib.supabase_lib import supabase
+from lib.supabase_lib import supabase, query_data
+from workflows.compiler import get_compiled_blueprint
+from workflows.log_writer import WorkflowLogWriter
 
 # 1. Initialize Inngest for development mode
 inngest_client = Inngest(app_id="biz_flow_engine", is_production=False)
 
+# "sequential" walks next_node_id one node at a time; "dag" runs independent
+# branches from `edges` concurrently. A blueprint's execution_mode overrides this.
+DEFAULT_EXECUTION_MODE = os.getenv("WORKFLOW_EXECUTION_MODE", "sequential")
 
-@inngest_client.create_function(
-    fn_id="execute_business_workflow",
-    trigger=TriggerEvent(event="workflow/run_requested"),
-)
-async def execute_workflow(ctx):
+
+async def run_workflow(ctx):
+    """
+    Executes one workflow run. `ctx` is an Inngest context, or a LocalContext from
+    workflows.local_executor that offers the same run_id / event / step API.
+    """
     print("\n" + "=" * 80)
     print("🚀 [WorkflowEngine] execute_workflow function called")
     print(f"🆔 [WorkflowEngine] Run ID: {ctx.run_id}")
@@ -30,18 +38,14 @@ async def execute_workflow(ctx):
     print("💾 [WorkflowEngine] Creating workflow_logs entry in Supabase")
     log_entry = await ctx.step.run(
         "initialize_log",
-        lambda: (
-            supabase.table("workflow_logs")
-            .insert(
-                {
-                    "workflow_id": workflow_id,
-                    "run_id": ctx.run_id,
-                    "status": "running",
-                    "trigger_data": event_payload,
-                }
-            )
-            .execute()
-            .data
+        query_data,
+        supabase.table("workflow_logs").insert(
+            {
+                "workflow_id": workflow_id,
+                "run_id": ctx.run_id,
+                "status": "running",
+                "trigger_data": event_payload,
+            }
         ),
     )
     print(f"✅ [WorkflowEngine] Workflow log initialized: {log_entry}")
@@ -51,6 +55,19 @@ async def execute_workflow(ctx):
     loop_seconds = blueprint.get("loop_seconds", 0)
     iteration = 0
 
+    # Compiled once per blueprint version (cached across Inngest replays and loop iterations)
+    compiled = get_compiled_blueprint(blueprint)
+
+    # Node state transitions are buffered and flushed in batches
+    log_writer = WorkflowLogWriter(ctx.run_id)
+
+    execution_mode = blueprint.get("execution_mode") or DEFAULT_EXECUTION_MODE
+    use_dag = execution_mode == "dag" and compiled.supports_dag
+    if execution_mode == "dag" and not use_dag:
+        print(
+            "⚠️ [WorkflowEngine] DAG mode needs acyclic edges; falling back to sequential"
+        )
+
     try:
         while True:
             iteration += 1
@@ -59,14 +76,11 @@ async def execute_workflow(ctx):
             # 0. Check for cancellation
             current_status = await ctx.step.run(
                 f"check_status_{iteration}",
-                lambda: (
-                    supabase.table("workflow_logs")
-                    .select("status")
-                    .eq("run_id", ctx.run_id)
-                    .single()
-                    .execute()
-                    .data
-                ),
+                query_data,
+                supabase.table("workflow_logs")
+                .select("status")
+                .eq("run_id", ctx.run_id)
+                .single(),
             )
 
             if current_status and current_status.get("status") == "cancelled":
@@ -76,216 +90,16 @@ async def execute_workflow(ctx):
                 break
 
             results = {"trigger_data": event_payload}
-            node_states = {}  # Track individual node execution states
+            log_writer.start_iteration()  # Track individual node execution states
             print(f"📊 [WorkflowEngine] Initial results: {results}")
 
-            # Build a map of nodes for O(1) lookup
-            node_map = {node["id"]: node for node in blueprint["nodes"]}
-
-            # Start from the first node in the list (or a specified start_node_id)
-            current_node_id = blueprint["nodes"][0]["id"]
-            steps_executed_count = 0
-            MAX_STEPS = 50  # Prevent infinite loops
-
-            while current_node_id and steps_executed_count < MAX_STEPS:
-                steps_executed_count += 1
-                node = node_map.get(current_node_id)
-
-                if not node:
-                    print(
-                        f"❌ [WorkflowEngine] Node {current_node_id} not found in blueprint"
-                    )
-                    break
-
-                node_id = node["id"]
-                node_type = node.get("type", "action")  # Default to action if missing
-
-                print(f"\n{'-' * 60}")
-                print(
-                    f"🔵 [WorkflowEngine] Processing node: {node_id} (Type: {node_type})"
-                )
-
-                # Mark node as running
-                node_states[node_id] = {
-                    "status": "running",
-                    "data": None,
-                    "error": None,
-                }
-
-                await ctx.step.run(
-                    f"mark_running_{node_id}_{iteration}",
-                    lambda ns=node_states.copy(): (
-                        supabase.table("workflow_logs")
-                        .update({"step_results": ns})
-                        .eq("run_id", ctx.run_id)
-                        .execute()
-                        .data
-                    ),
-                )
-
-                try:
-                    next_node_id = None
-
-                    if node_type == "trigger":
-                        # TRIGGER LOGIC - Pass through the event payload
-                        print(f"🎯 [WorkflowEngine] Processing trigger node {node_id}")
-                        print(f"📦 [WorkflowEngine] Trigger data: {event_payload}")
-
-                        action_result = event_payload  # Pass payload directly
-
-                        print(
-                            "✅ [WorkflowEngine] Trigger node completed - data available directly"
-                        )
-
-                        # Find next node using same logic as action nodes
-                        next_node_id = node.get("next_node_id")
-
-                        if not next_node_id:
-                            current_index = -1
-                            for i, n in enumerate(blueprint["nodes"]):
-                                if n["id"] == node_id:
-                                    current_index = i
-                                    break
-                            if current_index != -1 and current_index + 1 < len(
-                                blueprint["nodes"]
-                            ):
-                                next_node_id = blueprint["nodes"][current_index + 1][
-                                    "id"
-                                ]
-
-                    elif node_type == "router":
-                        # ROUTER LOGIC
-                        from lib.router_logic import find_next_step
-
-                        print(
-                            f"🔀 [WorkflowEngine] Evaluating router conditions for {node_id}"
-                        )
-
-                        routes = node.get("data", {}).get("routes", [])
-
-                        # We need to resolve variables against the results SO FAR
-                        next_node_id = find_next_step(routes, results)
-
-                        action_result = {
-                            "status": "routed",
-                            "selected_route": next_node_id,
-                            "message": f"Routed to {next_node_id}"
-                            if next_node_id
-                            else "No matching route found",
-                        }
-
-                        print(
-                            f"👉 [WorkflowEngine] Router decision: {action_result['message']}"
-                        )
-
-                        # If no route matched, we might stop or continue to a default edge?
-                        # For now, if no route matches, next_node_id is None, loop ends.
-
-                    else:
-                        # STANDARD ACTION LOGIC
-                        print(
-                            f"🚀 [WorkflowEngine] Executing action for node {node_id}"
-                        )
-
-                        async def _run_action():
-                            return await perform_action(node["data"], results)
-
-                        action_result = await ctx.step.run(
-                            f"execute_{node_id}_{iteration}",
-                            _run_action,
-                        )
-
-                        # Standard nodes usually flow to the "next" node in the list
-                        # BUT since we are now graph-based, we need an explicit "next" pointer
-                        # IF the blueprint stores edges/next_node_id.
-                        # FAILSAFE: If blueprint is old/linear, just take the next index.
-
-                        # Check if node has an explicit 'next_node_id'
-                        next_node_id = node.get("next_node_id")
-
-                        # If not, try to find the next node in the original list order (Legacy Support)
-                        if not next_node_id:
-                            current_index = -1
-                            for i, n in enumerate(blueprint["nodes"]):
-                                if n["id"] == node_id:
-                                    current_index = i
-                                    break
-                            if current_index != -1 and current_index + 1 < len(
-                                blueprint["nodes"]
-                            ):
-                                next_node_id = blueprint["nodes"][current_index + 1][
-                                    "id"
-                                ]
-
-                    # Handle Execution Results
-                    if (
-                        isinstance(action_result, dict)
-                        and action_result.get("status") == "error"
-                    ):
-                        error_msg = action_result.get("message", "Unknown tool error")
-                        print(f"❌ [WorkflowEngine] Action reported error: {error_msg}")
-                        raise ValueError(f"Node {node_id} failed: {error_msg}")
-
-                    # Store the result
-                    results[node_id] = action_result
-
-                    # ROBUSTNESS: Also store by service name if not already taken
-                    # This allows users to use {{razorpay.field}} regardless of the node ID
-                    service_name = node.get("data", {}).get("service")
-                    if service_name and service_name not in results:
-                        print(
-                            f"🔗 [WorkflowEngine] Mapping node {node_id} to service alias: {service_name}"
-                        )
-                        results[service_name] = action_result
-
-                    # Mark node as completed
-                    node_states[node_id] = {
-                        "status": "completed",
-                        "data": action_result,
-                        "error": None,
-                    }
-                    print(
-                        f"✅ [WorkflowEngine] Node {node_id} completed. Next -> {next_node_id}"
-                    )
-
-                except Exception as node_error:
-                    print(f"❌ [WorkflowEngine] Error in node {node_id}: {node_error}")
-                    node_states[node_id] = {
-                        "status": "failed",
-                        "data": None,
-                        "error": str(node_error),
-                    }
-                    # Update log failure state
-                    await ctx.step.run(
-                        f"update_log_fail_{node_id}_{iteration}",
-                        lambda ns=node_states.copy(): (
-                            supabase.table("workflow_logs")
-                            .update({"step_results": ns})
-                            .eq("run_id", ctx.run_id)
-                            .execute()
-                            .data
-                        ),
-                    )
-                    raise node_error
-
-                # Update log with completed state
-                await ctx.step.run(
-                    f"update_log_{node_id}_{iteration}",
-                    lambda ns=node_states.copy(): (
-                        supabase.table("workflow_logs")
-                        .update({"step_results": ns})
-                        .eq("run_id", ctx.run_id)
-                        .execute()
-                        .data
-                    ),
+            if use_dag:
+                await _run_dag(
+                    ctx, compiled, results, event_payload, iteration, log_writer
                 )
-
-                # Move to next node
-                current_node_id = next_node_id
-
-            if steps_executed_count >= MAX_STEPS:
-                print(
-                    "⚠️ [WorkflowEngine] Max steps limit reached (Infinite loop protection)"
+            else:
+                await _run_sequential(
+                    ctx, compiled, results, event_payload, iteration, log_writer
                 )
 
             # 3. LOG COMPLETION (for this iteration)
@@ -298,22 +112,25 @@ async def execute_workflow(ctx):
             status_to_set = "running" if loop_seconds > 0 else "completed"
 
             print(f"💾 [WorkflowEngine] Updating workflow status to: {status_to_set}")
+            # Remaining buffered node states ride along with the finalize update
+            # (merge mode flushes them separately)
+            if log_writer.merge:
+                await log_writer.flush(ctx.step.run, force=True)
+            final_fields = log_writer.final_fields()
             await ctx.step.run(
                 f"finalize_log_{iteration}",
-                lambda: (
-                    supabase.table("workflow_logs")
-                    .update(
-                        {
-                            "status": status_to_set,
-                            "completed_at": datetime.now().isoformat()
-                            if status_to_set == "completed"
-                            else None,
-                        }
-                    )
-                    .eq("run_id", ctx.run_id)
-                    .execute()
-                    .data
-                ),
+                query_data,
+                supabase.table("workflow_logs")
+                .update(
+                    {
+                        "status": status_to_set,
+                        "completed_at": datetime.now().isoformat()
+                        if status_to_set == "completed"
+                        else None,
+                        **final_fields,
+                    }
+                )
+                .eq("run_id", ctx.run_id),
             )
             print("✅ [WorkflowEngine] Iteration completed successfully")
             print("=" * 80 + "\n")
@@ -337,21 +154,263 @@ async def execute_workflow(ctx):
         print("💾 [WorkflowEngine] Logging failure to Supabase")
         await ctx.step.run(
             "log_failure",
-            lambda err=e: (
-                supabase.table("workflow_logs")
-                .update({"status": "failed", "error_message": str(err)})
-                .eq("run_id", ctx.run_id)
-                .execute()
-                .data
-            ),
+            query_data,
+            supabase.table("workflow_logs")
+            .update({"status": "failed", "error_message": str(e)})
+            .eq("run_id", ctx.run_id),
         )
         print("=" * 80 + "\n")
         raise e
 
 
-async def perform_action(action_data, context_data):
+execute_workflow = inngest_client.create_function(
+    fn_id="execute_business_workflow",
+    trigger=TriggerEvent(event="workflow/run_requested"),
+)(run_workflow)
+
+
+MAX_STEPS = 50  # Prevent infinite loops
+
+
+async def _run_sequential(ctx, compiled, results, event_payload, iteration, log_writer):
+    """Walks the graph one node at a time following next_node_id / router decisions."""
+    # Start from the first node in the list (or a specified start_node_id)
+    current_node_id = compiled.start_node_id
+    steps_executed_count = 0
+
+    while current_node_id and steps_executed_count < MAX_STEPS:
+        steps_executed_count += 1
+        node = compiled.node_map.get(current_node_id)
+
+        if not node:
+            print(f"❌ [WorkflowEngine] Node {current_node_id} not found in blueprint")
+            break
+
+        node_id = node["id"]
+        print(f"\n{'-' * 60}")
+        print(
+            f"🔵 [WorkflowEngine] Processing node: {node_id} (Type: {node.get('type', 'action')})"
+        )
+
+        # Mark node as running
+        log_writer.record(node_id, "running")
+        await log_writer.flush(ctx.step.run)
+
+        try:
+            if node.get("type") in ("trigger", "router"):
+                action_result, next_node_id = _run_inline_node(
+                    compiled, node, results, event_payload
+                )
+            else:
+                # STANDARD ACTION LOGIC
+                print(f"🚀 [WorkflowEngine] Executing action for node {node_id}")
+                action_result = await _action_step(
+                    ctx, compiled, node, results, iteration
+                )()
+
+                # Explicit 'next_node_id', else the next node in list order (Legacy Support)
+                # Precomputed in the compiled blueprint's successor table.
+                next_node_id = compiled.next_node(node_id)
+
+            _store_result(results, node, action_result)
+
+            # Mark node as completed
+            log_writer.record(node_id, "completed", data=action_result)
+            print(
+                f"✅ [WorkflowEngine] Node {node_id} completed. Next -> {next_node_id}"
+            )
+
+        except Exception as node_error:
+            print(f"❌ [WorkflowEngine] Error in node {node_id}: {node_error}")
+            log_writer.record(node_id, "failed", error=str(node_error))
+            # Update log failure state (forced flush)
+            await log_writer.flush(ctx.step.run, force=True)
+            raise node_error
+
+        # Update log with completed state (if a flush is due)
+        await log_writer.flush(ctx.step.run)
+
+        # Move to next node
+        current_node_id = next_node_id
+
+    if steps_executed_count >= MAX_STEPS:
+        print("⚠️ [WorkflowEngine] Max steps limit reached (Infinite loop protection)")
+
+
+async def _run_dag(ctx, compiled, results, event_payload, iteration, log_writer):
+    """
+    DAG scheduler: runs the graph in topological waves built from `edges`.
+    Every node whose dependencies are resolved runs in the same wave, action nodes
+    concurrently (each in its own step), so fan-out branches overlap.
+
+    A node runs if it has no dependencies, or if at least one dependency completed
+    and activated it (routers only activate the route they selected). Otherwise it
+    is skipped, which propagates down untaken router branches.
+    """
+    outcome = {}  # node_id -> "completed" | "skipped"
+    router_choice = {}  # router node_id -> selected next_node_id
+    pending = list(compiled.topo_order)
+
+    def _activated(node_id):
+        deps = compiled.dependencies[node_id]
+        if not deps:
+            return True
+        return any(
+            outcome[dep] == "completed"
+            and (dep not in router_choice or router_choice[dep] == node_id)
+            for dep in deps
+        )
+
+    while pending:
+        wave = [
+            node_id
+            for node_id in pending
+            if all(dep in outcome for dep in compiled.dependencies[node_id])
+        ]
+        pending = [node_id for node_id in pending if node_id not in wave]
+        print(f"\n{'-' * 60}")
+        print(f"🌊 [WorkflowEngine] DAG wave: {wave}")
+
+        actions = []
+        for node_id in wave:
+            node = compiled.node_map[node_id]
+            if not _activated(node_id):
+                outcome[node_id] = "skipped"
+                log_writer.record(node_id, "skipped")
+                continue
+
+            log_writer.record(node_id, "running")
+            if node.get("type") in ("trigger", "router"):
+                try:
+                    action_result, next_node_id = _run_inline_node(
+                        compiled, node, results, event_payload
+                    )
+                    _store_result(results, node, action_result)
+                except Exception as node_error:
+                    print(f"❌ [WorkflowEngine] Error in node {node_id}: {node_error}")
+                    log_writer.record(node_id, "failed", error=str(node_error))
+                    await log_writer.flush(ctx.step.run, force=True)
+                    raise node_error
+                if node.get("type") == "router":
+                    router_choice[node_id] = next_node_id
+                outcome[node_id] = "completed"
+                log_writer.record(node_id, "completed", data=action_result)
+            else:
+                actions.append(node)
+
+        await log_writer.flush(ctx.step.run)
+        if not actions:
+            continue
+
+        # Every action in the wave sees the same results snapshot; joined afterwards
+        print(
+            f"🚀 [WorkflowEngine] Executing {len(actions)} action(s) in parallel: "
+            f"{[node['id'] for node in actions]}"
+        )
+        steps = [
+            _action_step(ctx, compiled, node, results, iteration) for node in actions
+        ]
+        action_results = await _run_parallel(ctx, steps)
+
+        first_error = None
+        for node, action_result in zip(actions, action_results):
+            node_id = node["id"]
+            try:
+                _store_result(results, node, action_result)
+            except Exception as node_error:
+                print(f"❌ [WorkflowEngine] Error in node {node_id}: {node_error}")
+                log_writer.record(node_id, "failed", error=str(node_error))
+                first_error = first_error or node_error
+                continue
+            outcome[node_id] = "completed"
+            log_writer.record(node_id, "completed", data=action_result)
+            print(f"✅ [WorkflowEngine] Node {node_id} completed")
+
+        if first_error:
+            await log_writer.flush(ctx.step.run, force=True)
+            raise first_error
+        await log_writer.flush(ctx.step.run)
+
+
+async def _run_parallel(ctx, steps):
+    """Runs step callables concurrently (Inngest step groups when available)."""
+    group = getattr(ctx, "group", None)
+    if group is not None and hasattr(group, "parallel"):
+        return list(await group.parallel(tuple(steps)))
+    return list(await asyncio.gather(*(step() for step in steps)))
+
+
+def _action_step(ctx, compiled, node, results, iteration):
+    """Returns a callable that runs one action node inside its own step."""
+    node_id = node["id"]
+
+    async def _run_action():
+        return await perform_action(
+            node["data"],
+            results,
+            params_template=compiled.param_templates.get(node_id),
+        )
+
+    return lambda: ctx.step.run(f"execute_{node_id}_{iteration}", _run_action)
+
+
+def _run_inline_node(compiled, node, results, event_payload):
+    """Trigger and router nodes need no I/O; returns (action_result, next_node_id)."""
+    node_id = node["id"]
+
+    if node.get("type") == "trigger":
+        # TRIGGER LOGIC - Pass through the event payload
+        print(f"🎯 [WorkflowEngine] Processing trigger node {node_id}")
+        print(f"📦 [WorkflowEngine] Trigger data: {event_payload}")
+        print("✅ [WorkflowEngine] Trigger node completed - data available directly")
+        return event_payload, compiled.next_node(node_id)
+
+    # ROUTER LOGIC (routes precompiled into predicates by the compiled blueprint)
+    print(f"🔀 [WorkflowEngine] Evaluating router conditions for {node_id}")
+
+    # We need to resolve variables against the results SO FAR
+    next_node_id = compiled.routers[node_id].select(results)
+
+    action_result = {
+        "status": "routed",
+        "selected_route": next_node_id,
+        "message": (
+            f"Routed to {next_node_id}" if next_node_id else "No matching route found"
+        ),
+    }
+    print(f"👉 [WorkflowEngine] Router decision: {action_result['message']}")
+
+    # If no route matches, next_node_id is None and the branch ends.
+    return action_result, next_node_id
+
+
+def _store_result(results, node, action_result):
+    """Validates a node result and joins it into the shared results context."""
+    node_id = node["id"]
+
+    # Handle Execution Results
+    if isinstance(action_result, dict) and action_result.get("status") == "error":
+        error_msg = action_result.get("message", "Unknown tool error")
+        print(f"❌ [WorkflowEngine] Action reported error: {error_msg}")
+        raise ValueError(f"Node {node_id} failed: {error_msg}")
+
+    # Store the result
+    results[node_id] = action_result
+
+    # ROBUSTNESS: Also store by service name if not already taken
+    # This allows users to use {{razorpay.field}} regardless of the node ID
+    service_name = node.get("data", {}).get("service")
+    if service_name and service_name not in results:
+        print(
+            f"🔗 [WorkflowEngine] Mapping node {node_id} to service alias: {service_name}"
+        )
+        results[service_name] = action_result
+
+
+async def perform_action(action_data, context_data, params_template=None):
     """
     Standardized router that handles ALL services automatically.
+    `params_template` is the node's params precompiled by the compiled blueprint.
     """
     print(f"\n{'~' * 60}")
     print("🔧 [perform_action] Function called")
@@ -370,7 +429,10 @@ async def perform_action(action_data, context_data):
     print(f"🔍 [perform_action] Resolving variables in raw_params: {raw_params}")
     from lib.variable_resolver import resolve_recursive
 
-    resolved_params = resolve_recursive(raw_params, context_data)
+    if params_template is not None:
+        resolved_params = params_template.render(context_data)
+    else:
+        resolved_params = resolve_recursive(raw_params, context_data)
     print(f"✅ [perform_action] Resolved params result: {resolved_params}")
 
     # 2. Lookup the tool in the registry
@@ -0,0 +1,114 @@
+"""
+In-process executor for workflow runs.
+
+Runs the same `run_workflow` node semantics as the Inngest function, but inside
+the FastAPI process: runs are queued on a bounded lib.work_queue.WorkQueue and
+picked up by a fixed number of worker tasks. Steps execute immediately (no
+memoization or retries), which makes short synchronous automations low-latency
+and lets tests and benchmarks run the engine without the Inngest dev server.
+
+Selected per blueprint (`executor: "local"`) or globally (WORKFLOW_EXECUTOR=local),
+see workflows.dispatch.
+"""
+
+import asyncio
+import inspect
+import os
+import re
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from lib.work_queue import WorkQueue
+
+LOCAL_WORKERS = int(os.getenv("LOCAL_EXECUTOR_WORKERS", "4"))
+LOCAL_QUEUE_SIZE = int(os.getenv("LOCAL_EXECUTOR_QUEUE_SIZE", "100"))
+
+_DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h|d)?\s*$")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _duration_seconds(duration: Any) -> float:
+    """Accepts Inngest-style durations: timedelta, milliseconds, or '30s' / '5m'."""
+    if isinstance(duration, timedelta):
+        return duration.total_seconds()
+    if isinstance(duration, (int, float)):
+        return duration / 1000
+    match = _DURATION_RE.match(str(duration))
+    if not match:
+        raise ValueError(f"Invalid sleep duration: {duration}")
+    return float(match.group(1)) * _UNIT_SECONDS[match.group(2) or "s"]
+
+
+class LocalStep:
+    """The subset of Inngest's step API used by the engine; steps run immediately."""
+
+    async def run(self, step_id: str, handler, *args):
+        result = handler(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def sleep(self, step_id: str, duration: Any = None):
+        # The engine calls sleep("<n>s"); Inngest's form is sleep(step_id, duration)
+        await asyncio.sleep(
+            _duration_seconds(step_id if duration is None else duration)
+        )
+
+
+class LocalContext:
+    def __init__(self, run_id: str, data: Dict[str, Any]):
+        self.run_id = run_id
+        self.event = SimpleNamespace(name="workflow/run_requested", data=data)
+        self.step = LocalStep()
+
+
+class LocalExecutor:
+    def __init__(
+        self, workers: int = LOCAL_WORKERS, queue_size: int = LOCAL_QUEUE_SIZE
+    ):
+        self._queue = WorkQueue("LocalExecutor", workers, queue_size)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self._queue.stats
+
+    def start(self):
+        """Starts the worker tasks. Must be called from within the running event loop."""
+        self._queue.start()
+
+    async def stop(self):
+        await self._queue.stop()
+
+    def submit(
+        self,
+        blueprint: Dict[str, Any],
+        payload: Dict[str, Any],
+        run_id: Optional[str] = None,
+    ) -> str:
+        """Queues a run and returns its run_id. Raises asyncio.QueueFull when saturated."""
+        run_id = run_id or str(uuid.uuid4())
+        self._queue.submit(self.run, blueprint, payload, run_id, label=f"run {run_id}")
+        return run_id
+
+    async def run(
+        self,
+        blueprint: Dict[str, Any],
+        payload: Dict[str, Any],
+        run_id: Optional[str] = None,
+    ):
+        """Executes a run inline and waits for it (tests, benchmarks)."""
+        from workflows.engine import run_workflow
+
+        ctx = LocalContext(
+            run_id or str(uuid.uuid4()), {"blueprint": blueprint, "payload": payload}
+        )
+        await run_workflow(ctx)
+        return ctx.run_id
+
+    def queue_depth(self) -> int:
+        return self._queue.queue_depth()
+
+
+local_executor = LocalExecutor()
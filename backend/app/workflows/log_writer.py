@@ -0,0 +1,124 @@
+"""
+Buffered writer for `workflow_logs.step_results`.
+
+The engine used to rewrite the whole `node_states` dict on every node transition
+(running, completed, failed), i.e. 2+ full-JSON round trips per node. The writer
+coalesces transitions in memory and flushes them:
+- every `flush_every` transitions
+- unconditionally on failure and when an iteration is finalized
+
+Flushes run as Inngest steps, which are replayed: every decision that shapes the
+step sequence (when to flush, merge vs full writes) is derived from transition
+counts and memoized step results only, never from the wall clock or from state
+mutated inside a step body.
+
+In merge mode only the changed node keys are sent and merged server-side via the
+`merge_workflow_step_results` SQL function (see db.sql). If that function is
+missing the writer falls back to full writes.
+"""
+
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from lib.supabase_lib import supabase, run_query
+
+FLUSH_EVERY = int(os.getenv("WORKFLOW_LOG_FLUSH_EVERY", "8"))
+MERGE_MODE = os.getenv("WORKFLOW_LOG_MERGE", "false").lower() == "true"
+
+StepRunner = Callable[..., Awaitable[Any]]
+
+
+class WorkflowLogWriter:
+    def __init__(
+        self,
+        run_id: str,
+        flush_every: int = FLUSH_EVERY,
+        merge: bool = MERGE_MODE,
+    ):
+        self.run_id = run_id
+        self.flush_every = max(1, flush_every)
+        self.merge = merge
+
+        self.node_states: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        self._pending = 0
+        self._flush_seq = 0
+
+    def start_iteration(self):
+        """Each loop iteration starts with a fresh node_states dict."""
+        self.node_states = {}
+        self._dirty = {}
+        self._pending = 0
+
+    def record(
+        self,
+        node_id: str,
+        status: str,
+        data: Any = None,
+        error: Optional[str] = None,
+    ):
+        """Buffers a node state transition. Repeated transitions of a node coalesce."""
+        state = {"status": status, "data": data, "error": error}
+        self.node_states[node_id] = state
+        self._dirty[node_id] = state
+        self._pending += 1
+
+    def flush_due(self) -> bool:
+        return self._pending >= self.flush_every
+
+    async def flush(self, step_run: StepRunner, force: bool = False):
+        """
+        Writes buffered transitions inside a step (`ctx.step.run`) if a flush is due.
+        Step ids are numbered per flush so retries replay the same write.
+        """
+        if not self._dirty or not (force or self.flush_due()):
+            return None
+
+        self._flush_seq += 1
+        patch = dict(self._dirty)
+        full = dict(self.node_states)
+        self._dirty = {}
+        self._pending = 0
+
+        result = await step_run(
+            f"flush_log_{self._flush_seq}", self._write, patch, full, self.merge
+        )
+        # Decided from the (memoized) step result, so replays take the same path
+        if self.merge and (result or {}).get("mode") == "full":
+            print("⚠️ [WorkflowLogWriter] Switched to full step_results writes")
+            self.merge = False
+        return result
+
+    def final_fields(self) -> Dict[str, Any]:
+        """
+        Returns extra columns to fold into the finalize update so the last flush
+        doesn't cost its own round trip. Merge mode must flush separately.
+        """
+        if self.merge or not self._dirty:
+            return {}
+        self._dirty = {}
+        self._pending = 0
+        return {"step_results": dict(self.node_states)}
+
+    async def _write(self, patch: Dict[str, Any], full: Dict[str, Any], merge: bool):
+        """Step body: must not mutate the writer, it is skipped on replay."""
+        if merge:
+            try:
+                await run_query(
+                    supabase.rpc(
+                        "merge_workflow_step_results",
+                        {"p_run_id": self.run_id, "p_patch": patch},
+                    )
+                )
+                return {"mode": "merge"}
+            except Exception as e:
+                print(
+                    f"⚠️ [WorkflowLogWriter] JSONB merge failed, falling back to full writes: {e}"
+                )
+
+        await run_query(
+            supabase.table("workflow_logs")
+            .update({"step_results": full})
+            .eq("run_id", self.run_id)
+        )
+        return {"mode": "full"}
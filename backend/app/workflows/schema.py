@@ -42,3 +42,7 @@ class WorkflowBlueprint(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     loop_seconds: Optional[int] = 0  # 0 means run once, >0 means loop every X seconds
+    # "sequential" or "dag" (parallel branches from edges); None uses the engine default
+    execution_mode: Optional[str] = None
+    # "inngest" or "local" (in-process worker pool); None uses WORKFLOW_EXECUTOR
+    executor: Optional[str] = None
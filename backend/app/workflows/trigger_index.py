@@ -0,0 +1,104 @@
+"""
+In-memory index of active workflows by trigger service.
+
+Every webhook and every ingested social message needs "which active workflows
+start with service X?". Instead of querying (and filtering) blueprints each time,
+the index maps service name -> {workflow_id: blueprint}, built at startup and
+kept current by the endpoints in this process that write blueprints:
+/workflow/save (upsert, saved as active) and DELETE /workflows/{id} (remove).
+Drafts are inserted inactive and never indexed.
+
+Anything else that changes a blueprint or its is_active flag (other uvicorn
+workers, edits made directly in Supabase) is only seen after the next full
+reload, i.e. up to TRIGGER_INDEX_REFRESH_SECONDS later. Only one reload runs
+at a time. If the index can't be loaded, lookups fall back to the server-side
+JSONB containment query.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from lib.supabase_lib import supabase, run_query, get_active_workflows_by_trigger
+from workflows.compiler import get_compiled_blueprint
+
+TRIGGER_INDEX_REFRESH_SECONDS = float(os.getenv("TRIGGER_INDEX_REFRESH_SECONDS", "300"))
+
+
+def _trigger_services(blueprint: Dict[str, Any]) -> Set[str]:
+    services = set()
+    for node in blueprint.get("nodes") or []:
+        service = (node.get("data") or {}).get("service")
+        if node.get("type") == "trigger" and service:
+            services.add(service)
+    return services
+
+
+class TriggerIndex:
+    def __init__(self, refresh_seconds: float = TRIGGER_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._by_service: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._services_by_workflow: Dict[str, Set[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        """(Re)builds the index from all active blueprints."""
+        rows = (
+            await run_query(
+                supabase.table("workflow_blueprints").select("*").eq("is_active", True)
+            )
+        ).data
+        self._by_service = {}
+        self._services_by_workflow = {}
+        for row in rows:
+            self._add(row)
+        self._loaded_at = time.monotonic()
+        print(
+            f"✅ [TriggerIndex] Indexed {len(self._services_by_workflow)} active workflows"
+        )
+
+    def is_stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > self.refresh_seconds
+        )
+
+    async def lookup(self, service_name: str) -> List[Dict[str, Any]]:
+        """Active blueprints whose trigger node uses `service_name`."""
+        if self.is_stale():
+            # A burst of webhooks shares one reload instead of each starting its own
+            async with self._lock:
+                if self.is_stale():
+                    try:
+                        await self.load()
+                    except Exception as e:
+                        print(
+                            f"⚠️ [TriggerIndex] Load failed, querying Supabase directly: {e}"
+                        )
+                        return await get_active_workflows_by_trigger(service_name)
+        return list(self._by_service.get(service_name, {}).values())
+
+    def upsert(self, blueprint: Dict[str, Any]):
+        """Indexes a saved blueprint row, or drops it if it is no longer active."""
+        self.remove(blueprint["id"])
+        if blueprint.get("is_active", True):
+            self._add(blueprint)
+
+    def remove(self, workflow_id: str):
+        for service in self._services_by_workflow.pop(workflow_id, set()):
+            self._by_service.get(service, {}).pop(workflow_id, None)
+
+    def _add(self, blueprint: Dict[str, Any]):
+        services = _trigger_services(blueprint)
+        if not services:
+            return
+        # Warm the compiled-blueprint cache so the first run doesn't pay for it
+        get_compiled_blueprint(blueprint)
+        self._services_by_workflow[blueprint["id"]] = services
+        for service in services:
+            self._by_service.setdefault(service, {})[blueprint["id"]] = blueprint
+
+
+trigger_index = TriggerIndex()
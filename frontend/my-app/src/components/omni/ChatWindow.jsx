@@ -1,6 +1,7 @@
 "use client";
 
 import useSWR from "swr";
+import useSWRInfinite from "swr/infinite";
 import { useEffect, useRef, useState } from "react";
 import ReplyInput from "./ReplyInput";
 import { Loader2, Bot, BotOff, Reply, X } from "lucide-react";
@@ -16,17 +17,20 @@ export default function ChatWindow({ sessionId, platform }) {
   const [replyingTo, setReplyingTo] = useState(null);
   const [isBotActive, setIsBotActive] = useState(true);
 
-  // For WhatsApp aggregate view, fetch all WhatsApp messages
-  const apiUrl =
-    sessionId === "whatsapp-aggregate"
-      ? "/api/messages/whatsapp/all"
-      : `/api/messages/${sessionId}`;
+  // Newest page first, then older pages via before_cursor. The WhatsApp
+  // aggregate view is a single response of the newest messages.
+  const getKey = (pageIndex, previousPage) => {
+    if (!sessionId) return null;
+    if (sessionId === "whatsapp-aggregate") {
+      return pageIndex === 0 ? "/api/messages/whatsapp/all" : null;
+    }
+    if (pageIndex === 0) return `/api/messages/${sessionId}`;
+    if (!previousPage?.has_more || !previousPage.before_cursor) return null;
+    return `/api/messages/${sessionId}?before=${encodeURIComponent(previousPage.before_cursor)}`;
+  };
 
-  const { data, error, isLoading, mutate } = useSWR(
-    sessionId ? apiUrl : null,
-    fetcher,
-    { refreshInterval: 0 },
-  );
+  const { data, error, isLoading, isValidating, mutate, size, setSize } =
+    useSWRInfinite(getKey, fetcher, { refreshInterval: 0 });
 
   // Fetch session details for bot status
   const { data: sessionData, mutate: mutateSession } = useSWR(
@@ -44,11 +48,23 @@ export default function ChatWindow({ sessionId, platform }) {
 
   const bottomRef = useRef(null);
 
+  // Each page is oldest-first; older pages come later in `data`
+  const messages = [...(data || [])]
+    .reverse()
+    .flatMap((page) => page.data || []);
+  const newestMessageId = messages[messages.length - 1]?.id;
+  const lastPage = data?.[data.length - 1];
+  const hasOlder =
+    sessionId !== "whatsapp-aggregate" &&
+    Boolean(lastPage?.has_more && lastPage?.before_cursor);
+  const isLoadingOlder = isValidating && size > (data?.length || 0);
+
+  // Follow new messages, but stay put while older history is loaded above
   useEffect(() => {
-    if (data) {
+    if (newestMessageId) {
       bottomRef.current?.scrollIntoView({ behavior: "smooth" });
     }
-  }, [data]);
+  }, [newestMessageId]);
 
   // Realtime Subscription
   useEffect(() => {
@@ -95,10 +111,10 @@ export default function ChatWindow({ sessionId, platform }) {
       let targetSessionId = sessionId;
 
       if (sessionId === "whatsapp-aggregate") {
-        const sessionsResponse = await api.get("/api/messages/sessions");
-        const whatsappSessions = sessionsResponse.data.data.filter(
-          (s) => s.platform === "whatsapp",
+        const sessionsResponse = await api.get(
+          "/api/messages/sessions?platform=whatsapp&limit=1",
         );
+        const whatsappSessions = sessionsResponse.data.data;
 
         if (whatsappSessions.length > 0) {
           targetSessionId = whatsappSessions[0].id;
@@ -146,8 +162,6 @@ export default function ChatWindow({ sessionId, platform }) {
       </div>
     );
 
-  const messages = data?.data || [];
-
   return (
     <div className="flex flex-col h-full bg-[#030014] relative">
       {/* Header */}
@@ -189,6 +203,17 @@ export default function ChatWindow({ sessionId, platform }) {
 
       {/* Chat Area */}
       <div className="flex-1 overflow-y-auto p-4 space-y-4">
+        {hasOlder && (
+          <div className="text-center">
+            <button
+              onClick={() => setSize(size + 1)}
+              disabled={isLoadingOlder}
+              className="px-3 py-1.5 rounded-full text-xs text-gray-400 bg-white/5 hover:bg-white/10 hover:text-white transition-colors disabled:opacity-50"
+            >
+              {isLoadingOlder ? "Loading..." : "Load older messages"}
+            </button>
+          </div>
+        )}
         {messages.length === 0 && (
           <div className="text-center text-gray-500 text-sm mt-10">
             No messages yet. Start the conversation!
@@ -1,6 +1,6 @@
 "use client";
 
-import useSWR from "swr";
+import useSWRInfinite from "swr/infinite";
 import { User, MessageSquare, Clock, Bot } from "lucide-react";
 import { formatDistanceToNow } from "date-fns";
 
@@ -14,9 +14,15 @@ export default function SessionList({
   onSelectSession,
   activePlatform,
 }) {
-  const { data, error, isLoading } = useSWR("/api/messages/sessions", fetcher, {
-    refreshInterval: 5000,
-  });
+  // Keyset pages of sessions for the active platform, most recent first
+  const getKey = (pageIndex, previousPage) => {
+    const base = `/api/messages/sessions?platform=${activePlatform}`;
+    if (pageIndex === 0) return base;
+    if (!previousPage?.next_cursor) return null;
+    return `${base}&cursor=${encodeURIComponent(previousPage.next_cursor)}`;
+  };
+  const { data, error, isLoading, isValidating, size, setSize } =
+    useSWRInfinite(getKey, fetcher, { refreshInterval: 5000 });
 
   if (error)
     return <div className="p-4 text-red-400 text-sm">Failed to load chats</div>;
@@ -27,12 +33,13 @@ export default function SessionList({
       </div>
     );
 
-  const allSessions = data?.data || [];
-
-  // Filter sessions by active platform
-  const filteredSessions = allSessions.filter(
-    (session) => session.platform === activePlatform,
-  );
+  // A session that moved up between page loads can show up twice
+  const seen = new Set();
+  const filteredSessions = (data || [])
+    .flatMap((page) => page.data || [])
+    .filter((session) => !seen.has(session.id) && seen.add(session.id));
+  const hasMore = Boolean(data?.[data.length - 1]?.next_cursor);
+  const isLoadingMore = isValidating && size > (data?.length || 0);
 
   // For WhatsApp, aggregate all sessions into one "AI Assistant" item
   const displaySessions =
@@ -142,6 +149,15 @@ export default function SessionList({
             </button>
           ))
         )}
+        {hasMore && activePlatform !== "whatsapp" && (
+          <button
+            onClick={() => setSize(size + 1)}
+            disabled={isLoadingMore}
+            className="w-full p-3 text-xs text-gray-400 hover:text-white hover:bg-white/5 transition-colors disabled:opacity-50"
+          >
+            {isLoadingMore ? "Loading..." : "Load more chats"}
+          </button>
+        )}
       </div>
     </div>
   );